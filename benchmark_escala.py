@@ -0,0 +1,172 @@
+"""
+Benchmark de escala das etapas do motor de cálculo (motor_faixas).
+
+Para cada escala gera uma base sintética (gerar_dados_sinteticos) e mede o
+tempo das etapas: carregamento, exclusões, atribuição de faixas, métrica
+ponderada, projeção SARIMAX, estatísticas de presença e curva de categorias.
+A escala multiplica a quantidade de aeroportos, de aeronaves ou de meses da
+base real. Os resultados podem ser gravados em JSON e comparados com uma
+execução de referência para apontar regressões.
+
+Exemplo:
+    python benchmark_escala.py --escalas 1 10 100 --saida benchmark.json
+    python benchmark_escala.py --escalas 1 10 100 --referencia benchmark.json
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import polars as pl
+
+import motor_faixas
+from gerar_dados_sinteticos import AEROPORTOS_BASE, ANOS_BASE, salvar_dados_sinteticos
+
+# Diferença mínima (s) para uma piora ser tratada como regressão e não como ruído
+RUIDO_MINIMO_S = 0.05
+
+
+def medir(resultados, contexto, etapa, repeticoes, funcao):
+    """Executa a etapa 'repeticoes' vezes, registra mediana e mínimo e devolve o último resultado"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    resultados.append({**contexto, "etapa": etapa, "mediana_s": statistics.median(tempos), "minimo_s": min(tempos)})
+    return resultado
+
+
+def series_projecao(df_valor_ponderado, quantidade):
+    """Séries mensais (pandas) do valor ponderado das 'quantidade' aeronaves de maior valor, como na aba 1"""
+    principais = (df_valor_ponderado
+                  .group_by("aeronave")
+                  .agg(pl.sum("valor_ponderado"))
+                  .sort(["valor_ponderado", "aeronave"], descending=[True, False])
+                  .head(quantidade)["aeronave"].to_list())
+    df = (df_valor_ponderado
+          .filter(pl.col("aeronave").is_in(principais))
+          .with_columns(pl.date(pl.col("ano"), pl.col("mes"), 1).alias("data"))
+          .to_pandas())
+    df["data"] = pd.to_datetime(df["data"])
+    return [df[df["aeronave"] == aeronave].set_index("data")["valor_ponderado"] for aeronave in principais]
+
+
+def medir_etapas(caminhos, contexto, repeticoes, quantidade_series):
+    """Mede todas as etapas do motor sobre uma base gravada em 'caminhos'"""
+    resultados = []
+
+    def carregar():
+        aeroporto_pax, voos, faixas = motor_faixas.carregar_dados(caminhos["aeroportos"], caminhos["voos"])
+        specs = motor_faixas.carregar_specs_aeronaves(caminhos["specs"])
+        voos = motor_faixas.anexar_dimensao_aeronaves(voos, motor_faixas.construir_dimensao_aeronaves(voos, specs))
+        return aeroporto_pax, voos, faixas
+
+    aeroporto_pax, voos, faixas = medir(resultados, contexto, "carregamento", repeticoes, carregar)
+    df_voos, df_pax = medir(resultados, contexto, "exclusoes", repeticoes,
+                            lambda: motor_faixas.aplicar_exclusoes(aeroporto_pax, voos, {}))
+
+    df_com_faixas = medir(resultados, contexto, "faixas", repeticoes, lambda: (
+        motor_faixas.aplicar_faixas_personalizadas(df_pax, faixas)
+    ))
+    medir(resultados, contexto, "distribuicao", repeticoes, lambda: motor_faixas.distribuicao_por_faixa(df_com_faixas))
+
+    df_valor_ponderado = medir(resultados, contexto, "metrica_ponderada", repeticoes, lambda: (
+        motor_faixas.consultar_indice_prefixo_ponderado(
+            motor_faixas.construir_indice_prefixo_ponderado(df_pax, df_voos), 0, float(df_pax["passageiros_projetado"].max())
+        )
+    ))
+
+    series = series_projecao(df_valor_ponderado, quantidade_series)
+    medir(resultados, {**contexto, "series": len(series)}, "projecao_sarimax", 1,
+          lambda: [motor_faixas.projetar_sarimax(serie) for serie in series])
+
+    cubo = medir(resultados, contexto, "cubo_presenca", repeticoes, lambda: motor_faixas.construir_cubo_presenca(df_voos))
+    medir(resultados, contexto, "presenca_meses_consecutivos", repeticoes,
+          lambda: motor_faixas.tabela_meses_consecutivos(cubo, None, None))
+    medir(resultados, contexto, "eventos_servico", repeticoes, lambda: motor_faixas.detectar_eventos_servico(cubo))
+
+    ano = max(df_pax["ano"].unique().to_list())
+    df_joined = df_pax.filter(pl.col("ano") == ano).join(df_voos.filter(pl.col("ano") == ano), on=["aeroporto", "ano"], how="left").with_columns(
+        pl.col("quantidade_voos").fill_null(0),
+        pl.col("pax").fill_null(0)
+    )
+    categorias = sorted(df_joined["categoria_aeronave"].drop_nulls().unique().to_list())
+    medir(resultados, contexto, "curva_categorias", repeticoes, lambda: (
+        motor_faixas.participacao_categorias_intervalos(
+            motor_faixas.construir_curva_acumulada_categorias(df_joined, categorias), [0] + faixas["bins"][1:-1] + [motor_faixas.LIMITE_FINAL_CATEGORIAS]
+        )
+    ))
+    return resultados
+
+
+def comparar_com_referencia(df_resultados, caminho_referencia, tolerancia):
+    """Etapas cuja mediana piorou mais que 'tolerancia' (fração) e mais que RUIDO_MINIMO_S em relação à referência"""
+    with open(caminho_referencia, encoding="utf-8") as arquivo:
+        referencia = pl.DataFrame(json.load(arquivo)["resultados"])
+    return (df_resultados
+            .join(referencia.select(["dimensao", "escala", "etapa", pl.col("mediana_s").alias("referencia_s")]),
+                  on=["dimensao", "escala", "etapa"], how="inner")
+            .with_columns((pl.col("mediana_s") / pl.col("referencia_s")).alias("razao"))
+            .filter((pl.col("razao") > 1 + tolerancia) & (pl.col("mediana_s") - pl.col("referencia_s") > RUIDO_MINIMO_S))
+            .select(["dimensao", "escala", "etapa", "referencia_s", "mediana_s", "razao"]))
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Mede as etapas do motor de cálculo em bases sintéticas de escala crescente.")
+    parser.add_argument("--escalas", nargs="+", type=float, default=[1, 10, 100], help="Multiplicadores da base real (padrão: 1 10 100)")
+    parser.add_argument("--dimensao", choices=["aeroportos", "aeronaves", "meses"], default="aeroportos",
+                        help="Dimensão multiplicada pela escala (padrão: aeroportos)")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Repetições por etapa; reporta mediana e mínimo (padrão: 3)")
+    parser.add_argument("--series-projecao", type=int, default=3,
+                        help="Quantidade de séries de aeronave projetadas com SARIMAX por escala (padrão: 3)")
+    parser.add_argument("--saida", help="Arquivo JSON para gravar os resultados")
+    parser.add_argument("--referencia", help="Arquivo JSON de uma execução anterior para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Piora relativa tolerada na comparação (padrão: 0.25)")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args(argumentos)
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as pasta_temporaria:
+        for escala in args.escalas:
+            parametros = {
+                "aeroportos": max(1, int(round(AEROPORTOS_BASE * (escala if args.dimensao == "aeroportos" else 1)))),
+                "aeronaves": max(1, int(round(54 * (escala if args.dimensao == "aeronaves" else 1)))),
+                "anos": max(1, int(round(ANOS_BASE * (escala if args.dimensao == "meses" else 1)))),
+                "ano_inicial": 2022 if args.dimensao != "meses" else 2025 - max(1, int(round(ANOS_BASE * escala))) + 1,
+                "semente": args.semente
+            }
+            inicio = time.perf_counter()
+            caminhos = salvar_dados_sinteticos(f"{pasta_temporaria}/escala_{escala:g}", **parametros)
+            print(f"Escala {escala:g} ({args.dimensao}): {caminhos['linhas_voos']} linhas de voos geradas em {time.perf_counter() - inicio:.1f}s",
+                  flush=True)
+
+            contexto = {"dimensao": args.dimensao, "escala": escala, "linhas_voos": caminhos["linhas_voos"]}
+            resultados += medir_etapas(caminhos, contexto, args.repeticoes, args.series_projecao)
+
+    df_resultados = pl.DataFrame(resultados)
+    with pl.Config(tbl_rows=-1, tbl_hide_dataframe_shape=True):
+        print(df_resultados
+              .pivot(on="escala", index="etapa", values="mediana_s")
+              .rename(lambda c: c if c == "etapa" else f"escala {float(c):g} (s)"))
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump({"parametros": vars(args), "resultados": df_resultados.drop("series", strict=False).to_dicts()},
+                      arquivo, ensure_ascii=False, indent=2)
+
+    if args.referencia:
+        regressoes = comparar_com_referencia(df_resultados, args.referencia, args.tolerancia)
+        if regressoes.height > 0:
+            print(f"\n{regressoes.height} regressões em relação a {args.referencia}:")
+            with pl.Config(tbl_rows=-1):
+                print(regressoes)
+            sys.exit(1)
+        print(f"\nSem regressões em relação a {args.referencia}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Gerador de bases sintéticas compatíveis com as bases da análise de faixas.
+
+Produz, em escala configurável, arquivos com o mesmo esquema de
+faixas_aeroportos_2.parquet, voos_por_aeronave_aeroporto_mes4.parquet e
+especificacoes_aeronave_2.parquet, para medir o comportamento do motor e da
+aplicação com muito mais aeroportos, aeronaves e meses do que as bases reais.
+
+Os dados seguem a forma das bases reais: passageiros anuais log-normais por
+aeroporto (de unidades a dezenas de milhões), crescimento anual, mix de
+aeronaves compatível com o porte do aeroporto, operação mensal intermitente e
+sazonalidade.
+
+Os aeroportos são gerados em blocos, de modo que a memória usada não cresce
+com a escala: cada bloco de voos é gravado em disco e os blocos são unidos em
+um único parquet ao final.
+
+Exemplo:
+    python gerar_dados_sinteticos.py --saida dados_sinteticos/x10 --escala 10
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import polars as pl
+
+import motor_faixas
+
+# Dimensões das bases reais (escala 1)
+AEROPORTOS_BASE = 194
+ANOS_BASE = 4
+
+# Limites de assentos usados para categorizar as aeronaves sintéticas sem categoria conhecida
+LIMITES_CATEGORIA_ASSENTOS = [(20, "1B"), (80, "2C"), (150, "3C"), (220, "4C"), (300, "4D"), (400, "4E")]
+
+# Sazonalidade mensal de passageiros (média 1)
+SAZONALIDADE_MENSAL = np.array([1.15, 1.0, 0.95, 0.92, 0.9, 0.95, 1.12, 1.05, 0.95, 0.98, 0.98, 1.05])
+
+# Células (pares aeroporto-aeronave x meses) geradas por bloco de aeroportos
+CELULAS_POR_BLOCO = 2_000_000
+
+
+def codigos_sequenciais(quantidade, prefixo, tamanho):
+    """Códigos alfabéticos únicos (prefixo + letras), ex.: SAAA, SAAB, ..."""
+    indices = np.arange(quantidade)
+    letras = []
+    for _ in range(tamanho):
+        letras.append(np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))[indices % 26])
+        indices = indices // 26
+    return [prefixo + "".join(partes) for partes in zip(*reversed(letras))]
+
+
+def categoria_por_assentos(assentos):
+    """Categoria aproximada da aeronave pela quantidade de assentos"""
+    for limite, categoria in LIMITES_CATEGORIA_ASSENTOS:
+        if assentos < limite:
+            return categoria
+    return "4F"
+
+
+def gerar_catalogo_aeronaves(quantidade, rng, caminho_specs="especificacoes_aeronave_2.parquet"):
+    """
+    Catálogo de aeronaves: as aeronaves reais (especificações e CATEGORIAS_AERONAVES) e, se faltar, aeronaves sintéticas
+
+    Returns:
+        pl.DataFrame: sg_equipamento_icao, moda_assentos, Pista_Requerida_100% e categoria_aeronave
+    """
+    reais = (motor_faixas.carregar_specs_aeronaves(caminho_specs)
+             if os.path.exists(caminho_specs)
+             else pl.DataFrame(schema={"sg_equipamento_icao": pl.Utf8, "moda_assentos": pl.Int64, "Pista_Requerida_100%": pl.Int64}))
+    reais = (reais
+             .filter(pl.col("moda_assentos") > 0)
+             .with_columns(
+                 pl.col("sg_equipamento_icao")
+                 .replace_strict(motor_faixas.CATEGORIAS_AERONAVES, default=None)
+                 .fill_null(pl.col("moda_assentos").map_elements(categoria_por_assentos, return_dtype=pl.Utf8))
+                 .alias("categoria_aeronave")
+             )
+             .head(quantidade))
+
+    faltantes = quantidade - reais.height
+    if faltantes <= 0:
+        return reais
+
+    assentos = np.clip(rng.lognormal(np.log(150), 0.7, faltantes), 9, 550).astype(np.int64)
+    sinteticas = pl.DataFrame({
+        "sg_equipamento_icao": codigos_sequenciais(faltantes, "Z", 4),
+        "moda_assentos": assentos,
+        "Pista_Requerida_100%": np.clip(600 + 9 * assentos + rng.normal(0, 250, faltantes), 400, 3500).astype(np.int64),
+        "categoria_aeronave": [categoria_por_assentos(a) for a in assentos]
+    })
+    return pl.concat([reais, sinteticas])
+
+
+def escolher_aeronaves(rng, assentos, alvo_assentos, quantidade_tipos, janela):
+    """
+    Sorteia, sem reposição, as aeronaves de cada aeroporto entre as 2 * janela mais próximas (em assentos) do seu porte
+
+    Usa chaves de Gumbel (log do peso + ruído de Gumbel): as maiores chaves de cada linha equivalem ao sorteio
+    sem reposição proporcional ao peso, para todos os aeroportos de uma vez.
+
+    Returns:
+        tuple: (pares_aeroporto, pares_aeronave), índices dos pares agrupados por aeroporto
+    """
+    candidatos = np.searchsorted(assentos, alvo_assentos)[:, None] + np.arange(-janela, janela)
+    validos = (candidatos >= 0) & (candidatos < len(assentos))
+    candidatos = candidatos.clip(0, len(assentos) - 1)
+    log_pesos = np.log(np.exp(-0.5 * ((np.log(assentos[candidatos]) - np.log(alvo_assentos)[:, None]) / 0.6) ** 2) + 1e-9)
+    chaves = np.where(validos, log_pesos + rng.gumbel(size=candidatos.shape), -np.inf)
+    ordem = np.argsort(-chaves, axis=1)
+    escolhidos = np.arange(candidatos.shape[1]) < np.minimum(quantidade_tipos, validos.sum(axis=1))[:, None]
+    pares_aeroporto = np.nonzero(escolhidos)[0]
+    return pares_aeroporto, np.take_along_axis(candidatos, ordem, axis=1)[escolhidos]
+
+
+def gerar_blocos_sinteticos(catalogo, rng, aeroportos, anos, ano_inicial, aeroportos_por_bloco=None):
+    """
+    Gera as bases de aeroportos e de voos em blocos de aeroportos
+
+    Args:
+        catalogo (pl.DataFrame): Catálogo de aeronaves ordenado por assentos (gerar_catalogo_aeronaves)
+        rng (np.random.Generator): Gerador aleatório
+        aeroportos (int): Quantidade de aeroportos
+        anos (int): Quantidade de anos (12 meses cada)
+        ano_inicial (int): Primeiro ano
+        aeroportos_por_bloco (int): Aeroportos por bloco; se None, limitado por CELULAS_POR_BLOCO
+
+    Yields:
+        tuple: (df_aeroportos, df_voos) do bloco, ainda sem o índice de linha (formatar_aeroportos/formatar_voos)
+    """
+    assentos = catalogo["moda_assentos"].to_numpy().astype(np.float64)
+    codigos_aeronaves = catalogo["sg_equipamento_icao"]
+    categorias_aeronaves = catalogo["categoria_aeronave"]
+    codigos_aeroportos = pl.Series(codigos_sequenciais(aeroportos, "S", 4), dtype=pl.Utf8)
+    num_meses = 12 * anos
+
+    # Passageiros anuais por aeroporto: porte log-normal e crescimento anual acumulado
+    porte = np.clip(rng.lognormal(np.log(30_000), 2.6, aeroportos), 4, 5e7)
+    crescimento = np.cumprod(rng.normal(1.03, 0.08, (aeroportos, anos)).clip(0.5, 1.6), axis=1)
+    pax_anual = porte[:, None] * crescimento
+
+    # Mix de aeronaves: cada aeroporto opera tipos próximos (em assentos) do seu porte
+    alvo_assentos = np.clip(9 * (porte / 4) ** 0.25, assentos[0], assentos[-1])
+    quantidade_tipos = np.clip(1 + rng.poisson(0.6 * np.log10(porte)), 1, len(assentos))
+    janela = int(max(10, 3 * quantidade_tipos.max()))
+    if aeroportos_por_bloco is None:
+        aeroportos_por_bloco = max(1, int(CELULAS_POR_BLOCO // (num_meses * quantidade_tipos.mean())))
+
+    sazonalidade = np.tile(SAZONALIDADE_MENSAL, anos)
+    for inicio in range(0, aeroportos, aeroportos_por_bloco):
+        bloco = slice(inicio, min(inicio + aeroportos_por_bloco, aeroportos))
+        pares_aeroporto, pares_aeronave = escolher_aeronaves(rng, assentos, alvo_assentos[bloco], quantidade_tipos[bloco], janela)
+        num_pares = len(pares_aeroporto)
+
+        # Operação mensal intermitente (probabilidade própria de cada par) e participação do par nos passageiros
+        ativo = rng.random((num_pares, num_meses)) < rng.beta(4, 1.2, num_pares)[:, None]
+        peso_par = rng.gamma(1.0, 1.0, num_pares)[:, None] * ativo
+        peso_aeroporto_mes = np.zeros((bloco.stop - bloco.start, num_meses))
+        np.add.at(peso_aeroporto_mes, pares_aeroporto, peso_par)
+
+        # Só as células ativas seguem adiante
+        idx_par, idx_mes = np.nonzero(ativo)
+        aeroporto_celula = pares_aeroporto[idx_par]
+        participacao = peso_par[idx_par, idx_mes] / peso_aeroporto_mes[aeroporto_celula, idx_mes]
+        pax_mensal = pax_anual[bloco][aeroporto_celula, idx_mes // 12] / 12 * sazonalidade[idx_mes]
+        pax = np.rint(participacao * pax_mensal * rng.normal(1, 0.1, len(idx_par)).clip(0.5)).astype(np.int64)
+        aproveitamento = rng.uniform(0.6, 0.9, num_pares)[idx_par]
+        voos = np.maximum(1, np.rint(pax / (assentos[pares_aeronave[idx_par]] * aproveitamento))).astype(np.int64)
+
+        df_voos = pl.DataFrame({
+            "ano": (ano_inicial + idx_mes // 12).astype(np.int64),
+            "mes": (idx_mes % 12 + 1).astype(np.int64),
+            "aeroporto": codigos_aeroportos.gather(bloco.start + aeroporto_celula),
+            "aeronave": codigos_aeronaves.gather(pares_aeronave[idx_par]),
+            "quantidade_voos": voos,
+            "pax": pax,
+            "categoria_aeronave": categorias_aeronaves.gather(pares_aeronave[idx_par])
+        })
+
+        # Passageiros por aeroporto-ano = soma dos voos; faixa_aeroporto pelas faixas padrão
+        df_aeroportos = (df_voos
+                         .group_by(["aeroporto", "ano"])
+                         .agg(pl.sum("pax").cast(pl.Float64).alias("passageiros_projetado")))
+        df_aeroportos = df_aeroportos.with_columns(
+            pl.Series(motor_faixas.rotulos_faixas(df_aeroportos["passageiros_projetado"].to_numpy(), motor_faixas.FAIXAS_PADRAO['bins']),
+                      dtype=pl.Utf8).alias("faixa_aeroporto")
+        )
+        df_voos = (df_voos
+                   .join(df_aeroportos.select(["aeroporto", "ano", "faixa_aeroporto"]), on=["aeroporto", "ano"], how="left")
+                   .sort(["aeroporto", "ano", "mes", "aeronave"]))
+        yield df_aeroportos, df_voos
+
+
+def formatar_aeroportos(df_aeroportos):
+    """Esquema final da base de aeroportos, a partir dos blocos de gerar_blocos_sinteticos"""
+    return (df_aeroportos
+            .sort(["ano", "aeroporto"])
+            .with_columns(
+                pl.lit("BRASIL").alias("pais"),
+                pl.col("ano").cast(pl.Int32),
+                pl.col("faixa_aeroporto").cast(pl.Categorical),
+                pl.col("passageiros_projetado").alias("total_passageiros")
+            )
+            .with_row_index("__index_level_0__")
+            .with_columns(pl.col("__index_level_0__").cast(pl.Int64))
+            .select(["aeroporto", "pais", "ano", "passageiros_projetado", "faixa_aeroporto", "total_passageiros", "__index_level_0__"]))
+
+
+def formatar_voos(df_voos):
+    """Esquema final da base de voos (DataFrame ou LazyFrame), a partir dos blocos de gerar_blocos_sinteticos"""
+    return (df_voos
+            .with_columns(pl.col("faixa_aeroporto").cast(pl.Categorical))
+            .with_row_index("__index_level_0__")
+            .with_columns(pl.col("__index_level_0__").cast(pl.Int64))
+            .select(["ano", "mes", "faixa_aeroporto", "aeroporto", "aeronave", "quantidade_voos", "pax", "categoria_aeronave", "__index_level_0__"]))
+
+
+def gerar_dados_sinteticos(aeroportos=AEROPORTOS_BASE, aeronaves=54, anos=ANOS_BASE, ano_inicial=2022, semente=42,
+                           caminho_specs="especificacoes_aeronave_2.parquet", aeroportos_por_bloco=None):
+    """
+    Gera as bases sintéticas de aeroportos, voos e especificações em memória
+
+    Para escalas grandes, prefira salvar_dados_sinteticos, que grava os voos bloco a bloco.
+
+    Args:
+        aeroportos (int): Quantidade de aeroportos
+        aeronaves (int): Quantidade de tipos de aeronave
+        anos (int): Quantidade de anos (12 meses cada)
+        ano_inicial (int): Primeiro ano
+        semente (int): Semente do gerador aleatório
+        caminho_specs (str): Especificações reais usadas como base do catálogo de aeronaves
+        aeroportos_por_bloco (int): Aeroportos por bloco; se None, limitado por CELULAS_POR_BLOCO
+
+    Returns:
+        tuple: (df_aeroportos, df_voos, df_specs) com os esquemas das bases reais
+    """
+    rng = np.random.default_rng(semente)
+    catalogo = gerar_catalogo_aeronaves(aeronaves, rng, caminho_specs).sort("moda_assentos")
+    blocos = list(gerar_blocos_sinteticos(catalogo, rng, aeroportos, anos, ano_inicial, aeroportos_por_bloco))
+    df_aeroportos = formatar_aeroportos(pl.concat([df for df, _ in blocos]))
+    df_voos = formatar_voos(pl.concat([df for _, df in blocos]))
+    return df_aeroportos, df_voos, catalogo
+
+
+def salvar_dados_sinteticos(pasta, aeroportos=AEROPORTOS_BASE, aeronaves=54, anos=ANOS_BASE, ano_inicial=2022, semente=42,
+                            caminho_specs="especificacoes_aeronave_2.parquet", aeroportos_por_bloco=None):
+    """
+    Gera e grava as bases sintéticas com os nomes de arquivo das bases reais
+
+    Cada bloco de voos é gravado em um parquet temporário; os blocos são unidos por scan_parquet/sink_parquet,
+    sem carregar a base inteira. Mesmos dados de gerar_dados_sinteticos com os mesmos parâmetros.
+
+    Returns:
+        dict: Caminhos gravados (aeroportos, voos, specs) e quantidade de linhas de voos e de aeroportos-ano
+    """
+    rng = np.random.default_rng(semente)
+    catalogo = gerar_catalogo_aeronaves(aeronaves, rng, caminho_specs).sort("moda_assentos")
+    os.makedirs(pasta, exist_ok=True)
+    caminhos = {
+        "aeroportos": os.path.join(pasta, "faixas_aeroportos_2.parquet"),
+        "voos": os.path.join(pasta, "voos_por_aeronave_aeroporto_mes4.parquet"),
+        "specs": os.path.join(pasta, "especificacoes_aeronave_2.parquet")
+    }
+
+    blocos_aeroportos, linhas_voos = [], 0
+    with tempfile.TemporaryDirectory(dir=pasta) as pasta_blocos:
+        arquivos_blocos = []
+        for numero, (df_aeroportos, df_voos) in enumerate(gerar_blocos_sinteticos(catalogo, rng, aeroportos, anos, ano_inicial,
+                                                                                  aeroportos_por_bloco)):
+            arquivos_blocos.append(os.path.join(pasta_blocos, f"voos_{numero:06d}.parquet"))
+            df_voos.write_parquet(arquivos_blocos[-1])
+            blocos_aeroportos.append(df_aeroportos)
+            linhas_voos += df_voos.height
+        formatar_voos(pl.scan_parquet(arquivos_blocos)).sink_parquet(caminhos["voos"])
+
+    df_aeroportos = formatar_aeroportos(pl.concat(blocos_aeroportos))
+    df_aeroportos.write_parquet(caminhos["aeroportos"])
+    catalogo.write_parquet(caminhos["specs"])
+    return {**caminhos, "linhas_voos": linhas_voos, "linhas_aeroportos": df_aeroportos.height}
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Gera bases sintéticas compatíveis com as bases da análise de faixas.")
+    parser.add_argument("--saida", default="dados_sinteticos", help="Pasta de saída (padrão: dados_sinteticos)")
+    parser.add_argument("--escala", type=float, default=1.0,
+                        help=f"Multiplica a quantidade de aeroportos da base real ({AEROPORTOS_BASE}); ignorado se --aeroportos for informado")
+    parser.add_argument("--aeroportos", type=int, help="Quantidade de aeroportos")
+    parser.add_argument("--aeronaves", type=int, default=54, help="Quantidade de tipos de aeronave (padrão: 54)")
+    parser.add_argument("--anos", type=int, default=ANOS_BASE, help=f"Quantidade de anos de 12 meses (padrão: {ANOS_BASE})")
+    parser.add_argument("--ano-inicial", type=int, default=2022)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args(argumentos)
+
+    resultado = salvar_dados_sinteticos(
+        args.saida,
+        aeroportos=args.aeroportos or max(1, int(round(AEROPORTOS_BASE * args.escala))),
+        aeronaves=args.aeronaves,
+        anos=args.anos,
+        ano_inicial=args.ano_inicial,
+        semente=args.semente
+    )
+    print(f"{resultado['linhas_aeroportos']} aeroportos-ano e {resultado['linhas_voos']} linhas de voos gravados em {os.path.abspath(args.saida)}")
+
+
+if __name__ == "__main__":
+    main()
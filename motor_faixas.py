@@ -0,0 +1,2011 @@
+"""
+Motor de cálculo da análise de faixas de aeroportos, sem dependência do Streamlit.
+
+Reúne o carregamento das bases, a classificação em faixas, as agregações, a
+projeção (SARIMAX) e as estatísticas de presença. Todas as funções recebem
+parâmetros explícitos e devolvem DataFrames Polars (ou estruturas NumPy), de
+modo que podem ser medidas, armazenadas em cache e executadas em lote fora da
+aplicação. O streamlit.py consome este módulo e aplica o st.cache_data nas
+etapas caras.
+"""
+import polars as pl
+import pandas as pd
+import numpy as np
+import pmdarima as pm
+
+def gerar_meses_futuros(ultimo_periodo, meses_a_adicionar=24):
+    """Gera lista de strings 'YYYY-Mmm' para os próximos N meses."""
+    ano_atual, mes_atual = map(int, ultimo_periodo.split("-M"))
+    futuros = []
+    
+    for _ in range(meses_a_adicionar):
+        mes_atual += 1
+        if mes_atual > 12:
+            mes_atual = 1
+            ano_atual += 1
+        futuros.append(f"{ano_atual}-M{str(mes_atual).zfill(2)}")
+    
+    return futuros
+
+# Função para formatar números com separador de milhares usando ponto
+def formatar_numero(numero, casas_decimais=0):
+    """
+    Formata um número com separador de milhares usando ponto (.) em vez de vírgula (,)
+    
+    Args:
+        numero (int, float): Número a ser formatado
+        casas_decimais (int): Número de casas decimais (padrão: 0)
+    
+    Returns:
+        str: Número formatado com separador de milhares usando ponto
+    """
+    if numero is None or (isinstance(numero, float) and numero != numero):  # Verifica NaN
+        return "0"
+    
+    # Converter para float se necessário
+    numero_float = float(numero)
+    
+    # Formatar com separador de milhares usando ponto
+    if casas_decimais == 0:
+        # Para números inteiros
+        return f"{numero_float:,.0f}".replace(",", ".")
+    else:
+        # Para números com casas decimais
+        return f"{numero_float:,.{casas_decimais}f}".replace(",", ".")
+
+# Configuração padrão das faixas de passageiros (E + D)
+FAIXAS_PADRAO = {
+    'bins': [0, 5000, 20000, 60000, 200000, 400000, 1000000, 2000000, 5000000, 10000000, 15000000, float('inf')],
+    'labels': ['Faixa_AvG', 'Faixa_1', 'Faixa_2', 'Faixa_3', 'Faixa_4', 'Faixa_5', 'Faixa_6', 'Faixa_7', 'Faixa_8', 'Faixa_9', 'Faixa_10']
+}
+
+def carregar_dados(caminho_aeroportos="faixas_aeroportos_2.parquet", caminho_voos="voos_por_aeronave_aeroporto_mes4.parquet"):
+    """
+    Carrega as bases de passageiros por aeroporto-ano e de voos por aeronave-aeroporto-mês
+
+    Args:
+        caminho_aeroportos (str): Parquet com os passageiros (E + D) projetados por aeroporto e ano
+        caminho_voos (str): Parquet com os voos e passageiros por aeronave, aeroporto e mês
+
+    Returns:
+        tuple: (aeroporto_pax, voos_aeroporto_aeronave, faixas_padrao)
+    """
+    aeroporto_pax = pl.read_parquet(caminho_aeroportos).with_columns(
+        pl.col("ano").cast(pl.Int64)
+    )
+
+    # Carregar dados de voos (arquivo já contém coluna 'mes')
+    voos_aeroporto_aeronave = pl.read_parquet(caminho_voos).with_columns([
+        pl.col("ano").cast(pl.Int64),
+        pl.col("mes").cast(pl.Int64)
+    ]).filter(
+        ~((pl.col("ano") == 2025) & (pl.col("mes") >= 11)))
+
+    # Calcular o total de passageiros (pax) do DW por aeroporto e ano
+    pax_dw = (voos_aeroporto_aeronave
+              .group_by(["aeroporto", "ano"])
+              .agg(pl.sum("pax").alias("passageiros_dw")))
+
+    # Juntar os dados de pax do DW com o DataFrame principal de aeroportos
+    aeroporto_pax = aeroporto_pax.join(pax_dw, on=["aeroporto", "ano"], how="left")
+
+    # Atualizar a coluna de passageiros:
+    # - Usar 'passageiros_dw' para anos < 2025. Se for nulo (sem voos), será 0.
+    # - Manter 'passageiros_projetado' para 2025
+    aeroporto_pax = aeroporto_pax.with_columns(
+        pl.when(pl.col("ano") < 2025)
+        .then(pl.col("passageiros_dw"))
+        .otherwise(pl.col("passageiros_projetado"))
+        .alias("passageiros_atualizado")
+    ).drop("passageiros_projetado", "passageiros_dw").rename({"passageiros_atualizado": "passageiros_projetado"}).with_columns(
+        pl.col("passageiros_projetado").fill_null(0) # Preencher nulos com 0
+    )
+
+    faixas_padrao = {'bins': list(FAIXAS_PADRAO['bins']), 'labels': list(FAIXAS_PADRAO['labels'])}
+    return aeroporto_pax, voos_aeroporto_aeronave, faixas_padrao
+
+# Aeroportos excluídos por padrão da análise (botão "Selecionar Exclusões Padrão")
+AEROPORTOS_PADRAO_EXCLUSAO = [
+    'SBGV', 'SBIL', 'SBJV', 'SBKG', 'SBME', 'SBML', 'SBPB', 'SBPP', 'SBRJ',
+    'SBRP', 'SBSM', 'SBSP', 'SBSR', 'SBTC', 'SBTE', 'SBUA', 'SBUG', 'SBUR',
+    'SBUY', 'SIRI', 'SISO', 'SNCL', 'SNRJ', 'SNTI', 'SSCT', 'SSUV', 'SWCA',
+    'SBJR', 'SBMI', 'SBCO', 'SBSJ', 'SBIP'
+]
+
+def aplicar_exclusoes(aeroporto_pax, voos_aeroporto_aeronave, anos_exclusao):
+    """
+    Remove os aeroportos nos anos indicados das duas bases e a aeronave E110 da base de voos
+
+    Args:
+        aeroporto_pax (pl.DataFrame): Passageiros por aeroporto e ano
+        voos_aeroporto_aeronave (pl.DataFrame): Voos por aeronave, aeroporto e mês
+        anos_exclusao (dict): {aeroporto: [anos]}; aeroportos sem anos não são excluídos
+
+    Returns:
+        tuple: (voos filtrados, passageiros filtrados)
+    """
+    condicoes = [
+        ~((pl.col("aeroporto") == aeroporto) & (pl.col("ano").is_in(anos)))
+        for aeroporto, anos in anos_exclusao.items() if anos
+    ]
+
+    df_voos = voos_aeroporto_aeronave.filter(condicoes + [pl.col("aeronave") != "E110"])
+    df_pax = aeroporto_pax.filter(condicoes) if condicoes else aeroporto_pax
+    return df_voos, df_pax
+
+def carregar_specs_aeronaves(caminho_specs="especificacoes_aeronave_2.parquet"):
+    """Carrega as especificações das aeronaves (assentos e pista requerida)"""
+    # Carrega o arquivo parquet especificado
+    df = pl.read_parquet(caminho_specs)
+
+    # Garante a tipagem correta das colunas numéricas para ordenação
+    df = df.with_columns([
+        pl.col("moda_assentos").cast(pl.Int64).fill_null(0),
+        pl.col("Pista_Requerida_100%").cast(pl.Int64).fill_null(0)
+    ])
+    return df
+
+# Categoria ICAO (código de referência) de cada aeronave, usada quando as especificações não trazem a categoria
+CATEGORIAS_AERONAVES = {
+    'ATR': '2C',
+    'E195': '4C',
+    'A20N': '3C',
+    'B738': '4C',
+    'A321': '4C',
+    'A320': '4C',
+    'B38M': '4C',
+    'E295': '3C',
+    'B737': '4C',
+    'A21N': '4C',
+    'A319': '3C',
+    'C208': '1B',
+    'A332': '4E',
+    'B77W': '4E',
+    'A339': '4E',
+    'B763': '4D',
+    'B789': '4E',
+    'B734': '4C',
+    'B733': '4C',
+    'B722': '4C',
+    'B77L': '4E',
+    'B744': '4E',
+    'B788': '4E',
+    'CRJ2': '3B',
+    'A343': '4E',
+    'B772': '4E',
+    'B39M': '4C',
+    'A333': '4E',
+    'B773': '4E',
+    'E190': '4C',
+    'B78X': '4E',
+    'A388': '4F',
+    'B748': '4F',
+    'B739': '4C',
+    'MD11': '4D',
+    'B736': '3C',
+    'B764': '4D',
+    'B762': '4D',
+    'A124': '4F',
+    'A30B': '4D',
+    'A359': '4E',
+    'A35K': '4E',
+    'B190': '2B',
+    'IL76': '3D',
+    'A345': '4E',
+    'E145': '3B',
+    'L101': '4D',
+    'B753': '4D',
+    'A346': '4E',
+    'B743': '4E',
+    'A342': '4E',
+    'B703': '4D',
+    'T204': '4D'
+}
+
+# Ordem de exibição das categorias ICAO (categorias fora da lista vêm depois, em ordem alfabética)
+ORDEM_CATEGORIAS = ["1B", "2B", "3B", "2C", "3C", "3D", "4C", "4D", "4E", "4F"]
+
+# Limite visual do último intervalo (sem limite superior) na participação das categorias por faixa
+LIMITE_FINAL_CATEGORIAS = 50_000_000
+
+def construir_dimensao_aeronaves(df_voos, df_specs):
+    """
+    Constrói a dimensão de aeronaves: código, categoria, moda_assentos e Pista_Requerida_100%
+
+    Cada aeronave recebe uma chave inteira (id_aeronave), sua posição no vocabulário ordenado. A categoria vem
+    da coluna de categoria das especificações (se existir), de CATEGORIAS_AERONAVES e, na falta de ambas, da
+    própria base de voos.
+
+    Args:
+        df_voos (pl.DataFrame): Voos por aeroporto, aeronave, ano e mês
+        df_specs (pl.DataFrame): Especificações das aeronaves (pode ser None)
+
+    Returns:
+        pl.DataFrame: id_aeronave, aeronave, categoria_aeronave, moda_assentos e Pista_Requerida_100%
+    """
+    if df_specs is None:
+        df_specs = pl.DataFrame(schema={"sg_equipamento_icao": pl.Utf8, "moda_assentos": pl.Int64, "Pista_Requerida_100%": pl.Int64})
+
+    possible_cats = ['categoria_aeronave', 'cod_categoria', 'ds_categoria', 'classe', 'cat_icao']
+    col_cat_found = next((c for c in possible_cats if c in df_specs.columns), None)
+    specs = df_specs.select(
+        pl.col("sg_equipamento_icao").alias("aeronave"),
+        pl.col("moda_assentos"),
+        pl.col("Pista_Requerida_100%"),
+        (pl.col(col_cat_found).cast(pl.Utf8) if col_cat_found else pl.lit(None, dtype=pl.Utf8)).alias("categoria_arquivo")
+    ).unique(subset="aeronave", keep="first")
+
+    categoria_voos = df_voos.group_by("aeronave").agg(pl.first("categoria_aeronave").alias("categoria_voos"))
+
+    aeronaves = sorted(
+        set(df_voos["aeronave"].unique().to_list())
+        | set(specs["aeronave"].drop_nulls().to_list())
+        | set(CATEGORIAS_AERONAVES)
+    )
+
+    return (pl.DataFrame({
+                "id_aeronave": pl.Series(np.arange(len(aeronaves)), dtype=pl.UInt32),
+                "aeronave": aeronaves
+            })
+            .join(specs, on="aeronave", how="left")
+            .join(categoria_voos, on="aeronave", how="left")
+            .with_columns(
+                pl.coalesce(
+                    pl.col("categoria_arquivo"),
+                    pl.col("aeronave").replace_strict(CATEGORIAS_AERONAVES, default=None),
+                    pl.col("categoria_voos")
+                ).fill_null("Outros").alias("categoria_aeronave"),
+                pl.col("moda_assentos").fill_null(0),
+                pl.col("Pista_Requerida_100%").fill_null(0)
+            )
+            .select("id_aeronave", "aeronave", "categoria_aeronave", "moda_assentos", "Pista_Requerida_100%")
+            .sort("id_aeronave"))
+
+def anexar_dimensao_aeronaves(df_voos, dimensao):
+    """
+    Anexa à base de voos a chave inteira e os atributos da dimensão de aeronaves (categoria, assentos e pista)
+    e já calcula os assentos oferecidos (quantidade_voos × moda_assentos) de cada registro.
+    """
+    return (df_voos
+            .drop("categoria_aeronave", strict=False)
+            .join(dimensao, on="aeronave", how="left")
+            .with_columns((pl.col("quantidade_voos") * pl.col("moda_assentos")).alias("assentos_oferecidos")))
+
+def construir_indice_pax(df_pax):
+    """
+    Constrói um índice ordenado de passageiros (E + D) por ano
+
+    Args:
+        df_pax (pl.DataFrame): DataFrame com colunas 'aeroporto', 'ano' e 'passageiros_projetado'
+
+    Returns:
+        dict: {ano: {"pax": np.ndarray ordenado, "aeroportos": np.ndarray na mesma ordem}}
+    """
+    df_ordenado = df_pax.select(["aeroporto", "ano", "passageiros_projetado"]).sort("passageiros_projetado")
+
+    indice = {}
+    for ano in sorted(df_ordenado["ano"].unique().to_list()):
+        df_ano = df_ordenado.filter(pl.col("ano") == ano)
+        indice[ano] = {
+            "pax": df_ano["passageiros_projetado"].to_numpy(),
+            "aeroportos": df_ano["aeroporto"].to_numpy()
+        }
+    return indice
+
+def calcular_margem_limite(limite, tolerancia, modo):
+    """Converte a tolerância (± % ou ± Pax) em margem absoluta de passageiros em torno do limite"""
+    if modo == "percentual":
+        return np.asarray(limite, dtype=float) * tolerancia / 100
+    return np.full_like(np.asarray(limite, dtype=float), float(tolerancia))
+
+def aeroportos_proximos_limite(indice_ano, limite, tolerancia, modo="percentual"):
+    """
+    Busca binária (O(log n)) dos aeroportos que mudariam de faixa se o limite variasse dentro da tolerância.
+
+    Como as faixas são fechadas à esquerda (pax >= limite pertence à faixa superior), mudam de faixa
+    os aeroportos com pax no intervalo [limite - margem, limite + margem).
+    """
+    pax = indice_ano["pax"]
+    aeroportos = indice_ano["aeroportos"]
+    margem = float(calcular_margem_limite(limite, tolerancia, modo))
+
+    inicio = np.searchsorted(pax, limite - margem, side="left")
+    meio = np.searchsorted(pax, limite, side="left")
+    fim = np.searchsorted(pax, limite + margem, side="left")
+
+    pax_margem = pax[inicio:fim]
+    return pl.DataFrame({
+        "aeroporto": aeroportos[inicio:fim].tolist(),
+        "passageiros_projetado": pax_margem.tolist(),
+        "posicao": ["Abaixo do limite"] * int(meio - inicio) + ["Acima do limite"] * int(fim - meio),
+        "distancia_percentual": ((pax_margem - limite) / limite * 100 if limite > 0 else pax_margem * 0).tolist()
+    }, schema={"aeroporto": pl.Utf8, "passageiros_projetado": pl.Float64, "posicao": pl.Utf8, "distancia_percentual": pl.Float64})
+
+def curva_sensibilidade_limites(indice_ano, tolerancia, limite_min, limite_max, modo="percentual", pontos=400):
+    """
+    Calcula, para uma grade de limites (escala log) entre limite_min e limite_max (na aplicação, o intervalo
+    dos sliders), quantos aeroportos mudariam de faixa dentro da tolerância.
+    Toda a grade é resolvida de uma vez com buscas binárias vetorizadas.
+    """
+    pax = indice_ano["pax"]
+    limites = np.geomspace(limite_min, limite_max, pontos)
+    margens = calcular_margem_limite(limites, tolerancia, modo)
+
+    posicao_inferior = np.searchsorted(pax, limites - margens, side="left")
+    posicao_limite = np.searchsorted(pax, limites, side="left")
+    posicao_superior = np.searchsorted(pax, limites + margens, side="left")
+
+    return pl.DataFrame({
+        "limite": limites,
+        "aeroportos_abaixo": posicao_limite - posicao_inferior,
+        "aeroportos_acima": posicao_superior - posicao_limite,
+        "aeroportos_na_margem": posicao_superior - posicao_inferior
+    })
+
+def construir_indice_prefixo_ponderado(df_pax, df_voos):
+    """
+    Constrói, para cada ano, um índice esparso com as somas acumuladas do valor ponderado (movimentos × pax)
+    de cada aeronave-mês, com os aeroportos do ano ordenados por passageiros (E + D).
+
+    Só as células (aeronave, mês, aeroporto) com voos são guardadas, ordenadas pela chave composta
+    aeronave-mês × posição do aeroporto no ranking; o tamanho do índice acompanha a quantidade de registros
+    e não aeroportos × aeronaves × meses. Qualquer janela [mínimo, máximo] de passageiros vira, para cada
+    aeronave-mês, duas buscas binárias e a diferença de duas posições da soma acumulada.
+
+    Returns:
+        dict: {"aeronaves": lista de aeronaves,
+               "anos": {ano: {"pax", "celulas", "chave", "soma_ponderada", "registros"}}}
+    """
+    aeronaves = sorted(df_voos["aeronave"].unique().to_list())
+    mapa_codigos = pl.DataFrame({
+        "aeronave": aeronaves,
+        "codigo_aeronave": np.arange(len(aeronaves), dtype=np.int64)
+    })
+
+    df_voos_codificado = df_voos.select(
+        "aeroporto", "ano", "mes", "aeronave",
+        (pl.col("quantidade_voos") * pl.col("pax")).alias("valor_ponderado")
+    ).join(mapa_codigos, on="aeronave", how="inner")
+
+    indice = {"aeronaves": aeronaves, "anos": {}}
+    for ano in sorted(df_pax["ano"].unique().to_list()):
+        # Aeroportos do ano ordenados por passageiros; a posição no ranking compõe a chave do índice
+        pax_ano = (df_pax
+                   .filter(pl.col("ano") == ano)
+                   .select(["aeroporto", "passageiros_projetado"])
+                   .sort("passageiros_projetado")
+                   .with_row_index("posicao"))
+
+        celulas = (df_voos_codificado
+                   .filter(pl.col("ano") == ano)
+                   .join(pax_ano, on="aeroporto", how="inner")
+                   .group_by([(pl.col("codigo_aeronave") * 12 + pl.col("mes") - 1).alias("celula"), "posicao"])
+                   .agg([pl.sum("valor_ponderado"), pl.len().alias("registros")])
+                   .sort(["celula", "posicao"]))
+
+        celula = celulas["celula"].to_numpy().astype(np.int64)
+        indice["anos"][ano] = {
+            "pax": pax_ano["passageiros_projetado"].to_numpy(),
+            "celulas": np.unique(celula),
+            "chave": celula * (pax_ano.height + 1) + celulas["posicao"].to_numpy().astype(np.int64),
+            "soma_ponderada": np.concatenate([[0], np.cumsum(celulas["valor_ponderado"].to_numpy().astype(np.int64))]),
+            "registros": np.concatenate([[0], np.cumsum(celulas["registros"].to_numpy().astype(np.int64))])
+        }
+
+    return indice
+
+def consultar_indice_prefixo_ponderado(indice, pax_min, pax_max):
+    """
+    Retorna o valor ponderado por ano, mês e aeronave dos aeroportos-ano com pax em [pax_min, pax_max].
+    Cada ano é resolvido com duas buscas binárias nos passageiros e, para todas as aeronave-mês de uma vez,
+    duas buscas binárias na chave composta e a diferença de duas posições da soma acumulada.
+    """
+    aeronaves = np.array(indice["aeronaves"], dtype=object)
+    partes = []
+
+    for ano, dados in indice["anos"].items():
+        inicio = np.searchsorted(dados["pax"], pax_min, side="left")
+        fim = np.searchsorted(dados["pax"], pax_max, side="right")
+        if fim <= inicio:
+            continue
+
+        base_celula = dados["celulas"] * (len(dados["pax"]) + 1)
+        primeira = np.searchsorted(dados["chave"], base_celula + inicio, side="left")
+        ultima = np.searchsorted(dados["chave"], base_celula + fim, side="left")
+
+        # Manter apenas aeronave-mês que possuem registros de voos na janela
+        com_registros = dados["registros"][ultima] > dados["registros"][primeira]
+        celulas = dados["celulas"][com_registros]
+        partes.append(pl.DataFrame({
+            "ano": np.full(len(celulas), ano, dtype=np.int64),
+            "mes": celulas % 12 + 1,
+            "aeronave": aeronaves[celulas // 12].tolist(),
+            "valor_ponderado": (dados["soma_ponderada"][ultima] - dados["soma_ponderada"][primeira])[com_registros]
+        }))
+
+    if not partes:
+        return pl.DataFrame(schema={"ano": pl.Int64, "mes": pl.Int64, "aeronave": pl.Utf8, "valor_ponderado": pl.Int64})
+
+    return pl.concat(partes).sort(["ano", "mes", "aeronave"])
+
+def construir_features_aeroportos(df_pax, df_voos):
+    """
+    Constrói as variáveis de cada aeroporto-ano para a clusterização:
+    passageiros (E + D), movimentos (P + D) e mix de frota (participação dos movimentos por categoria)
+    """
+    movimentos = (df_voos
+                  .group_by(["aeroporto", "ano"])
+                  .agg(pl.sum("quantidade_voos").alias("movimentos")))
+
+    mix_frota = (df_voos
+                 .group_by(["aeroporto", "ano", "categoria_aeronave"])
+                 .agg(pl.sum("quantidade_voos").alias("voos_categoria"))
+                 .with_columns(
+                     (pl.col("voos_categoria") / pl.col("voos_categoria").sum().over(["aeroporto", "ano"])).alias("participacao"),
+                     ("mix_" + pl.col("categoria_aeronave")).alias("coluna_mix")
+                 )
+                 .pivot(on="coluna_mix", index=["aeroporto", "ano"], values="participacao"))
+
+    colunas_mix = sorted(c for c in mix_frota.columns if c.startswith("mix_"))
+
+    return (df_pax
+            .select(["aeroporto", "ano", "passageiros_projetado"])
+            .join(movimentos, on=["aeroporto", "ano"], how="inner")
+            .join(mix_frota.select(["aeroporto", "ano"] + colunas_mix), on=["aeroporto", "ano"], how="left")
+            .with_columns([pl.col(c).fill_null(0.0).fill_nan(0.0) for c in colunas_mix])
+            .sort(["ano", "aeroporto"]))
+
+def kmeans_mini_batch(X, k, tamanho_lote=256, iteracoes=200, semente=42):
+    """
+    K-means mini-batch vetorizado (NumPy), com inicialização k-means++.
+
+    Returns:
+        tuple: (rótulos de cada linha de X, centróides)
+    """
+    rng = np.random.default_rng(semente)
+    n = X.shape[0]
+
+    # Inicialização k-means++
+    centroides = [X[rng.integers(n)]]
+    dist_min = ((X - centroides[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        probabilidades = dist_min / dist_min.sum() if dist_min.sum() > 0 else np.full(n, 1 / n)
+        novo = X[rng.choice(n, p=probabilidades)]
+        centroides.append(novo)
+        dist_min = np.minimum(dist_min, ((X - novo) ** 2).sum(axis=1))
+    centroides = np.array(centroides, dtype=float)
+
+    contagens = np.zeros(k)
+    for _ in range(iteracoes):
+        lote = X[rng.integers(0, n, size=min(tamanho_lote, n))]
+        rotulos_lote = ((lote[:, None, :] - centroides[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+
+        # Atualização de todos os centróides do lote de uma vez (taxa de aprendizado 1/contagem)
+        qtd_lote = np.bincount(rotulos_lote, minlength=k).astype(float)
+        soma_lote = np.zeros_like(centroides)
+        np.add.at(soma_lote, rotulos_lote, lote)
+
+        atualizados = qtd_lote > 0
+        contagens[atualizados] += qtd_lote[atualizados]
+        media_lote = soma_lote[atualizados] / qtd_lote[atualizados, None]
+        taxa = qtd_lote[atualizados, None] / contagens[atualizados, None]
+        centroides[atualizados] += taxa * (media_lote - centroides[atualizados])
+
+    rotulos = ((X[:, None, :] - centroides[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+    return rotulos, centroides
+
+def agrupar_aeroportos_kmeans(df_features, variaveis, k, semente=42):
+    """
+    Agrupa os aeroportos-ano com k-means mini-batch sobre o conjunto de variáveis escolhido.
+    Os clusters são renumerados em ordem crescente da mediana de passageiros (E + D).
+
+    Args:
+        df_features (pl.DataFrame): Saída de construir_features_aeroportos
+        variaveis (tuple): Subconjunto de ("passageiros", "movimentos", "mix_frota")
+        k (int): Quantidade de clusters
+    """
+    blocos = []
+    if "passageiros" in variaveis:
+        blocos.append(np.log1p(df_features["passageiros_projetado"].to_numpy())[:, None])
+    if "movimentos" in variaveis:
+        blocos.append(np.log1p(df_features["movimentos"].to_numpy().astype(float))[:, None])
+
+    # Padronizar as variáveis de volume (escala log); o mix de frota já está entre 0 e 1
+    if blocos:
+        volumes = np.hstack(blocos)
+        desvio = volumes.std(axis=0)
+        blocos = [(volumes - volumes.mean(axis=0)) / np.where(desvio > 0, desvio, 1)]
+    if "mix_frota" in variaveis:
+        colunas_mix = [c for c in df_features.columns if c.startswith("mix_")]
+        blocos.append(df_features.select(colunas_mix).to_numpy())
+
+    X = np.hstack(blocos)
+    k = min(k, X.shape[0])
+    rotulos, _ = kmeans_mini_batch(X, k, semente=semente)
+
+    df_clusters = df_features.with_columns(pl.Series("cluster_original", rotulos))
+
+    # Renumerar clusters pela mediana de passageiros
+    ordem_clusters = (df_clusters
+                      .group_by("cluster_original")
+                      .agg(pl.median("passageiros_projetado").alias("mediana_pax"))
+                      .sort("mediana_pax")
+                      .with_row_index("cluster")
+                      .select(["cluster_original", pl.col("cluster").cast(pl.Int64)]))
+
+    return df_clusters.join(ordem_clusters, on="cluster_original", how="left").drop("cluster_original")
+
+def limites_entre_clusters(df_clusters):
+    """
+    Calcula os limites de passageiros (E + D) entre clusters consecutivos (ordenados pela mediana de pax).
+    Cada limite é o valor que minimiza a quantidade de aeroportos-ano do par classificados na faixa errada.
+    """
+    clusters = sorted(df_clusters["cluster"].unique().to_list())
+    limites = []
+
+    for inferior, superior in zip(clusters[:-1], clusters[1:]):
+        pax_inferior = np.sort(df_clusters.filter(pl.col("cluster") == inferior)["passageiros_projetado"].to_numpy())
+        pax_superior = np.sort(df_clusters.filter(pl.col("cluster") == superior)["passageiros_projetado"].to_numpy())
+
+        candidatos = np.unique(np.concatenate([pax_inferior, pax_superior]))
+        # Erros: aeroportos do cluster inferior com pax >= limite + do superior com pax < limite
+        erros = (len(pax_inferior) - np.searchsorted(pax_inferior, candidatos, side="left")) + \
+                np.searchsorted(pax_superior, candidatos, side="left")
+        limite = int(candidatos[erros.argmin()])
+
+        # Manter os limites estritamente crescentes
+        if limites and limite <= limites[-1]:
+            limite = limites[-1] + 1
+        limites.append(limite)
+
+    return limites
+
+def faixas_a_partir_de_limites(limites):
+    """Monta a configuração de faixas (mesmo formato de faixas_padrao) a partir dos limites superiores"""
+    return {
+        'bins': [0] + [int(l) for l in limites] + [float('inf')],
+        'labels': ['Faixa_AvG'] + [f'Faixa_{i}' for i in range(1, len(limites) + 1)]
+    }
+
+def rotulos_faixas(pax, bins):
+    """Rótulo da faixa (fechada à esquerda, como em aplicar_faixas_personalizadas) de cada valor de passageiros"""
+    labels = faixas_a_partir_de_limites(bins[1:-1])['labels']
+    posicoes = np.clip(np.searchsorted(bins, np.asarray(pax, dtype=float), side="right") - 1, 0, len(labels) - 1)
+    return np.asarray(labels, dtype=object)[posicoes]
+
+def aplicar_faixas_personalizadas(df, faixas):
+    """
+    Aplica as faixas personalizadas aos dados de passageiros
+
+    Args:
+        df (pl.DataFrame): Dados com a coluna passageiros_projetado
+        faixas (dict): Configuração com 'bins' e 'labels'
+
+    Returns:
+        pl.DataFrame: Dados com a coluna faixa_personalizada
+    """
+    bins = faixas['bins']
+    labels = faixas['labels']
+
+    # Criar condições para cada faixa
+    conditions = []
+    for i in range(len(bins) - 1):
+        if i == 0:
+            # Primeira faixa: passageiros >= bins[0] e < bins[1]
+            condition = (pl.col("passageiros_projetado") >= bins[i]) & (pl.col("passageiros_projetado") < bins[i + 1])
+        elif i == len(bins) - 2:
+            # Última faixa: passageiros >= bins[i] (incluindo infinito)
+            condition = pl.col("passageiros_projetado") >= bins[i]
+        else:
+            # Faixas intermediárias: passageiros >= bins[i] e < bins[i + 1]
+            condition = (pl.col("passageiros_projetado") >= bins[i]) & (pl.col("passageiros_projetado") < bins[i + 1])
+
+        conditions.append((condition, labels[i]))
+
+    # Aplicar as condições usando when/then/otherwise
+    faixa_expr = pl.when(conditions[0][0]).then(pl.lit(conditions[0][1]))
+
+    for condition, label in conditions[1:]:
+        faixa_expr = faixa_expr.when(condition).then(pl.lit(label))
+
+    faixa_expr = faixa_expr.otherwise(pl.lit("Indefinido"))
+
+    df_com_faixas = df.with_columns([
+        faixa_expr.alias("faixa_personalizada")
+    ])
+
+    return df_com_faixas
+
+def distribuicao_por_faixa(df_com_faixas, por=("faixa_personalizada", "ano")):
+    """
+    Agrega quantidade de aeroportos e estatísticas de passageiros por faixa (e demais chaves)
+
+    Args:
+        df_com_faixas (pl.DataFrame): Saída de aplicar_faixas_personalizadas
+        por (tuple): Colunas de agrupamento
+
+    Returns:
+        pl.DataFrame: quantidade_aeroportos, media/total/min/max de passageiros por grupo
+    """
+    return (df_com_faixas
+            .group_by(list(por))
+            .agg([
+                pl.count("aeroporto").alias("quantidade_aeroportos"),
+                pl.mean("passageiros_projetado").alias("media_passageiros"),
+                pl.sum("passageiros_projetado").alias("total_passageiros"),
+                pl.min("passageiros_projetado").alias("min_passageiros"),
+                pl.max("passageiros_projetado").alias("max_passageiros")
+            ])
+            .sort(list(por)))
+
+def formatar_limite_pax(valor):
+    """Formata um limite de passageiros de forma compacta (5k, 1M, 1.5M)"""
+    if valor == float('inf'):
+        return "∞"
+    if valor >= 1_000_000:
+        return f"{valor / 1_000_000:g}M"
+    if valor >= 1_000:
+        return f"{valor / 1_000:g}k"
+    return str(int(valor))
+
+def arredondar_valor_agradavel(valor, modo="proximo"):
+    """
+    Arredonda um valor positivo para a sequência 1-2-5 (1, 2, 5, 10, 20, 50, ...)
+
+    Args:
+        valor (float): Valor a ser arredondado
+        modo (str): "proximo", "cima" ou "baixo"
+
+    Returns:
+        int: Valor arredondado (mínimo 1)
+    """
+    if valor <= 1:
+        return 1
+    potencia = 10 ** np.floor(np.log10(valor))
+    candidatos = np.array([1, 2, 5, 10]) * potencia
+    if modo == "cima":
+        return int(candidatos[np.searchsorted(candidatos, valor, side="left")])
+    if modo == "baixo":
+        return int(candidatos[np.searchsorted(candidatos, valor, side="right") - 1])
+    return int(candidatos[np.abs(np.log(candidatos / valor)).argmin()])
+
+def construir_esboco_quantis(df_pax):
+    """
+    Pré-calcula o esboço de quantis (array ordenado exato) de passageiros (E + D) por ano e para todos os anos
+
+    Args:
+        df_pax (pl.DataFrame): DataFrame com colunas 'ano' e 'passageiros_projetado'
+
+    Returns:
+        dict: {ano: np.ndarray ordenado, ..., "todos": np.ndarray ordenado}
+    """
+    esboco = {
+        ano: np.sort(df_pax.filter(pl.col("ano") == ano)["passageiros_projetado"].to_numpy())
+        for ano in sorted(df_pax["ano"].unique().to_list())
+    }
+    esboco["todos"] = np.sort(df_pax["passageiros_projetado"].to_numpy())
+    return esboco
+
+def limites_por_quantis(pax_ordenado, num_limites, metodo="quantidade"):
+    """
+    Deriva limites de faixas a partir do esboço de quantis
+
+    Args:
+        pax_ordenado (np.ndarray): Passageiros (E + D) ordenados
+        num_limites (int): Quantidade de limites (faixas numeradas)
+        metodo (str): "quantidade" (mesma quantidade de aeroportos por faixa) ou
+            "logaritmico" (limites igualmente espaçados em escala logarítmica)
+
+    Returns:
+        list: Limites estritamente crescentes, arredondados para 2 algarismos significativos
+    """
+    positivos = pax_ordenado[pax_ordenado > 0]
+    if len(positivos) == 0:
+        # Sem passageiros positivos (ex.: todos os aeroportos excluídos) não há distribuição a dividir
+        return list(range(1, num_limites + 1))
+
+    if metodo == "quantidade":
+        probabilidades = np.arange(1, num_limites + 1) / (num_limites + 1)
+        brutos = np.quantile(pax_ordenado, probabilidades)
+    else:
+        brutos = np.geomspace(max(positivos[0], 1), positivos[-1], num_limites + 2)[1:-1]
+
+    limites = []
+    for valor in brutos:
+        casas = max(int(np.floor(np.log10(max(valor, 1)))) - 1, 0)
+        limite = int(round(valor / 10 ** casas) * 10 ** casas)
+        if limites and limite <= limites[-1]:
+            limite = limites[-1] + 1
+        limites.append(max(limite, 1))
+    return limites
+
+def parametros_sliders_faixas(pax_ordenado):
+    """
+    Intervalo global dos sliders de faixas derivado da distribuição de passageiros (E + D)
+
+    Sem passageiros positivos o intervalo vai de 1 ao último limite das faixas padrão.
+    """
+    positivos = pax_ordenado[pax_ordenado > 0]
+    if len(positivos) == 0:
+        return {"min_val": 1, "max_val": arredondar_valor_agradavel(FAIXAS_PADRAO['bins'][-2], "cima")}
+    return {
+        "min_val": arredondar_valor_agradavel(positivos[0], "baixo"),
+        "max_val": arredondar_valor_agradavel(positivos[-1], "cima")
+    }
+
+def passo_local_slider(pax_ordenado, valor, vizinhos_percentual=2):
+    """
+    Passo do slider proporcional à densidade de aeroportos em torno do valor atual
+
+    Usa a amplitude de passageiros que contém ± vizinhos_percentual% dos aeroportos ao redor do valor
+    (busca binária no esboço de quantis) e a divide em ~20 passos, arredondando para a sequência 1-2-5.
+    """
+    n = len(pax_ordenado)
+    if n == 0:
+        return arredondar_valor_agradavel(valor / 1000, "baixo")
+    posicao = int(np.searchsorted(pax_ordenado, valor, side="left"))
+    vizinhos = max(1, n * vizinhos_percentual // 100)
+    amplitude = pax_ordenado[min(posicao + vizinhos, n - 1)] - pax_ordenado[max(posicao - vizinhos, 0)]
+    # O passo fica entre 0,1% e 10% do valor para manter o slider utilizável em regiões muito densas ou vazias
+    passo = min(max(amplitude / 20, valor / 1000), max(valor / 10, 1))
+    return arredondar_valor_agradavel(passo, "baixo")
+
+def construir_base_estabilidade(df_features, df_voos, meses_minimos=3):
+    """
+    Pré-calcula, para cada aeroporto-ano, os vetores usados na avaliação de estabilidade das faixas
+
+    A aeronave crítica de cada aeroporto-ano é a de maior pista requerida (Pista_Requerida_100%)
+    entre as aeronaves com movimento em pelo menos `meses_minimos` meses do ano (uso constante).
+
+    Args:
+        df_features (pl.DataFrame): Saída de construir_features_aeroportos (passageiros e mix de frota por aeroporto-ano)
+        df_voos (pl.DataFrame): Voos por aeroporto, aeronave, ano e mês, com a dimensão de aeronaves anexada
+        meses_minimos (int): Meses com movimento para considerar o uso da aeronave constante
+
+    Returns:
+        dict: Arrays alinhados por aeroporto-ano ("ano", "pax", "mix", "critica") e rótulos auxiliares
+    """
+    colunas_mix = [c for c in df_features.columns if c.startswith("mix_")]
+
+    uso_aeronaves = (df_voos
+                     .filter(pl.col("quantidade_voos") > 0)
+                     .group_by(["aeroporto", "ano", "aeronave"])
+                     .agg([
+                         pl.col("mes").n_unique().alias("meses_com_movimento"),
+                         pl.sum("quantidade_voos").alias("voos"),
+                         pl.first("Pista_Requerida_100%").alias("pista_requerida")
+                     ]))
+
+    # Aeronave crítica: maior pista entre as de uso constante (na ausência, a de maior pista entre todas)
+    criticas = (uso_aeronaves
+                .with_columns((pl.col("meses_com_movimento") >= meses_minimos).alias("constante"))
+                .sort(["constante", "pista_requerida", "voos"], descending=True)
+                .group_by(["aeroporto", "ano"])
+                .agg(pl.first("aeronave").alias("aeronave_critica")))
+
+    df_base = (df_features
+               .join(criticas, on=["aeroporto", "ano"], how="left")
+               .with_columns(pl.col("aeronave_critica").fill_null("Sem movimento")))
+
+    anos = sorted(df_base["ano"].unique().to_list())
+    aeronaves = sorted(df_base["aeronave_critica"].unique().to_list())
+    return {
+        "anos": anos,
+        "aeronaves": aeronaves,
+        "categorias": [c.removeprefix("mix_") for c in colunas_mix],
+        "aeroporto": df_base["aeroporto"].to_numpy(),
+        "ano": np.searchsorted(anos, df_base["ano"].to_numpy()),
+        "pax": df_base["passageiros_projetado"].to_numpy().astype(float),
+        "mix": df_base.select(colunas_mix).to_numpy().astype(float),
+        "critica": np.searchsorted(aeronaves, df_base["aeronave_critica"].to_numpy())
+    }
+
+def agregar_estabilidade_configuracoes(base, lista_bins):
+    """
+    Agrega de uma só vez, para várias configurações de limites, os grupos (configuração, ano, faixa)
+
+    As faixas de cada configuração são empilhadas em uma única grade de grupos; configurações com menos
+    faixas ficam com as faixas excedentes vazias (peso zero), de modo que as contagens e somas de todas
+    as configurações saem das mesmas chamadas de np.bincount.
+
+    Args:
+        base (dict): Resultado de construir_base_estabilidade
+        lista_bins (list): Limites de cada configuração no formato de faixas_padrao ([0, l1, ..., ln, inf])
+
+    Returns:
+        dict: Arrays de formato (configuração, ano, faixa) com contagem, homogeneidades, aeronave crítica
+              modal e coincidência com a crítica de todos os anos, e os componentes de cada configuração
+    """
+    n_configuracoes = len(lista_bins)
+    n_faixas = max(len(bins) - 1 for bins in lista_bins)
+    n_anos = len(base["anos"])
+    n_aeronaves = len(base["aeronaves"])
+    n_categorias = base["mix"].shape[1]
+    forma = (n_configuracoes, n_anos, n_faixas)
+
+    # Faixas fechadas à esquerda: pax >= limite pertence à faixa superior
+    faixa = np.stack([np.searchsorted(np.asarray(bins[1:-1], dtype=float), base["pax"], side="right") for bins in lista_bins])
+    grupo = ((np.arange(n_configuracoes)[:, None] * n_anos + base["ano"][None, :]) * n_faixas + faixa).ravel()
+    n_grupos = n_configuracoes * n_anos * n_faixas
+    mix = np.tile(base["mix"], (n_configuracoes, 1))
+
+    contagem = np.bincount(grupo, minlength=n_grupos).astype(float)
+    soma_mix = np.column_stack([np.bincount(grupo, weights=mix[:, k], minlength=n_grupos) for k in range(n_categorias)])
+    mix_grupo = soma_mix / np.maximum(contagem, 1)[:, None]
+
+    # Homogeneidade do mix de frota em cada ano
+    distancia_tv = 0.5 * np.abs(mix - mix_grupo[grupo]).sum(axis=1)
+    homog_mix_grupo = 1 - np.bincount(grupo, weights=distancia_tv, minlength=n_grupos) / np.maximum(contagem, 1)
+
+    # Homogeneidade da aeronave crítica em cada ano
+    contagem_criticas = np.bincount(grupo * n_aeronaves + np.tile(base["critica"], n_configuracoes),
+                                    minlength=n_grupos * n_aeronaves).reshape(n_grupos, n_aeronaves)
+    critica_modal_grupo = contagem_criticas.argmax(axis=1).reshape(forma)
+    homog_critica_grupo = (contagem_criticas.max(axis=1) / np.maximum(contagem, 1)).reshape(forma)
+
+    # Estabilidade entre anos: compara cada ano com o total da faixa em todos os anos
+    pesos = contagem.reshape(forma)
+    contagem_faixa = pesos.sum(axis=1)
+    mix_faixa = soma_mix.reshape(forma + (n_categorias,)).sum(axis=1) / np.maximum(contagem_faixa, 1)[:, :, None]
+    critica_modal_faixa = contagem_criticas.reshape(forma + (n_aeronaves,)).sum(axis=1).argmax(axis=2)
+
+    tv_entre_anos = 0.5 * np.abs(mix_grupo.reshape(forma + (n_categorias,)) - mix_faixa[:, None, :, :]).sum(axis=3)
+    coincide_critica = critica_modal_grupo == critica_modal_faixa[:, None, :]
+    homog_mix_grupo = homog_mix_grupo.reshape(forma)
+
+    total = pesos.sum(axis=(1, 2))
+    componentes = {
+        "homogeneidade_mix": (homog_mix_grupo * pesos).sum(axis=(1, 2)) / total,
+        "homogeneidade_critica": (homog_critica_grupo * pesos).sum(axis=(1, 2)) / total,
+        "estabilidade_mix": ((1 - tv_entre_anos) * pesos).sum(axis=(1, 2)) / total,
+        "estabilidade_critica": (coincide_critica * pesos).sum(axis=(1, 2)) / total
+    }
+    componentes["score_estabilidade"] = np.mean(list(componentes.values()), axis=0)
+
+    # Score de cada ano (média ponderada das duas homogeneidades) para verificar a dispersão entre anos
+    score_ano = ((homog_mix_grupo + homog_critica_grupo) / 2 * pesos).sum(axis=2) / np.maximum(pesos.sum(axis=2), 1)
+    componentes["desvio_entre_anos"] = score_ano.std(axis=1)
+
+    return {
+        "contagem": pesos,
+        "homogeneidade_mix": homog_mix_grupo,
+        "homogeneidade_critica": homog_critica_grupo,
+        "critica_modal": critica_modal_grupo,
+        "critica_coincide_todos_anos": coincide_critica,
+        "componentes": componentes
+    }
+
+def avaliar_estabilidade_faixas(base, bins):
+    """
+    Avalia a homogeneidade das faixas em cada ano e a estabilidade entre os anos para um vetor de limites
+
+    Componentes (todos entre 0 e 1, quanto maior melhor):
+    - homogeneidade_mix: 1 - distância de variação total média entre o mix de frota do aeroporto e o da faixa
+    - homogeneidade_critica: participação da aeronave crítica mais frequente entre os aeroportos da faixa
+    - estabilidade_mix: 1 - distância de variação total média entre o mix da faixa em cada ano e o mix da faixa em todos os anos
+    - estabilidade_critica: participação dos anos em que a aeronave crítica modal da faixa coincide com a de todos os anos
+
+    Args:
+        base (dict): Resultado de construir_base_estabilidade
+        bins (list): Limites no formato de faixas_padrao ([0, l1, ..., ln, inf])
+
+    Returns:
+        tuple: (dict com os componentes e o score de estabilidade, pl.DataFrame por ano e faixa)
+    """
+    agregado = agregar_estabilidade_configuracoes(base, [bins])
+    componentes = {nome: float(valores[0]) for nome, valores in agregado["componentes"].items()}
+
+    n_faixas = len(bins) - 1
+    labels = ['Faixa_AvG'] + [f'Faixa_{i}' for i in range(1, n_faixas)]
+    df_detalhe = pl.DataFrame({
+        "ano": np.repeat(base["anos"], n_faixas),
+        "faixa": labels * len(base["anos"]),
+        "aeroportos": agregado["contagem"][0].ravel().astype(int),
+        "homogeneidade_mix": agregado["homogeneidade_mix"][0].ravel(),
+        "homogeneidade_critica": agregado["homogeneidade_critica"][0].ravel(),
+        "aeronave_critica_modal": [base["aeronaves"][i] for i in agregado["critica_modal"][0].ravel()],
+        "critica_coincide_todos_anos": agregado["critica_coincide_todos_anos"][0].ravel()
+    }).filter(pl.col("aeroportos") > 0)
+
+    return componentes, df_detalhe
+
+def avaliar_configuracoes_estabilidade(base, configuracoes):
+    """
+    Avalia várias configurações de faixas de uma só vez e ordena pelo score de estabilidade
+
+    Args:
+        base (dict): Resultado de construir_base_estabilidade
+        configuracoes (dict): {nome da configuração: bins}
+
+    Returns:
+        pl.DataFrame: Uma linha por configuração com os componentes e o score
+    """
+    nomes = list(configuracoes.keys())
+    componentes = agregar_estabilidade_configuracoes(base, [configuracoes[nome] for nome in nomes])["componentes"]
+
+    return (pl.DataFrame({
+                "configuracao": nomes,
+                "faixas": [len(configuracoes[nome]) - 1 for nome in nomes],
+                **{componente: valores.astype(float) for componente, valores in componentes.items()}
+            })
+            .sort("score_estabilidade", descending=True))
+
+# Quantidade de bits 1 em cada byte, para contar meses direto do cubo empacotado
+POPCOUNT_BYTE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def construir_cubo_presenca(df_voos):
+    """
+    Constrói o cubo de presença aeroporto × aeronave × mês, empacotado em bits ao longo dos meses.
+
+    Aeroportos e aeronaves viram códigos inteiros (posição na lista ordenada) e os meses são contínuos
+    do primeiro ao último mês dos dados. Há presença quando a combinação tem movimentos no mês. Os bits
+    são ligados direto nos arrays empacotados, sem materializar o cubo booleano.
+
+    Returns:
+        dict: "aeroportos", "aeronaves", "ano" e "mes" de cada posição do eixo de meses,
+              "meses" (quantidade de meses), "bits" (np.uint8, aeroportos × aeronaves × ceil(meses / 8)) e
+              "bits_aeroportos" (a mesma presença empacotada ao longo dos aeroportos:
+              aeronaves × meses × ceil(aeroportos / 8), para contar aeroportos por popcount)
+    """
+    aeroportos = sorted(df_voos["aeroporto"].unique().to_list())
+    aeronaves = sorted(df_voos["aeronave"].unique().to_list())
+
+    registros = df_voos.filter(pl.col("quantidade_voos") > 0).select([
+        "aeroporto", "aeronave", (pl.col("ano") * 12 + pl.col("mes") - 1).alias("indice_mes")
+    ])
+    indice_mes = registros["indice_mes"].to_numpy()
+    indice_inicial = int(indice_mes.min()) if len(indice_mes) else 0
+    meses = int(indice_mes.max()) - indice_inicial + 1 if len(indice_mes) else 0
+
+    codigo_aeroporto = np.searchsorted(aeroportos, registros["aeroporto"].to_numpy())
+    codigo_aeronave = np.searchsorted(aeronaves, registros["aeronave"].to_numpy())
+    codigo_mes = indice_mes - indice_inicial
+
+    # Ordem de bits do np.packbits: a primeira posição de cada byte é o bit mais significativo
+    bits = np.zeros((len(aeroportos), len(aeronaves), (meses + 7) // 8), dtype=np.uint8)
+    np.bitwise_or.at(bits, (codigo_aeroporto, codigo_aeronave, codigo_mes // 8),
+                     (0x80 >> (codigo_mes % 8)).astype(np.uint8))
+    bits_aeroportos = np.zeros((len(aeronaves), meses, (len(aeroportos) + 7) // 8), dtype=np.uint8)
+    np.bitwise_or.at(bits_aeroportos, (codigo_aeronave, codigo_mes, codigo_aeroporto // 8),
+                     (0x80 >> (codigo_aeroporto % 8)).astype(np.uint8))
+
+    indices = indice_inicial + np.arange(meses)
+    return {
+        "aeroportos": aeroportos,
+        "aeronaves": aeronaves,
+        "ano": indices // 12,
+        "mes": indices % 12 + 1,
+        "meses": meses,
+        "bits": bits,
+        "bits_aeroportos": bits_aeroportos
+    }
+
+def codigos_cubo(vocabulario, valores):
+    """Converte valores (aeroportos ou aeronaves) nos códigos inteiros do cubo, ignorando os ausentes."""
+    vocabulario = np.asarray(vocabulario)
+    valores = np.asarray(list(valores))
+    posicoes = np.searchsorted(vocabulario, valores)
+    validos = (posicoes < len(vocabulario)) & (vocabulario[np.minimum(posicoes, len(vocabulario) - 1)] == valores)
+    return np.unique(posicoes[validos])
+
+def fatiar_cubo_presenca(cubo, aeroportos=None, aeronaves=None):
+    """
+    Retorna a presença booleana (aeroportos × aeronaves × meses) para os aeroportos e aeronaves informados
+    (None = todos), junto com os códigos selecionados de cada eixo.
+    """
+    idx_aeroportos = np.arange(len(cubo["aeroportos"])) if aeroportos is None else codigos_cubo(cubo["aeroportos"], aeroportos)
+    idx_aeronaves = np.arange(len(cubo["aeronaves"])) if aeronaves is None else codigos_cubo(cubo["aeronaves"], aeronaves)
+
+    bits = cubo["bits"][np.ix_(idx_aeroportos, idx_aeronaves)]
+    presenca = np.unpackbits(bits, axis=2, count=cubo["meses"]).astype(bool)
+    return presenca, idx_aeroportos, idx_aeronaves
+
+def contar_meses_presenca(cubo, aeroportos=None, aeronaves=None):
+    """Conta, sem desempacotar o cubo, os meses com presença de cada combinação aeroporto × aeronave."""
+    idx_aeroportos = np.arange(len(cubo["aeroportos"])) if aeroportos is None else codigos_cubo(cubo["aeroportos"], aeroportos)
+    idx_aeronaves = np.arange(len(cubo["aeronaves"])) if aeronaves is None else codigos_cubo(cubo["aeronaves"], aeronaves)
+
+    bits = cubo["bits"][np.ix_(idx_aeroportos, idx_aeronaves)]
+    return POPCOUNT_BYTE[bits].sum(axis=2, dtype=np.int64)
+
+def sequencias_presenca(presenca):
+    """
+    Decompõe as linhas de uma matriz de presença (combinações × meses) em sequências de meses consecutivos
+    com o mesmo valor (run-length encoding vetorizado, sem laço sobre linhas ou meses).
+
+    Returns:
+        dict: Arrays por sequência, na ordem das linhas: "linha", "inicio" (posição do mês), "tamanho" e "valor"
+    """
+    # Uma sequência começa no primeiro mês de cada linha e em toda mudança de valor
+    inicio = np.ones_like(presenca, dtype=bool)
+    inicio[:, 1:] = presenca[:, 1:] != presenca[:, :-1]
+    linha, mes_inicio = np.nonzero(inicio)
+
+    return {
+        "linha": linha,
+        "inicio": mes_inicio,
+        "tamanho": np.bincount(np.cumsum(inicio.ravel()) - 1),
+        "valor": presenca[inicio]
+    }
+
+def estatisticas_sequencias_presenca(presenca):
+    """
+    Calcula, para todas as linhas de uma matriz de presença (combinações × meses) de uma só vez, o máximo,
+    o mínimo e a média das sequências de meses consecutivos com e sem operação.
+
+    As sequências são identificadas pelas mudanças de valor ao longo dos meses (run-length encoding
+    vetorizado); linhas sem nenhuma sequência de um tipo recebem 0 nas três estatísticas desse tipo.
+
+    Args:
+        presenca (np.ndarray): Matriz booleana (combinações × meses)
+
+    Returns:
+        dict: Arrays por combinação com meses_consecutivos_* e meses_sem_operacao_* (maximo, minimo, medio)
+    """
+    linhas, meses = presenca.shape
+    estatisticas = {}
+    if linhas == 0 or meses == 0:
+        for prefixo in ("meses_consecutivos", "meses_sem_operacao"):
+            estatisticas[f"{prefixo}_maximo"] = np.zeros(linhas, dtype=np.int64)
+            estatisticas[f"{prefixo}_minimo"] = np.zeros(linhas, dtype=np.int64)
+            estatisticas[f"{prefixo}_medio"] = np.zeros(linhas, dtype=float)
+        return estatisticas
+
+    seq = sequencias_presenca(presenca)
+
+    for prefixo, valor in (("meses_consecutivos", True), ("meses_sem_operacao", False)):
+        selecao = seq["valor"] == valor
+        linha, tam = seq["linha"][selecao], seq["tamanho"][selecao]
+
+        quantidade = np.bincount(linha, minlength=linhas)
+        maximo = np.zeros(linhas, dtype=np.int64)
+        np.maximum.at(maximo, linha, tam)
+        minimo = np.full(linhas, meses, dtype=np.int64)
+        np.minimum.at(minimo, linha, tam)
+
+        estatisticas[f"{prefixo}_maximo"] = maximo
+        estatisticas[f"{prefixo}_minimo"] = np.where(quantidade > 0, minimo, 0)
+        estatisticas[f"{prefixo}_medio"] = np.bincount(linha, weights=tam, minlength=linhas) / np.maximum(quantidade, 1)
+
+    return estatisticas
+
+def detectar_eventos_servico(cubo, meses_ausencia=3, meses_constancia=12):
+    """
+    Detecta, sobre todo o cubo de presença e de uma só vez, os eventos de serviço de cada combinação
+    aeroporto-aeronave e de cada aeroporto (aeronave "Todas", presença de qualquer aeronave):
+
+    - Entrada: início das operações após pelo menos `meses_ausencia` meses sem operação desde o início dos dados
+    - Saída: fim das operações seguido de pelo menos `meses_ausencia` meses sem operação até o fim dos dados
+    - Lacuna: interrupção interna de pelo menos `meses_ausencia` meses
+    - Constância: operação em todos os meses dos últimos `meses_constancia` meses (ou mais) até o fim dos dados
+
+    Só as combinações e aeroportos com algum movimento são desempacotados: linhas sem movimento não têm eventos.
+
+    Na aplicação o resultado fica em cache por versão dos dados (cubo) e parâmetros, e é consultado pelas abas.
+
+    Returns:
+        pl.DataFrame: aeroporto, aeronave, evento, periodo_inicio, periodo_fim e meses (duração da ausência
+                      que caracteriza Entrada, Saída e Lacuna, ou da operação contínua na Constância)
+    """
+    meses = cubo["meses"]
+    aeroportos = np.asarray(cubo["aeroportos"], dtype=object)
+    aeronaves = np.asarray(list(cubo["aeronaves"]) + ["Todas"], dtype=object)
+
+    # Linhas: combinações aeroporto-aeronave com movimento seguidas dos aeroportos com movimento (qualquer
+    # aeronave, OR dos bytes empacotados)
+    combinacao_aeroporto, combinacao_aeronave = np.nonzero(contar_meses_presenca(cubo) > 0)
+    bits_aeroportos = np.bitwise_or.reduce(cubo["bits"], axis=1)
+    aeroportos_com_movimento = np.nonzero(bits_aeroportos.any(axis=1))[0]
+    bits_linhas = np.concatenate([cubo["bits"][combinacao_aeroporto, combinacao_aeronave],
+                                  bits_aeroportos[aeroportos_com_movimento]])
+    matriz = np.unpackbits(bits_linhas, axis=1, count=meses).astype(bool)
+    linha_aeroporto = np.concatenate([combinacao_aeroporto, aeroportos_com_movimento])
+    linha_aeronave = np.concatenate([combinacao_aeronave, np.full(len(aeroportos_com_movimento), len(cubo["aeronaves"]))])
+
+    seq = sequencias_presenca(matriz)
+    fim = seq["inicio"] + seq["tamanho"] - 1
+    ausencia = ~seq["valor"] & (seq["tamanho"] >= meses_ausencia)
+
+    # Entrada: primeiro mês após a ausência inicial; Saída: último mês antes da ausência final
+    eventos = {
+        "Entrada": (ausencia & (seq["inicio"] == 0), fim + 1, fim + 1),
+        "Saída": (ausencia & (fim == meses - 1), seq["inicio"] - 1, seq["inicio"] - 1),
+        "Lacuna": (ausencia & (seq["inicio"] > 0) & (fim < meses - 1), seq["inicio"], fim),
+        "Constância": (seq["valor"] & (fim == meses - 1) & (seq["tamanho"] >= meses_constancia), seq["inicio"], fim)
+    }
+
+    periodos = np.array([f"{ano}-{mes:02d}" for ano, mes in zip(cubo["ano"], cubo["mes"])], dtype=object)
+    partes = []
+    for evento, (selecao, mes_inicio, mes_fim) in eventos.items():
+        linha = seq["linha"][selecao]
+        partes.append(pl.DataFrame({
+            "aeroporto": aeroportos[linha_aeroporto[linha]].tolist(),
+            "aeronave": aeronaves[linha_aeronave[linha]].tolist(),
+            "evento": [evento] * len(linha),
+            "periodo_inicio": periodos[mes_inicio[selecao]].tolist(),
+            "periodo_fim": periodos[mes_fim[selecao]].tolist(),
+            "meses": seq["tamanho"][selecao]
+        }, schema_overrides={"aeroporto": pl.Utf8, "aeronave": pl.Utf8, "evento": pl.Utf8,
+                             "periodo_inicio": pl.Utf8, "periodo_fim": pl.Utf8, "meses": pl.Int64}))
+
+    return pl.concat(partes).sort(["aeroporto", "aeronave", "periodo_inicio", "evento"])
+
+def tabela_meses_consecutivos(cubo, aeroportos, aeronaves):
+    """
+    Monta a tabela de meses consecutivos (com e sem operação) das combinações aeroporto-aeronave
+    selecionadas que tiveram ao menos um mês de movimento, direto do cubo de presença.
+
+    Returns:
+        pl.DataFrame: aeroporto, aeronave e as seis estatísticas de estatisticas_sequencias_presenca
+    """
+    presenca, idx_aeroportos, idx_aeronaves = fatiar_cubo_presenca(cubo, aeroportos, aeronaves)
+    presenca = presenca.reshape(-1, cubo["meses"])
+    com_movimento = presenca.any(axis=1)
+
+    par_aeroporto, par_aeronave = np.divmod(np.nonzero(com_movimento)[0], len(idx_aeronaves))
+    estatisticas = estatisticas_sequencias_presenca(presenca[com_movimento])
+
+    return pl.DataFrame({
+        "aeroporto": np.asarray(cubo["aeroportos"])[idx_aeroportos[par_aeroporto]].tolist(),
+        "aeronave": np.asarray(cubo["aeronaves"])[idx_aeronaves[par_aeronave]].tolist(),
+        **estatisticas
+    }, schema_overrides={"aeroporto": pl.Utf8, "aeronave": pl.Utf8})
+
+def combinacoes_presenca(cubo, aeroportos, aeronaves, busca=""):
+    """
+    Lista as combinações aeroporto-aeronave selecionadas com movimento, com seus códigos no cubo e a
+    quantidade de meses com movimento (popcount, sem desempacotar o cubo).
+
+    Args:
+        cubo (dict): Resultado de construir_cubo_presenca
+        aeroportos (list): Aeroportos selecionados
+        aeronaves (list): Aeronaves selecionadas
+        busca (str): Texto para filtrar aeroporto ou aeronave (sem diferenciar maiúsculas)
+
+    Returns:
+        pl.DataFrame: codigo_aeroporto, codigo_aeronave, aeroporto, aeronave e meses_com_movimento
+    """
+    idx_aeroportos = codigos_cubo(cubo["aeroportos"], aeroportos)
+    idx_aeronaves = codigos_cubo(cubo["aeronaves"], aeronaves)
+    meses_com_movimento = contar_meses_presenca(cubo, aeroportos, aeronaves)
+    par_aeroporto, par_aeronave = np.nonzero(meses_com_movimento)
+
+    combinacoes = pl.DataFrame({
+        "codigo_aeroporto": idx_aeroportos[par_aeroporto],
+        "codigo_aeronave": idx_aeronaves[par_aeronave],
+        "aeroporto": np.asarray(cubo["aeroportos"])[idx_aeroportos[par_aeroporto]].tolist(),
+        "aeronave": np.asarray(cubo["aeronaves"])[idx_aeronaves[par_aeronave]].tolist(),
+        "meses_com_movimento": meses_com_movimento[par_aeroporto, par_aeronave]
+    }, schema_overrides={"aeroporto": pl.Utf8, "aeronave": pl.Utf8})
+
+    if busca.strip():
+        termo = busca.strip().upper()
+        combinacoes = combinacoes.filter(
+            pl.col("aeroporto").str.to_uppercase().str.contains(termo, literal=True) |
+            pl.col("aeronave").str.to_uppercase().str.contains(termo, literal=True)
+        )
+    return combinacoes
+
+def pagina_tabela_presenca(cubo, combinacoes, ordenar_por="aeroporto", decrescente=False,
+                           pagina=1, linhas_por_pagina=50, mes_inicial=0, meses_visiveis=12):
+    """
+    Serve uma página da tabela de presença direto do cubo: apenas as linhas da página e os meses da janela
+    visível são desempacotados, de modo que o volume enviado ao navegador não depende do tamanho da seleção.
+
+    Args:
+        cubo (dict): Resultado de construir_cubo_presenca
+        combinacoes (pl.DataFrame): Resultado de combinacoes_presenca (já com a busca aplicada)
+        ordenar_por (str): "aeroporto", "aeronave" ou "meses_com_movimento"
+        decrescente (bool): Ordem decrescente
+        pagina (int): Página (a partir de 1)
+        linhas_por_pagina (int): Linhas por página
+        mes_inicial (int): Posição do primeiro mês visível no eixo de meses do cubo
+        meses_visiveis (int): Quantidade de meses visíveis
+
+    Returns:
+        pl.DataFrame: aeroporto, aeronave, meses_com_movimento e um booleano por mês visível
+    """
+    chaves = [ordenar_por] + [c for c in ("aeroporto", "aeronave") if c != ordenar_por]
+    pagina_atual = (combinacoes
+                    .sort(chaves, descending=[decrescente] + [False] * (len(chaves) - 1))
+                    .slice((pagina - 1) * linhas_por_pagina, linhas_por_pagina))
+
+    # Desempacotar apenas as linhas da página e recortar a janela de meses
+    bits = cubo["bits"][pagina_atual["codigo_aeroporto"].to_numpy(), pagina_atual["codigo_aeronave"].to_numpy()]
+    presenca = np.unpackbits(bits, axis=1, count=cubo["meses"]).astype(bool)[:, mes_inicial:mes_inicial + meses_visiveis]
+    periodos = [f"{ano}-{mes:02d}" for ano, mes in zip(cubo["ano"], cubo["mes"])][mes_inicial:mes_inicial + meses_visiveis]
+
+    return (pagina_atual
+            .drop(["codigo_aeroporto", "codigo_aeronave"])
+            .with_columns([pl.Series(periodo, presenca[:, i]) for i, periodo in enumerate(periodos)]))
+
+def matriz_presenca_combinacoes(cubo, df_combinacoes):
+    """
+    Retorna a matriz de presença (combinações × meses) das combinações aeroporto-aeronave informadas,
+    na mesma ordem das linhas de df_combinacoes, desempacotando apenas essas linhas do cubo.
+    """
+    bits = cubo["bits"][
+        np.searchsorted(cubo["aeroportos"], df_combinacoes["aeroporto"].to_numpy().astype(str)),
+        np.searchsorted(cubo["aeronaves"], df_combinacoes["aeronave"].to_numpy().astype(str))
+    ]
+    return np.unpackbits(bits, axis=1, count=cubo["meses"]).astype(bool)
+
+def estimar_tamanho_presenca(cubo, aeroportos, aeronaves):
+    """
+    Estima, antes de montar tabelas e gráficos, o tamanho da seleção na aba de presença:
+    combinações com movimento (popcount no cubo) × meses.
+
+    Returns:
+        tuple: (combinações com movimento, meses, células)
+    """
+    combinacoes = int(np.count_nonzero(contar_meses_presenca(cubo, aeroportos, aeronaves)))
+    return combinacoes, cubo["meses"], combinacoes * cubo["meses"]
+
+def top_combinacoes_presenca(cubo, df_voos, aeroportos, aeronaves, criterio, k):
+    """
+    Seleciona as k combinações aeroporto-aeronave mais relevantes da seleção, com as estatísticas de
+    meses consecutivos calculadas apenas para as combinações avaliadas.
+
+    No critério "sequencia" o ranking parte de um agregado barato: o máximo de meses consecutivos de uma
+    combinação não passa dos seus meses com movimento (popcount no cubo). As combinações são avaliadas em
+    blocos, em ordem decrescente de meses com movimento, até que nenhuma das restantes possa entrar no top-k.
+    Empates no máximo de meses consecutivos são desfeitos pelos meses com movimento e pelos nomes.
+
+    Args:
+        cubo (dict): Resultado de construir_cubo_presenca
+        df_voos (pl.DataFrame): Voos por aeroporto, aeronave, ano e mês
+        aeroportos (list): Aeroportos selecionados
+        aeronaves (list): Aeronaves selecionadas
+        criterio (str): "movimentos" (soma de quantidade_voos) ou "sequencia" (máximo de meses consecutivos)
+        k (int): Quantidade de combinações
+
+    Returns:
+        pl.DataFrame: aeroporto, aeronave e as seis estatísticas de estatisticas_sequencias_presenca das k
+                      combinações, em ordem de relevância
+    """
+    combinacoes = combinacoes_presenca(cubo, aeroportos, aeronaves)
+
+    def com_estatisticas(parte):
+        bits = cubo["bits"][parte["codigo_aeroporto"].to_numpy(), parte["codigo_aeronave"].to_numpy()]
+        presenca = np.unpackbits(bits, axis=1, count=cubo["meses"]).astype(bool)
+        return parte.with_columns([pl.Series(nome, valores) for nome, valores in estatisticas_sequencias_presenca(presenca).items()])
+
+    if criterio == "sequencia":
+        candidatas = combinacoes.sort(["meses_com_movimento", "aeroporto", "aeronave"], descending=[True, False, False])
+        limite_superior = candidatas["meses_com_movimento"].to_numpy()
+        tamanho_bloco = max(k, 1024)
+        avaliadas = []
+        for inicio in range(0, candidatas.height, tamanho_bloco):
+            avaliadas.append(com_estatisticas(candidatas.slice(inicio, tamanho_bloco)))
+            fim = inicio + tamanho_bloco
+            if fim >= candidatas.height:
+                break
+            maximos = np.concatenate([parte["meses_consecutivos_maximo"].to_numpy() for parte in avaliadas])
+            if len(maximos) >= k and np.partition(maximos, len(maximos) - k)[len(maximos) - k] >= limite_superior[fim]:
+                break
+        ranking = (pl.concat(avaliadas) if avaliadas else com_estatisticas(candidatas)).sort(
+            ["meses_consecutivos_maximo", "meses_com_movimento", "aeroporto", "aeronave"],
+            descending=[True, True, False, False]
+        ).head(k)
+    else:
+        movimentos = (df_voos
+                      .filter(pl.col("aeroporto").is_in(aeroportos) & pl.col("aeronave").is_in(aeronaves))
+                      .group_by(["aeroporto", "aeronave"])
+                      .agg(pl.sum("quantidade_voos").alias("relevancia")))
+        ranking = com_estatisticas(combinacoes
+                                   .join(movimentos, on=["aeroporto", "aeronave"], how="inner")
+                                   .sort(["relevancia", "aeroporto", "aeronave"], descending=[True, False, False])
+                                   .head(k))
+
+    return ranking.select(["aeroporto", "aeronave"] + [c for c in ranking.columns if c.startswith("meses_")
+                                                        and c != "meses_com_movimento"])
+
+# Operadores dos filtros por estatística, no formato exibido nos seletores
+OPERADORES_FILTRO = {
+    "Maior que (>)": lambda coluna, valor: coluna > valor,
+    "Menor que (<)": lambda coluna, valor: coluna < valor,
+    "Igual a (=)": lambda coluna, valor: coluna == valor,
+    "Maior ou igual (≥)": lambda coluna, valor: coluna >= valor,
+    "Menor ou igual (≤)": lambda coluna, valor: coluna <= valor
+}
+
+def compilar_filtro(especificacao):
+    """
+    Compila uma especificação de filtros em uma única expressão Polars (todos os predicados combinados com E),
+    avaliada em uma só passada sobre a tabela.
+
+    Args:
+        especificacao (list): Tuplas (coluna, operador, valor), com operador entre as chaves de OPERADORES_FILTRO
+
+    Returns:
+        pl.Expr: Expressão booleana para DataFrame.filter
+    """
+    return pl.all_horizontal(
+        [pl.lit(True)] + [OPERADORES_FILTRO[operador](pl.col(coluna), valor) for coluna, operador, valor in especificacao]
+    )
+
+def construir_presenca_aeronaves(df_voos, df_faixas):
+    """
+    Constrói a tabela de presença (aeroporto, aeronave, período) com a faixa do aeroporto no ano do período.
+
+    A faixa vem de um único join com a tabela de pertencimento (aeroporto, ano → faixa), de modo que
+    cada período só contém aeroportos que estavam na faixa naquele ano específico.
+
+    Args:
+        df_voos (pl.DataFrame): Voos por aeroporto, aeronave, ano e mês
+        df_faixas (pl.DataFrame): Aeroportos com a coluna faixa_personalizada por ano
+
+    Returns:
+        pl.DataFrame: Registros de voos com as colunas faixa_personalizada, indice_mes e periodo
+    """
+    pertencimento = df_faixas.select(["aeroporto", "ano", "faixa_personalizada"]).unique(subset=["aeroporto", "ano"])
+
+    return (df_voos
+            .join(pertencimento, on=["aeroporto", "ano"], how="inner")
+            .with_columns([
+                (pl.col("ano") * 12 + pl.col("mes") - 1).alias("indice_mes"),
+                (pl.col("ano").cast(pl.Utf8) + "-M" + pl.col("mes").cast(pl.Utf8)).alias("periodo")
+            ]))
+
+def janela_movel_bits(bits, janela_meses):
+    """
+    Presença em janela móvel sobre bits empacotados ao longo dos aeroportos (meses no penúltimo eixo):
+    um bit fica ligado se esteve ligado em algum dos `janela_meses` meses encerrados em cada posição.
+    O OU é feito byte a byte, sem desempacotar.
+    """
+    na_janela = bits.copy()
+    for deslocamento in range(1, min(janela_meses, bits.shape[-2])):
+        na_janela[..., deslocamento:, :] |= bits[..., :-deslocamento, :]
+    return na_janela
+
+def calcular_percentual_aeroportos_por_aeronave(cubo, df_faixas, janela_meses=1):
+    """
+    Calcula, a partir do cubo de presença, o percentual de aeroportos de cada faixa que utilizam cada aeronave por período.
+
+    Cada aeroporto é atribuído, em cada mês, à sua faixa naquele ano. O total da faixa considera os aeroportos
+    com movimentos de qualquer aeronave no mês. Com janela_meses > 1 o período passa a ser o último mês de
+    uma janela móvel: a aeronave é considerada utilizada se teve movimentos no aeroporto em algum mês da
+    janela enquanto ele estava na faixa. Só entram janelas completas.
+
+    A contagem usa a presença empacotada ao longo dos aeroportos (cubo["bits_aeroportos"]): o pertencimento
+    às faixas é empacotado da mesma forma, combinado por E bit a bit e contado por popcount, sem desempacotar
+    o cubo.
+
+    Args:
+        cubo (dict): Resultado de construir_cubo_presenca
+        df_faixas (pl.DataFrame): Aeroportos com a coluna faixa_personalizada por ano
+        janela_meses (int): Quantidade de meses da janela (1 = mensal)
+
+    Returns:
+        pl.DataFrame: faixa_personalizada, periodo, aeronave, aeroportos_usando, total_aeroportos e percentual
+    """
+    faixas = sorted(df_faixas["faixa_personalizada"].unique().to_list())
+    anos = np.unique(cubo["ano"])
+
+    # Faixa (código) de cada aeroporto em cada mês; -1 quando o aeroporto não tem faixa no ano
+    pertencimento = df_faixas.filter(
+        pl.col("aeroporto").is_in(cubo["aeroportos"]) & pl.col("ano").is_in(anos.tolist())
+    )
+    faixa_aeroporto_ano = np.full((len(cubo["aeroportos"]), len(anos)), -1, dtype=np.int64)
+    faixa_aeroporto_ano[
+        np.searchsorted(cubo["aeroportos"], pertencimento["aeroporto"].to_numpy()),
+        np.searchsorted(anos, pertencimento["ano"].to_numpy())
+    ] = np.searchsorted(faixas, pertencimento["faixa_personalizada"].to_numpy())
+    faixa_aeroporto_mes = faixa_aeroporto_ano[:, np.searchsorted(anos, cubo["ano"])]
+
+    # Pertencimento de cada faixa por mês, empacotado ao longo dos aeroportos (faixas × meses × bytes)
+    membros = np.packbits(faixa_aeroporto_mes.T[None, :, :] == np.arange(len(faixas))[:, None, None], axis=2)
+    usando = cubo["bits_aeroportos"][None, :, :, :] & membros[:, None, :, :]
+    registrados = np.bitwise_or.reduce(cubo["bits_aeroportos"], axis=0)[None, :, :] & membros
+    if janela_meses > 1:
+        usando = janela_movel_bits(usando, janela_meses)
+        registrados = janela_movel_bits(registrados, janela_meses)
+
+    primeiro_mes = janela_meses - 1 if janela_meses > 1 else 0
+    aeroportos_usando = POPCOUNT_BYTE[usando].sum(axis=-1, dtype=np.int64)[:, :, primeiro_mes:]
+    total_aeroportos = POPCOUNT_BYTE[registrados].sum(axis=-1, dtype=np.int64)[:, primeiro_mes:]
+
+    aeronaves = np.asarray(cubo["aeronaves"])
+    periodos = np.char.add(np.char.add(cubo["ano"].astype(str), "-M"), cubo["mes"].astype(str))[primeiro_mes:]
+    idx_faixa, idx_aeronave, idx_mes = np.nonzero(aeroportos_usando)
+
+    return (pl.DataFrame({
+                "faixa_personalizada": np.asarray(faixas, dtype=object)[idx_faixa].tolist(),
+                "indice_mes": idx_mes,
+                "periodo": periodos[idx_mes].tolist(),
+                "aeronave": aeronaves[idx_aeronave].tolist(),
+                "aeroportos_usando": aeroportos_usando[idx_faixa, idx_aeronave, idx_mes],
+                "total_aeroportos": total_aeroportos[idx_faixa, idx_mes]
+            }, schema_overrides={"faixa_personalizada": pl.Utf8, "periodo": pl.Utf8, "aeronave": pl.Utf8,
+                                 "aeroportos_usando": pl.Int64, "total_aeroportos": pl.Int64})
+            .with_columns((pl.col("aeroportos_usando") / pl.col("total_aeroportos") * 100).alias("percentual"))
+            .sort(["faixa_personalizada", "indice_mes", "aeronave"])
+            .drop("indice_mes"))
+
+def construir_curva_acumulada_categorias(df_joined, categorias):
+    """
+    Constrói uma única vez a curva acumulada de movimentos e passageiros por categoria de aeronave.
+
+    Os aeroportos-ano são ordenados pelos passageiros projetados e os movimentos e passageiros de cada
+    categoria são acumulados ao longo desses níveis. Qualquer conjunto de limites é respondido depois por
+    indexação na curva, sem refiltrar ou reagrupar os dados.
+
+    Args:
+        df_joined (pl.DataFrame): Aeroportos-ano com passageiros_projetado, categoria_aeronave, quantidade_voos e pax
+        categorias (list): Categorias na ordem das colunas da curva
+
+    Returns:
+        dict: niveis (passageiros distintos ordenados), voos e pax acumulados por categoria (uma linha inicial
+        zerada e uma por nível), totais acumulados e os aeroportos-ano ordenados por passageiros
+    """
+    base = df_joined.filter(pl.col("passageiros_projetado").is_not_null())
+    niveis = base["passageiros_projetado"].unique().sort().to_numpy()
+
+    # Categorias fora da lista ficam em uma coluna extra, que só entra nos totais
+    codigo_categoria = {categoria: i for i, categoria in enumerate(categorias)}
+    num_colunas = len(categorias) + 1
+    codigos = np.array(
+        [codigo_categoria.get(c, len(categorias)) for c in base["categoria_aeronave"].to_list()], dtype=np.int64
+    )
+    celulas = np.searchsorted(niveis, base["passageiros_projetado"].to_numpy()) * num_colunas + codigos
+
+    def acumular(coluna):
+        por_nivel = np.bincount(
+            celulas, weights=base[coluna].to_numpy().astype(np.float64), minlength=len(niveis) * num_colunas
+        ).reshape(len(niveis), num_colunas)
+        return np.vstack([np.zeros((1, num_colunas)), np.cumsum(por_nivel, axis=0)])
+
+    voos = acumular("quantidade_voos")
+    pax = acumular("pax")
+    aeroportos_ano = base.select("aeroporto", "ano", "passageiros_projetado").unique().sort("passageiros_projetado")
+
+    return {
+        "niveis": niveis,
+        "categorias": list(categorias),
+        "voos": voos[:, :-1],
+        "pax": pax[:, :-1],
+        "voos_total": voos.sum(axis=1),
+        "pax_total": pax.sum(axis=1),
+        "pax_aeroportos": aeroportos_ano["passageiros_projetado"].to_numpy(),
+        "aeroportos": aeroportos_ano["aeroporto"].to_list()
+    }
+
+def indice_curva_categorias(curva, limites):
+    """Posição na curva acumulada que reúne os aeroportos-ano com passageiros até cada limite."""
+    return np.searchsorted(curva["niveis"], np.asarray(limites, dtype=np.float64), side="right")
+
+def participacao_categorias_intervalos(curva, limites):
+    """
+    Calcula a composição por categoria em cada intervalo de passageiros a partir da curva acumulada.
+
+    O intervalo i reúne os aeroportos-ano com passageiros em (limites[i], limites[i+1]]; o último intervalo
+    inclui tudo acima do seu limite inferior. Intervalos sem movimentos são descartados.
+
+    Args:
+        curva (dict): Resultado de construir_curva_acumulada_categorias
+        limites (list): Limites crescentes, começando pelo limite inferior do primeiro intervalo
+
+    Returns:
+        pl.DataFrame: categoria_aeronave, voos_categoria, passageiros_categoria, percentual_voos,
+        percentual_passageiros e limite_passageiros (limite superior do intervalo)
+    """
+    inferior = indice_curva_categorias(curva, limites[:-1])
+    superior = np.append(indice_curva_categorias(curva, limites[1:-1]), len(curva["niveis"]))
+
+    voos = curva["voos"][superior] - curva["voos"][inferior]
+    pax = curva["pax"][superior] - curva["pax"][inferior]
+    voos_total = curva["voos_total"][superior] - curva["voos_total"][inferior]
+    pax_total = curva["pax_total"][superior] - curva["pax_total"][inferior]
+
+    validos = np.nonzero(voos_total > 0)[0]
+    num_categorias = len(curva["categorias"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percentual_pax = np.where(pax_total[:, None] > 0, pax / pax_total[:, None] * 100, 0.0)
+
+    return pl.DataFrame({
+        "categoria_aeronave": curva["categorias"] * len(validos),
+        "voos_categoria": voos[validos].ravel().round().astype(np.int64),
+        "passageiros_categoria": pax[validos].ravel().round().astype(np.int64),
+        "percentual_voos": (voos[validos] / voos_total[validos, None] * 100).ravel(),
+        "percentual_passageiros": percentual_pax[validos].ravel(),
+        "limite_passageiros": np.repeat(np.asarray(limites[1:], dtype=np.float64)[validos], num_categorias)
+    }, schema_overrides={"categoria_aeronave": pl.Utf8})
+
+def aeroportos_intervalo_curva(curva, limite_inferior, limite_superior=None):
+    """Lista ordenada dos aeroportos com passageiros em (limite_inferior, limite_superior] na curva acumulada."""
+    pax_aeroportos = curva["pax_aeroportos"]
+    inicio = np.searchsorted(pax_aeroportos, limite_inferior, side="right")
+    fim = len(pax_aeroportos) if limite_superior is None else np.searchsorted(pax_aeroportos, limite_superior, side="right")
+    return sorted(set(curva["aeroportos"][inicio:fim]))
+
+def curva_continua_categorias(curva, pontos=1000):
+    """
+    Amostra a participação acumulada de cada categoria em pontos log-espaçados de passageiros.
+
+    Em cada ponto x a participação considera todos os aeroportos-ano com até x passageiros, de modo que a
+    curva em alta resolução custa apenas uma indexação por ponto.
+
+    Args:
+        curva (dict): Resultado de construir_curva_acumulada_categorias
+        pontos (int): Quantidade de pontos da curva
+
+    Returns:
+        pl.DataFrame: categoria_aeronave, limite_passageiros, percentual_voos e percentual_passageiros
+    """
+    niveis = curva["niveis"]
+    positivos = niveis[niveis > 0]
+    if len(positivos) == 0:
+        return pl.DataFrame(schema={"categoria_aeronave": pl.Utf8, "limite_passageiros": pl.Float64,
+                                    "percentual_voos": pl.Float64, "percentual_passageiros": pl.Float64})
+
+    x = np.unique(np.geomspace(positivos[0], niveis[-1], pontos))
+    indices = indice_curva_categorias(curva, x)
+    voos_total = curva["voos_total"][indices][:, None]
+    pax_total = curva["pax_total"][indices][:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percentual_voos = np.where(voos_total > 0, curva["voos"][indices] / voos_total * 100, np.nan)
+        percentual_pax = np.where(pax_total > 0, curva["pax"][indices] / pax_total * 100, np.nan)
+
+    num_categorias = len(curva["categorias"])
+    return pl.DataFrame({
+        "categoria_aeronave": curva["categorias"] * len(x),
+        "limite_passageiros": np.repeat(x, num_categorias),
+        "percentual_voos": percentual_voos.ravel(),
+        "percentual_passageiros": percentual_pax.ravel()
+    }, schema_overrides={"categoria_aeronave": pl.Utf8}).drop_nans()
+
+def construir_cubo_capacidade(df_voos, df_faixas):
+    """
+    Pré-calcula a camada de capacidade por faixa, aeroporto, aeronave e mês
+
+    Cada aeroporto é atribuído, em cada ano, à sua faixa naquele ano. Os passageiros de aeronaves sem
+    moda_assentos conhecida ficam fora do aproveitamento (pax_com_assentos) para não inflar a razão.
+
+    Args:
+        df_voos (pl.DataFrame): Voos com a dimensão de aeronaves anexada (assentos_oferecidos)
+        df_faixas (pl.DataFrame): Aeroportos com a coluna faixa_personalizada por ano
+
+    Returns:
+        pl.DataFrame: faixa_personalizada, aeroporto, aeronave, ano, mes, movimentos, pax,
+        assentos_oferecidos e pax_com_assentos
+    """
+    return (df_voos
+            .join(df_faixas.select(["aeroporto", "ano", "faixa_personalizada"]).unique(subset=["aeroporto", "ano"]),
+                  on=["aeroporto", "ano"], how="inner")
+            .group_by(["faixa_personalizada", "aeroporto", "aeronave", "ano", "mes"])
+            .agg([
+                pl.sum("quantidade_voos").alias("movimentos"),
+                pl.sum("pax"),
+                pl.sum("assentos_oferecidos"),
+                pl.col("pax").filter(pl.col("assentos_oferecidos") > 0).sum().alias("pax_com_assentos")
+            ])
+            .sort(["faixa_personalizada", "aeroporto", "aeronave", "ano", "mes"]))
+
+def agregar_capacidade(df_capacidade, por, participacao_em=None):
+    """
+    Agrega o cubo de capacidade nas chaves pedidas e calcula aproveitamento e participações
+
+    Args:
+        df_capacidade (pl.DataFrame): Resultado (filtrado ou não) de construir_cubo_capacidade
+        por (list): Colunas de agrupamento (ex.: ["aeronave"], ["aeroporto"], ["ano", "mes", "aeronave"])
+        participacao_em (list): Colunas dentro das quais as participações somam 100% (padrão: todo o recorte)
+
+    Returns:
+        pl.DataFrame: chaves, movimentos, pax, assentos_oferecidos, aproveitamento (pax / assentos),
+        participacao_assentos e participacao_movimentos (em %)
+    """
+    particao = participacao_em or []
+    def participacao(coluna):
+        total = pl.col(coluna).sum().over(particao) if particao else pl.col(coluna).sum()
+        return (pl.col(coluna) / total * 100).fill_nan(0)
+
+    return (df_capacidade
+            .group_by(por)
+            .agg(pl.sum("movimentos"), pl.sum("pax"), pl.sum("assentos_oferecidos"), pl.sum("pax_com_assentos"))
+            .with_columns([
+                pl.when(pl.col("assentos_oferecidos") > 0)
+                  .then(pl.col("pax_com_assentos") / pl.col("assentos_oferecidos"))
+                  .otherwise(None)
+                  .alias("aproveitamento"),
+                participacao("assentos_oferecidos").alias("participacao_assentos"),
+                participacao("movimentos").alias("participacao_movimentos")
+            ])
+            .drop("pax_com_assentos")
+            .sort(por))
+
+def perfil_pista_por_faixa(df_voos, df_faixas, percentis=(50, 75, 90, 95), participacao_minima_critica=0.0):
+    """
+    Distribuição da pista requerida (Pista_Requerida_100%) ponderada por movimentos, por faixa e ano
+
+    Uma única passada agrega os movimentos por faixa, ano e aeronave (com a pista vinda da dimensão de
+    aeronaves já anexada aos voos). Aeronaves sem pista conhecida ficam fora da distribuição e são
+    reportadas em movimentos_sem_pista.
+
+    Args:
+        df_voos (pl.DataFrame): Voos com a dimensão de aeronaves anexada
+        df_faixas (pl.DataFrame): Aeroportos com a coluna faixa_personalizada por ano
+        percentis (tuple): Percentis (0-100) da pista requerida ponderada por movimentos
+        participacao_minima_critica (float): Participação mínima (0-1) nos movimentos da faixa-ano para a
+            aeronave concorrer a aeronave crítica, descartando operações esporádicas
+
+    Returns:
+        tuple: (resumo, distribuicao)
+            resumo: faixa, ano, movimentos, movimentos_sem_pista, pista_media, pista_pNN, pista_critica,
+                    aeronave_critica e movimentos_aeronave_critica
+            distribuicao: faixa, ano, pista_requerida, movimentos, participacao e acumulado (0-1)
+    """
+    por_aeronave = (df_voos
+                    .join(df_faixas.select(["aeroporto", "ano", "faixa_personalizada"]).unique(subset=["aeroporto", "ano"]),
+                          on=["aeroporto", "ano"], how="inner")
+                    .group_by(["faixa_personalizada", "ano", "aeronave"])
+                    .agg([
+                        pl.sum("quantidade_voos").alias("movimentos"),
+                        pl.first("Pista_Requerida_100%").alias("pista_requerida")
+                    ]))
+    chaves = ["faixa_personalizada", "ano"]
+    com_pista = por_aeronave.filter((pl.col("pista_requerida") > 0) & (pl.col("movimentos") > 0))
+
+    distribuicao = (com_pista
+                    .group_by(chaves + ["pista_requerida"])
+                    .agg(pl.sum("movimentos"))
+                    .sort(chaves + ["pista_requerida"])
+                    .with_columns((pl.col("movimentos") / pl.col("movimentos").sum().over(chaves)).alias("participacao"))
+                    .with_columns(pl.col("participacao").cum_sum().over(chaves).alias("acumulado")))
+
+    # Percentil ponderado: menor pista cuja participação acumulada atinge o percentil
+    resumo_pista = distribuicao.group_by(chaves).agg(
+        [(pl.col("pista_requerida") * pl.col("participacao")).sum().round(0).alias("pista_media")]
+        + [pl.col("pista_requerida").filter(pl.col("acumulado") >= p / 100 - 1e-9).first().alias(f"pista_p{p}")
+           for p in percentis]
+    )
+
+    # Aeronave crítica: maior pista requerida (empate: mais movimentos) entre as de participação mínima
+    criticas = (com_pista
+                .filter(pl.col("movimentos") / pl.col("movimentos").sum().over(chaves) >= participacao_minima_critica)
+                .sort(["pista_requerida", "movimentos"], descending=True)
+                .group_by(chaves)
+                .agg([
+                    pl.first("pista_requerida").alias("pista_critica"),
+                    pl.first("aeronave").alias("aeronave_critica"),
+                    pl.first("movimentos").alias("movimentos_aeronave_critica")
+                ]))
+
+    resumo = (por_aeronave
+              .group_by(chaves)
+              .agg([
+                  pl.sum("movimentos"),
+                  pl.col("movimentos").filter(pl.col("pista_requerida") <= 0).sum().alias("movimentos_sem_pista")
+              ])
+              .join(resumo_pista, on=chaves, how="left")
+              .join(criticas, on=chaves, how="left")
+              .sort(chaves))
+
+    return resumo, distribuicao
+
+def construir_base_aeronave_critica(df_pax, df_voos):
+    """
+    Pré-agrega por aeroporto-ano-aeronave os insumos da determinação da aeronave crítica
+
+    Independe da configuração de faixas: cada configuração só reclassifica os aeroportos-ano pelos
+    passageiros (E + D) e reagrupa esta base.
+
+    Args:
+        df_pax (pl.DataFrame): Passageiros (E + D) por aeroporto e ano
+        df_voos (pl.DataFrame): Voos com a dimensão de aeronaves anexada
+
+    Returns:
+        dict: "uso" (aeroporto, ano, aeronave, valor_y, movimentos, meses_com_movimento, pista_requerida,
+        moda_assentos), "aeroportos" (aeroporto, ano, passageiros_projetado) e "meses_por_ano" (ano, meses_no_ano)
+    """
+    uso = (df_voos
+           .filter(pl.col("quantidade_voos") > 0)
+           .group_by(["aeroporto", "ano", "aeronave"])
+           .agg([
+               (pl.col("quantidade_voos") * pl.col("pax")).sum().alias("valor_y"),
+               pl.sum("quantidade_voos").alias("movimentos"),
+               pl.col("mes").n_unique().alias("meses_com_movimento"),
+               pl.first("Pista_Requerida_100%").alias("pista_requerida"),
+               pl.first("moda_assentos")
+           ]))
+    return {
+        "uso": uso,
+        "aeroportos": df_pax.select(["aeroporto", "ano", "passageiros_projetado"]).unique(subset=["aeroporto", "ano"]),
+        "meses_por_ano": df_voos.group_by("ano").agg(pl.col("mes").n_unique().alias("meses_no_ano"))
+    }
+
+def determinar_aeronaves_criticas(base, bins, meses_minimos=6, participacao_minima_y=0.0005, aeroportos_minimos=0.3):
+    """
+    Classifica as aeronaves candidatas a crítica de cada faixa e ano
+
+    Para cada faixa-ano e aeronave são calculados a participação Y (movimentos × pax), os aeroportos da
+    faixa que usam a aeronave (e os que a usam com constância, em pelo menos `meses_minimos` meses do ano)
+    e a constância mensal (meses com movimento ÷ meses do ano, média entre os aeroportos que a usam).
+    É candidata a aeronave com participação Y e fração de aeroportos constantes acima dos mínimos; a
+    aeronave crítica é a candidata de maior pista requerida (empate: mais assentos, maior participação Y).
+
+    Args:
+        base (dict): Resultado de construir_base_aeronave_critica
+        bins (list): Limites das faixas (mesmo formato de faixas_padrao['bins'])
+        meses_minimos (int): Meses com movimento no ano para o uso no aeroporto ser constante
+        participacao_minima_y (float): Participação Y mínima (0-1) na faixa-ano; descarta aeronaves sem
+            passageiros (cargueiras) e operações residuais
+        aeroportos_minimos (float): Fração mínima (0-1) dos aeroportos da faixa com uso constante
+
+    Returns:
+        tuple: (candidatas, resumo)
+            candidatas: uma linha por faixa, ano e aeronave com os critérios, posições e a marcação de candidata
+            resumo: uma linha por faixa e ano com a aeronave crítica e as demais candidatas
+    """
+    aeroportos = base["aeroportos"].with_columns(
+        pl.Series("faixa", rotulos_faixas(base["aeroportos"]["passageiros_projetado"].to_numpy(), bins), dtype=pl.Utf8)
+    )
+    return classificar_aeronaves_criticas(base, aeroportos, ["faixa", "ano"], meses_minimos, participacao_minima_y,
+                                          aeroportos_minimos)
+
+def classificar_aeronaves_criticas(base, aeroportos, chaves, meses_minimos, participacao_minima_y, aeroportos_minimos):
+    """
+    Núcleo de determinar_aeronaves_criticas sobre aeroportos-ano já rotulados
+
+    Args:
+        base (dict): Resultado de construir_base_aeronave_critica
+        aeroportos (pl.DataFrame): aeroporto, ano e as colunas de `chaves` (faixa e, opcionalmente, configuracao)
+        chaves (list): Colunas que definem o grupo (ex.: ["faixa", "ano"])
+
+    Returns:
+        tuple: (candidatas, resumo), como em determinar_aeronaves_criticas, agrupados por `chaves`
+    """
+    aeroportos_faixa = aeroportos.group_by(chaves).agg(pl.len().alias("aeroportos_faixa"))
+
+    candidatas = (base["uso"]
+                  .join(aeroportos.select(["aeroporto"] + chaves), on=["aeroporto", "ano"], how="inner")
+                  .join(base["meses_por_ano"], on="ano", how="left")
+                  .group_by(chaves + ["aeronave"])
+                  .agg([
+                      pl.sum("valor_y"),
+                      pl.sum("movimentos"),
+                      pl.len().alias("aeroportos_usando"),
+                      (pl.col("meses_com_movimento") >= meses_minimos).sum().alias("aeroportos_constantes"),
+                      (pl.col("meses_com_movimento") / pl.col("meses_no_ano")).mean().alias("constancia_mensal"),
+                      pl.first("pista_requerida"),
+                      pl.first("moda_assentos")
+                  ])
+                  .join(aeroportos_faixa, on=chaves, how="left")
+                  .with_columns([
+                      (pl.col("valor_y") / pl.col("valor_y").sum().over(chaves)).alias("participacao_y"),
+                      (pl.col("aeroportos_constantes") / pl.col("aeroportos_faixa")).alias("fracao_aeroportos_constantes")
+                  ])
+                  .with_columns([
+                      pl.col("participacao_y").rank("min", descending=True).over(chaves).alias("posicao_y"),
+                      pl.col("aeroportos_usando").rank("min", descending=True).over(chaves).alias("posicao_aeroportos"),
+                      pl.col("constancia_mensal").rank("min", descending=True).over(chaves).alias("posicao_constancia"),
+                      ((pl.col("participacao_y") >= participacao_minima_y)
+                       & (pl.col("fracao_aeroportos_constantes") >= aeroportos_minimos)).alias("candidata")
+                  ])
+                  .sort(chaves + ["candidata", "pista_requerida", "moda_assentos", "participacao_y"],
+                        descending=[False] * len(chaves) + [True, True, True, True]))
+
+    resumo = (candidatas
+              .filter(pl.col("candidata"))
+              .group_by(chaves, maintain_order=True)
+              .agg([
+                  pl.first("aeronave").alias("aeronave_critica"),
+                  pl.first("pista_requerida"),
+                  pl.first("participacao_y"),
+                  pl.first("aeroportos_constantes"),
+                  pl.first("aeroportos_faixa"),
+                  pl.first("constancia_mensal"),
+                  pl.col("aeronave").slice(1, 3).str.join(" / ").alias("proximas_candidatas"),
+                  pl.len().alias("candidatas")
+              ]))
+    resumo = (aeroportos_faixa
+              .join(resumo.drop("aeroportos_faixa"), on=chaves, how="left")
+              .with_columns(pl.col("candidatas").fill_null(0))
+              .sort(chaves))
+
+    return candidatas, resumo
+
+def determinar_criticas_configuracoes(base, configuracoes, meses_minimos=6, participacao_minima_y=0.0005,
+                                      aeroportos_minimos=0.3):
+    """
+    Determina a aeronave crítica de cada faixa e ano para várias configurações de faixas de uma só vez
+
+    Os aeroportos-ano são rotulados em cada configuração (rotulos_faixas) e empilhados, e as agregações
+    rodam uma única vez com a configuração como chave adicional.
+
+    Args:
+        base (dict): Resultado de construir_base_aeronave_critica
+        configuracoes (dict): {nome da configuração: bins}
+
+    Returns:
+        pl.DataFrame: O resumo de determinar_aeronaves_criticas com a coluna configuracao
+    """
+    nomes = list(configuracoes.keys())
+    pax = base["aeroportos"]["passageiros_projetado"].to_numpy()
+    aeroportos = pl.concat([
+        base["aeroportos"].select(["aeroporto", "ano"]).with_columns([
+            pl.lit(nome, dtype=pl.Enum(nomes)).alias("configuracao"),
+            pl.Series("faixa", rotulos_faixas(pax, configuracoes[nome]), dtype=pl.Utf8)
+        ])
+        for nome in nomes
+    ])
+
+    _, resumo = classificar_aeronaves_criticas(base, aeroportos, ["configuracao", "faixa", "ano"], meses_minimos,
+                                               participacao_minima_y, aeroportos_minimos)
+    return resumo.with_columns(pl.col("configuracao").cast(pl.Utf8))
+
+def gerar_relatorio_faixas(df_pax, indice_pax, base_critica, eventos, df_clusters, bins, ano, tolerancia=10,
+                           meses_ausencia=3, parametros_critica=(6, 0.0005, 0.3)):
+    """
+    Gera o resumo das faixas (conteúdo do resumo_faixas_atualizadas.txt) para uma configuração de faixas e um ano
+
+    Os insumos pesados (índice de passageiros, base da aeronave crítica, eventos de serviço e clusters k-means)
+    são recebidos prontos, para que a aplicação repasse os resultados que já tem em cache; as seções do resumo
+    são calculadas em sequência e reunidas em uma linha por faixa.
+
+    Args:
+        df_pax (pl.DataFrame): Passageiros (E + D) por aeroporto e ano
+        indice_pax (dict): Resultado de construir_indice_pax
+        base_critica (dict): Resultado de construir_base_aeronave_critica
+        eventos (pl.DataFrame): Resultado de detectar_eventos_servico calculado com `meses_ausencia`
+        df_clusters (pl.DataFrame): Resultado de agrupar_aeroportos_kmeans (passageiros e movimentos)
+        bins (list): Limites das faixas (mesmo formato de faixas_padrao['bins'])
+        ano (int): Ano de referência do resumo
+        tolerancia (float): Margem (± %) em torno de cada limite superior para os aeroportos próximos do limite
+        meses_ausencia (int): Meses sem operação que caracterizam um serviço descontinuado (texto do resumo)
+        parametros_critica (tuple): (meses_minimos, participacao_minima_y, aeroportos_minimos) da aeronave crítica
+
+    Returns:
+        tuple: (df_relatorio, markdown)
+            df_relatorio: uma linha por faixa com limites, aeroportos, aeronave crítica, aeroportos próximos do
+                          limite superior, serviços descontinuados e clusters
+            markdown: texto do resumo, no formato do resumo manual
+    """
+    labels = faixas_a_partir_de_limites(bins[1:-1])['labels']
+    df_pax_ano = df_pax.filter(pl.col("ano") == ano).select(["aeroporto", "passageiros_projetado"])
+    faixa_aeroporto = df_pax_ano.with_columns(
+        pl.Series("faixa", rotulos_faixas(df_pax_ano["passageiros_projetado"].to_numpy(), bins), dtype=pl.Utf8)
+    )
+
+    indice_ano = indice_pax.get(ano, {"pax": np.array([]), "aeroportos": np.array([])})
+
+    def secao_limites():
+        return pl.DataFrame({
+            "faixa": labels,
+            "limite_inferior": [float(b) for b in bins[:-1]],
+            "limite_superior": [float(b) for b in bins[1:]]
+        }).join(
+            faixa_aeroporto.group_by("faixa").agg([
+                pl.len().alias("aeroportos"),
+                pl.min("passageiros_projetado").alias("pax_minimo"),
+                pl.max("passageiros_projetado").alias("pax_maximo")
+            ]),
+            on="faixa", how="left"
+        ).with_columns(pl.col("aeroportos").fill_null(0))
+
+    def secao_proximos_limites():
+        linhas = []
+        for faixa, limite in zip(labels, bins[1:-1]):
+            proximos = aeroportos_proximos_limite(indice_ano, limite, tolerancia)
+            rotulos = [f"{a} ({d:+.1f}%)" for a, d in zip(proximos["aeroporto"], proximos["distancia_percentual"])]
+            acima = (proximos["posicao"] == "Acima do limite").to_list()
+            linhas.append({
+                "faixa": faixa,
+                "proximos_abaixo_limite": [r for r, a in zip(rotulos, acima) if not a],
+                "proximos_acima_limite": [r for r, a in zip(rotulos, acima) if a]
+            })
+        return pl.DataFrame(linhas, schema={"faixa": pl.Utf8, "proximos_abaixo_limite": pl.List(pl.Utf8),
+                                            "proximos_acima_limite": pl.List(pl.Utf8)})
+
+    def secao_criticas():
+        _, resumo = determinar_aeronaves_criticas(base_critica, bins, *parametros_critica)
+        return resumo.filter(pl.col("ano") == ano).select(["faixa", "aeronave_critica", "proximas_candidatas"])
+
+    def secao_descontinuados():
+        return (eventos
+                .filter((pl.col("evento") == "Saída") & (pl.col("aeronave") == "Todas")
+                        & (pl.col("periodo_inicio") >= f"{ano}-01"))
+                .join(faixa_aeroporto.select(["aeroporto", "faixa"]), on="aeroporto", how="inner")
+                .sort(["faixa", "periodo_inicio", "aeroporto"])
+                .group_by("faixa", maintain_order=True)
+                .agg((pl.col("aeroporto") + " (" + pl.col("periodo_inicio") + ")").alias("servicos_descontinuados")))
+
+    def secao_clusters():
+        # Máximo de passageiros de cada cluster em todos os anos analisados
+        pax_maximo_cluster = df_clusters.group_by("cluster").agg(pl.max("passageiros_projetado").alias("pax_maximo_cluster"))
+        return (df_clusters
+                .filter(pl.col("ano") == ano)
+                .select(["aeroporto", "cluster"])
+                .join(faixa_aeroporto.select(["aeroporto", "faixa"]), on="aeroporto", how="inner")
+                .group_by("faixa")
+                .agg([
+                    pl.col("cluster").unique().sort().alias("clusters"),
+                    pl.col("cluster").mode().sort().first().alias("cluster_predominante")
+                ])
+                .join(pax_maximo_cluster, left_on="cluster_predominante", right_on="cluster", how="left"))
+
+    df_relatorio = secao_limites()
+    for secao in [secao_proximos_limites, secao_criticas, secao_descontinuados, secao_clusters]:
+        df_relatorio = df_relatorio.join(secao(), on="faixa", how="left")
+    df_relatorio = df_relatorio.with_columns([
+        pl.lit(ano, dtype=pl.Int64).alias("ano"),
+        pl.col("servicos_descontinuados").fill_null([]),
+        pl.col("proximos_abaixo_limite").fill_null([]),
+        pl.col("proximos_acima_limite").fill_null([])
+    ])
+
+    # Texto no formato do resumo manual
+    linhas = [f"# Resumo das Faixas - {ano}", ""]
+    for faixa in df_relatorio.iter_rows(named=True):
+        nome = faixa["faixa"].replace("_", " ")
+        linhas.append(f"## {nome}")
+        linhas.append(f"- {formatar_limite_pax(faixa['limite_inferior'])} a {formatar_limite_pax(faixa['limite_superior'])}")
+        if faixa["aeronave_critica"]:
+            candidatas = f" (demais candidatas: {faixa['proximas_candidatas']})" if faixa["proximas_candidatas"] else ""
+            linhas.append(f"- Aeronave crítica: {faixa['aeronave_critica']}{candidatas}")
+        else:
+            linhas.append("- Aeronave crítica: nenhuma candidata com uso constante")
+        if faixa["aeroportos"]:
+            linhas.append(f"- {faixa['aeroportos']} aeroportos em {ano}, com pax entre "
+                          f"{formatar_numero(faixa['pax_minimo'])} e {formatar_numero(faixa['pax_maximo'])}")
+        else:
+            linhas.append(f"- Nenhum aeroporto em {ano}")
+        if faixa["limite_superior"] != float('inf'):
+            proximos = faixa["proximos_abaixo_limite"] + faixa["proximos_acima_limite"]
+            linhas.append(f"- Aeroportos a ±{tolerancia:g}% do limite superior ({formatar_limite_pax(faixa['limite_superior'])}): "
+                          + (", ".join(proximos) if proximos else "nenhum"))
+        if faixa["servicos_descontinuados"]:
+            linhas.append(f"- Serviços descontinuados (sem operação há {meses_ausencia}+ meses): "
+                          + ", ".join(faixa["servicos_descontinuados"]))
+        if faixa["clusters"] is not None and len(faixa["clusters"]) > 0:
+            linhas.append(f"- Clusters k-means (passageiros e movimentos) dos aeroportos: {', '.join(map(str, faixa['clusters']))}; "
+                          f"no cluster predominante ({faixa['cluster_predominante']}), todos os aeroportos-ano têm pax até "
+                          f"{formatar_numero(faixa['pax_maximo_cluster'])}")
+        linhas.append("")
+
+    return df_relatorio, "\n".join(linhas)
+
+# Projeção
+def projetar_sarimax(series_historica, passos=24):
+    """
+    Projeta uma série mensal com auto_arima sazonal (m=12), com fallbacks para poucos dados
+
+    Args:
+        series_historica (pd.Series): Valores indexados por data (início do mês); datas repetidas são somadas
+        passos (int): Meses a projetar
+
+    Returns:
+        pd.Series: Histórico completo (mensal) seguido da projeção
+    """
+    # Agrupar por data para somar duplicatas (vários aeroportos)
+    series_grouped = series_historica.groupby(level=0).sum()
+    series_full = series_grouped.asfreq('MS').fillna(0)
+
+    # Validação: se tiver poucos dados ou for tudo zero
+    if len(series_full) < 12 or float(series_full.sum()) == 0:
+        media_recente = series_full.iloc[-6:].mean() if len(series_full) > 0 else 0
+        idx_futuro = pd.date_range(series_full.index[-1] + pd.DateOffset(months=1), periods=passos, freq='MS')
+        forecast = pd.Series([media_recente] * passos, index=idx_futuro)
+        return pd.concat([series_full, forecast])
+
+    try:
+        # Usando auto_arima para otimização
+        model = pm.auto_arima(
+            series_full, seasonal=True, m=12, trace=False, 
+            error_action='ignore', suppress_warnings=True, stepwise=True,
+            max_p=2, max_q=2, max_P=1, max_Q=1
+        )
+        forecast_values = model.predict(n_periods=passos)
+        idx_futuro = pd.date_range(series_full.index[-1] + pd.DateOffset(months=1), periods=passos, freq='MS')
+        forecast_series = pd.Series(forecast_values, index=idx_futuro).clip(lower=0)
+        return pd.concat([series_full, forecast_series])
+
+    except Exception:
+        try:
+            from statsmodels.tsa.holtwinters import SimpleExpSmoothing
+            model_fallback = SimpleExpSmoothing(series_full).fit()
+            forecast_values = model_fallback.forecast(passos)
+            return pd.concat([series_full, forecast_values])
+        except:
+            idx_futuro = pd.date_range(series_full.index[-1] + pd.DateOffset(months=1), periods=passos, freq='MS')
+            forecast = pd.Series([series_full.mean()] * passos, index=idx_futuro)
+            return pd.concat([series_full, forecast])
@@ -0,0 +1,233 @@
+"""
+Processamento em lote das saídas da análise de faixas, sem a interface do Streamlit.
+
+Calcula, para todos os cenários de faixas e todos os anos, as tabelas que a
+aplicação mostra nas abas (distribuição por faixa, explorador de faixas,
+participação das categorias de aeronave e estatísticas de presença) e grava
+cada uma particionada por cenário e ano:
+
+    <saida>/<tabela>/cenario=<nome>/ano=<ano>/dados.<parquet|csv|xlsx>
+
+As bases são lidas uma única vez, no processo principal, e repassadas aos
+processos do pool. Cada tarefa processa um ano com todos os cenários, de
+modo que o cubo de presença do ano é construído uma vez por ano.
+
+Exemplo:
+    python processar_lote.py --saida saida_lote --formatos parquet csv --excluir-padrao \\
+        --cenarios faixas_kmeans_k8.json
+"""
+import argparse
+import importlib.util
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import polars as pl
+
+import motor_faixas
+
+TABELAS = (
+    "distribuicao",
+    "explorador_faixas",
+    "participacao_categorias",
+    "presenca_meses_consecutivos",
+    "percentual_aeroportos_aeronave",
+)
+
+# Bases repassadas pelo processo principal (preenchidas por inicializar_processo)
+_BASE = {}
+
+
+def carregar_base(caminho_aeroportos, caminho_voos, caminho_specs, excluir_padrao=False):
+    """
+    Lê as bases uma única vez e aplica a dimensão de aeronaves e as exclusões, como na aplicação
+
+    Com excluir_padrao, os aeroportos padrão da aplicação são excluídos em todos os anos da base.
+
+    Returns:
+        dict: pax, voos (filtrados), faixas_padrao, anos (todos os anos da base) e aeroportos_excluidos
+    """
+    aeroporto_pax, voos, faixas_padrao = motor_faixas.carregar_dados(caminho_aeroportos, caminho_voos)
+    specs = motor_faixas.carregar_specs_aeronaves(caminho_specs)
+    voos = motor_faixas.anexar_dimensao_aeronaves(voos, motor_faixas.construir_dimensao_aeronaves(voos, specs))
+    anos = sorted(aeroporto_pax["ano"].unique().to_list())
+    anos_exclusao = {aeroporto: anos for aeroporto in motor_faixas.AEROPORTOS_PADRAO_EXCLUSAO} if excluir_padrao else {}
+    df_voos, df_pax = motor_faixas.aplicar_exclusoes(aeroporto_pax, voos, anos_exclusao)
+    return {
+        "pax": df_pax,
+        "voos": df_voos,
+        "faixas_padrao": faixas_padrao,
+        "anos": anos,
+        "aeroportos_excluidos": sorted(anos_exclusao)
+    }
+
+
+def inicializar_processo(base):
+    """Inicializador do pool: recebe as bases já carregadas pelo processo principal"""
+    _BASE.update(base)
+
+
+def montar_cenarios(base, arquivos_cenarios):
+    """
+    Monta os cenários de faixas: faixas padrão, quantis com a mesma quantidade de limites e arquivos JSON
+
+    Os arquivos JSON seguem o formato exportado pela aplicação ({'bins': [..., "inf"], 'labels': [...]}).
+
+    Returns:
+        dict: {nome: {'bins': [...], 'labels': [...]}}
+    """
+    faixas_padrao = base["faixas_padrao"]
+    num_limites = len(faixas_padrao["bins"]) - 2
+    pax_ordenado = motor_faixas.construir_esboco_quantis(base["pax"])["todos"]
+
+    cenarios = {
+        "faixas_padrao": faixas_padrao,
+        "quantis_quantidade": motor_faixas.faixas_a_partir_de_limites(
+            motor_faixas.limites_por_quantis(pax_ordenado, num_limites, "quantidade")),
+        "quantis_logaritmico": motor_faixas.faixas_a_partir_de_limites(
+            motor_faixas.limites_por_quantis(pax_ordenado, num_limites, "logaritmico")),
+    }
+    for caminho in arquivos_cenarios:
+        with open(caminho, encoding="utf-8") as arquivo:
+            configuracao = json.load(arquivo)
+        bins = [float("inf") if b == "inf" else b for b in configuracao["bins"]]
+        faixas = motor_faixas.faixas_a_partir_de_limites(bins[1:-1])
+        faixas["labels"] = configuracao.get("labels", faixas["labels"])
+        nome = re.sub(r"[^\w\-]+", "_", os.path.splitext(os.path.basename(caminho))[0])
+        cenarios[nome] = faixas
+    return cenarios
+
+
+def calcular_saidas(base, faixas, ano, cubo_ano):
+    """
+    Calcula as tabelas de um cenário de faixas em um ano
+
+    Args:
+        base (dict): Resultado de carregar_base
+        faixas (dict): Configuração com 'bins' e 'labels'
+        ano (int): Ano de referência
+        cubo_ano (dict): Cubo de presença dos voos do ano (construir_cubo_presenca)
+
+    Returns:
+        dict: {tabela: pl.DataFrame}
+    """
+    df_com_faixas = motor_faixas.aplicar_faixas_personalizadas(base["pax"].filter(pl.col("ano") == ano), faixas)
+    faixa_aeroporto = df_com_faixas.select(["aeroporto", "faixa_personalizada"])
+    saidas = {}
+
+    # Aba 1: distribuição e explorador de faixas
+    saidas["distribuicao"] = motor_faixas.distribuicao_por_faixa(df_com_faixas, por=("faixa_personalizada",))
+    saidas["explorador_faixas"] = (df_com_faixas
+                                   .select(["faixa_personalizada", "aeroporto", "passageiros_projetado"])
+                                   .sort(["faixa_personalizada", "passageiros_projetado", "aeroporto"],
+                                         descending=[False, True, False])
+                                   .with_columns(pl.int_range(1, pl.len() + 1).over("faixa_personalizada").alias("posicao")))
+
+    # Aba 2: participação das categorias por faixa (mesmos limites da aba)
+    df_joined = df_com_faixas.join(base["voos"].filter(pl.col("ano") == ano), on=["aeroporto", "ano"], how="left").with_columns(
+        pl.col("quantidade_voos").fill_null(0),
+        pl.col("pax").fill_null(0)
+    )
+    categorias = motor_faixas.ORDEM_CATEGORIAS + sorted(set(df_joined["categoria_aeronave"].drop_nulls().unique().to_list()) -
+                                                        set(motor_faixas.ORDEM_CATEGORIAS))
+    thresholds = faixas["bins"][1:-1]
+    limite_final = motor_faixas.LIMITE_FINAL_CATEGORIAS
+    limites = [0] + thresholds + [limite_final if not thresholds or limite_final > thresholds[-1] else thresholds[-1] * 1.05]
+    curva = motor_faixas.construir_curva_acumulada_categorias(df_joined, categorias)
+    saidas["participacao_categorias"] = (motor_faixas.participacao_categorias_intervalos(curva, limites)
+                                         .join(pl.DataFrame({"limite_passageiros": [float(l) for l in limites[1:]],
+                                                             "faixa_personalizada": faixas["labels"]}),
+                                               on="limite_passageiros", how="left"))
+
+    # Aba 3: estatísticas de presença no ano e percentual de aeroportos da faixa por aeronave (mensal, só
+    # meses do ano: o cubo do ano basta)
+    saidas["presenca_meses_consecutivos"] = (motor_faixas.tabela_meses_consecutivos(cubo_ano, None, None)
+                                             .join(faixa_aeroporto, on="aeroporto", how="left"))
+    saidas["percentual_aeroportos_aeronave"] = motor_faixas.calcular_percentual_aeroportos_por_aeronave(
+        cubo_ano, df_com_faixas
+    )
+    return saidas
+
+
+def escrever_tabela(df, saida, tabela, cenario, ano, formatos):
+    """Grava uma partição (tabela, cenário, ano) em cada formato pedido"""
+    pasta = os.path.join(saida, tabela, f"cenario={cenario}", f"ano={ano}")
+    os.makedirs(pasta, exist_ok=True)
+    for formato in formatos:
+        caminho = os.path.join(pasta, f"dados.{formato}")
+        if formato == "parquet":
+            df.write_parquet(caminho)
+        elif formato == "csv":
+            df.write_csv(caminho)
+        else:
+            df.write_excel(caminho, worksheet=tabela[:31])
+
+
+def processar_ano(ano, cenarios, saida, formatos):
+    """Tarefa do pool: constrói o cubo de presença do ano e calcula e grava as tabelas de todos os cenários"""
+    inicio = time.perf_counter()
+    cubo_ano = motor_faixas.construir_cubo_presenca(_BASE["voos"].filter(pl.col("ano") == ano))
+    linhas = {}
+    for cenario, faixas in cenarios.items():
+        saidas = calcular_saidas(_BASE, faixas, ano, cubo_ano)
+        for tabela, df in saidas.items():
+            escrever_tabela(df, saida, tabela, cenario, ano, formatos)
+        linhas[cenario] = sum(df.height for df in saidas.values())
+    return ano, linhas, time.perf_counter() - inicio
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Calcula em lote as saídas da análise de faixas para todos os anos e cenários.")
+    parser.add_argument("--saida", default="saida_lote", help="Pasta de saída (padrão: saida_lote)")
+    parser.add_argument("--formatos", nargs="+", choices=["parquet", "csv", "xlsx"], default=["parquet"],
+                        help="Formatos de gravação (padrão: parquet)")
+    parser.add_argument("--cenarios", nargs="*", default=[],
+                        help="Arquivos JSON de faixas exportados pela aplicação, além dos cenários padrão e de quantis")
+    parser.add_argument("--anos", nargs="*", type=int, help="Anos a processar (padrão: todos)")
+    parser.add_argument("--excluir-padrao", action="store_true",
+                        help="Exclui os aeroportos padrão da aplicação em todos os anos")
+    parser.add_argument("--processos", type=int, default=os.cpu_count(), help="Quantidade de processos do pool")
+    parser.add_argument("--dados-aeroportos", default="faixas_aeroportos_2.parquet")
+    parser.add_argument("--dados-voos", default="voos_por_aeronave_aeroporto_mes4.parquet")
+    parser.add_argument("--specs", default="especificacoes_aeronave_2.parquet")
+    args = parser.parse_args(argumentos)
+
+    if "xlsx" in args.formatos and importlib.util.find_spec("xlsxwriter") is None:
+        parser.error("o formato xlsx requer o pacote xlsxwriter (pip install xlsxwriter)")
+
+    inicio = time.perf_counter()
+    base = carregar_base(args.dados_aeroportos, args.dados_voos, args.specs, args.excluir_padrao)
+    anos = [ano for ano in base["anos"] if not args.anos or ano in args.anos]
+    cenarios = montar_cenarios(base, args.cenarios)
+
+    os.makedirs(args.saida, exist_ok=True)
+    with open(os.path.join(args.saida, "cenarios.json"), "w", encoding="utf-8") as arquivo:
+        json.dump({
+            "cenarios": {nome: {"bins": faixas["bins"][:-1] + ["inf"], "labels": faixas["labels"]} for nome, faixas in cenarios.items()},
+            "anos": anos,
+            "aeroportos_excluidos": base["aeroportos_excluidos"]
+        }, arquivo, ensure_ascii=False, indent=2)
+
+    processos = max(1, min(args.processos, len(anos)))
+    print(f"{len(cenarios)} cenários x {len(anos)} anos = {len(cenarios) * len(anos)} partições em {processos} processos (um ano por tarefa)")
+
+    # spawn: o polars não é seguro com fork; as bases já carregadas seguem uma vez para cada processo
+    with ProcessPoolExecutor(
+        max_workers=processos,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=inicializar_processo,
+        initargs=(base,)
+    ) as executor:
+        futuros = [executor.submit(processar_ano, ano, cenarios, args.saida, args.formatos) for ano in anos]
+        for concluidas, futuro in enumerate(as_completed(futuros), start=1):
+            ano, linhas, duracao = futuro.result()
+            print(f"[{concluidas}/{len(anos)}] {ano}: {len(linhas)} cenários, {sum(linhas.values())} linhas em {duracao:.2f}s")
+
+    print(f"Concluído em {time.perf_counter() - inicio:.1f}s -> {os.path.abspath(args.saida)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,55 +2,50 @@ import streamlit as st
 import polars as pl
 import plotly.express as px
 import plotly.graph_objects as go
+import functools
 import hashlib
+import io
+import json
 import locale
+import os
+import time
 import pandas as pd
 import numpy as np
 import statsmodels.api as sm
-import pmdarima as pm
-
-# ----------------------------------------------------------
-
-def gerar_meses_futuros(ultimo_periodo, meses_a_adicionar=24):
-    """Gera lista de strings 'YYYY-Mmm' para os próximos N meses."""
-    ano_atual, mes_atual = map(int, ultimo_periodo.split("-M"))
-    futuros = []
-    
-    for _ in range(meses_a_adicionar):
-        mes_atual += 1
-        if mes_atual > 12:
-            mes_atual = 1
-            ano_atual += 1
-        futuros.append(f"{ano_atual}-M{str(mes_atual).zfill(2)}")
-    
-    return futuros
-
-# Função para formatar números com separador de milhares usando ponto
-def formatar_numero(numero, casas_decimais=0):
-    """
-    Formata um número com separador de milhares usando ponto (.) em vez de vírgula (,)
-    
-    Args:
-        numero (int, float): Número a ser formatado
-        casas_decimais (int): Número de casas decimais (padrão: 0)
-    
-    Returns:
-        str: Número formatado com separador de milhares usando ponto
-    """
-    if numero is None or (isinstance(numero, float) and numero != numero):  # Verifica NaN
-        return "0"
-    
-    # Converter para float se necessário
-    numero_float = float(numero)
-    
-    # Formatar com separador de milhares usando ponto
-    if casas_decimais == 0:
-        # Para números inteiros
-        return f"{numero_float:,.0f}".replace(",", ".")
-    else:
-        # Para números com casas decimais
-        return f"{numero_float:,.{casas_decimais}f}".replace(",", ".")
-
+from contextlib import contextmanager
+from datetime import datetime
+from motor_faixas import (
+    AEROPORTOS_PADRAO_EXCLUSAO,
+    ORDEM_CATEGORIAS,
+    LIMITE_FINAL_CATEGORIAS,
+    aplicar_exclusoes,
+    formatar_numero,
+    aeroportos_proximos_limite,
+    curva_sensibilidade_limites,
+    consultar_indice_prefixo_ponderado,
+    limites_entre_clusters,
+    faixas_a_partir_de_limites,
+    aplicar_faixas_personalizadas,
+    distribuicao_por_faixa,
+    limites_por_quantis,
+    parametros_sliders_faixas,
+    passo_local_slider,
+    avaliar_estabilidade_faixas,
+    avaliar_configuracoes_estabilidade,
+    tabela_meses_consecutivos,
+    combinacoes_presenca,
+    pagina_tabela_presenca,
+    matriz_presenca_combinacoes,
+    estimar_tamanho_presenca,
+    top_combinacoes_presenca,
+    compilar_filtro,
+    participacao_categorias_intervalos,
+    aeroportos_intervalo_curva,
+    curva_continua_categorias,
+    agregar_capacidade,
+    determinar_aeronaves_criticas,
+)
+import motor_faixas
 
 # Configuração da página
 st.set_page_config(
@@ -85,6 +80,136 @@ if not st.session_state.authenticated:
     login()
     st.stop()
 
+# --- DESEMPENHO ---
+# Arquivo JSONL onde cada rerun acrescenta suas medições (uma linha por seção, subseção e etapa do motor)
+ARQUIVO_METRICAS_DESEMPENHO = os.environ.get("ARQUIVO_METRICAS_DESEMPENHO", "metricas_desempenho.jsonl")
+
+# Tamanho máximo do arquivo de métricas; ao ultrapassá-lo, o arquivo vira <arquivo>.1 (substituindo o anterior)
+LIMITE_BYTES_METRICAS = int(os.environ.get("LIMITE_BYTES_METRICAS", 5_000_000))
+
+def desempenho_habilitado():
+    """
+    Painel e gravação das métricas são restritos a administradores: habilitados pela variável de ambiente
+    MEDIR_DESEMPENHO=1 ou por `habilitado = true` na seção [desempenho] do secrets.toml
+    """
+    if os.environ.get("MEDIR_DESEMPENHO") == "1":
+        return True
+    try:
+        return bool(st.secrets.get("desempenho", {}).get("habilitado", False))
+    except FileNotFoundError:
+        return False
+
+MEDIR_DESEMPENHO = desempenho_habilitado()
+
+# Registro do rerun atual; o script é reexecutado do início a cada interação, então ele recomeça vazio
+desempenho_rerun = {
+    "inicio": time.perf_counter(),
+    "secao_aberta": None,
+    "secoes": [],
+    "etapas": {}
+}
+
+def marcar_secao(nome, linhas=None):
+    """Encerra a seção em andamento e inicia a seção 'nome' (None apenas encerra) no registro do rerun"""
+    agora = time.perf_counter()
+    aberta = desempenho_rerun["secao_aberta"]
+    if aberta is not None:
+        aberta["duracao_ms"] = (agora - aberta.pop("inicio")) * 1000
+        desempenho_rerun["secoes"].append(aberta)
+    desempenho_rerun["secao_aberta"] = None if nome is None else {
+        "tipo": "secao", "secao": nome, "inicio": agora, "linhas": linhas
+    }
+
+def registrar_linhas(linhas):
+    """Soma linhas processadas à seção em andamento"""
+    aberta = desempenho_rerun["secao_aberta"]
+    if aberta is not None:
+        aberta["linhas"] = (aberta["linhas"] or 0) + int(linhas)
+
+@contextmanager
+def medir_secao(nome, linhas=None):
+    """Mede um trecho dentro da seção em andamento (ex.: laço de projeções), registrado como subseção"""
+    aberta = desempenho_rerun["secao_aberta"]
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        desempenho_rerun["secoes"].append({
+            "tipo": "subsecao",
+            "secao": f"{aberta['secao']} › {nome}" if aberta else nome,
+            "duracao_ms": (time.perf_counter() - inicio) * 1000,
+            "linhas": linhas
+        })
+
+def etapa_em_cache(funcao):
+    """
+    Aplica st.cache_data a uma etapa do motor contando, no rerun, as chamadas e as execuções reais (cache miss)
+
+    O functools.wraps preserva módulo, nome e código-fonte da etapa, que formam a chave do cache do Streamlit.
+    """
+    def registro_etapa():
+        return desempenho_rerun["etapas"].setdefault(funcao.__name__, {"chamadas": 0, "execucoes": 0, "duracao_ms": 0.0})
+
+    @functools.wraps(funcao)
+    def executar(*args, **kwargs):
+        inicio = time.perf_counter()
+        resultado = funcao(*args, **kwargs)
+        etapa = registro_etapa()
+        etapa["execucoes"] += 1
+        etapa["duracao_ms"] += (time.perf_counter() - inicio) * 1000
+        return resultado
+
+    em_cache = st.cache_data(executar)
+
+    @functools.wraps(funcao)
+    def chamar(*args, **kwargs):
+        registro_etapa()["chamadas"] += 1
+        return em_cache(*args, **kwargs)
+
+    return chamar
+
+def registrar_metricas_desempenho(caminho=ARQUIVO_METRICAS_DESEMPENHO):
+    """
+    Encerra o registro do rerun e, com a medição habilitada, acrescenta suas medições ao arquivo JSONL
+    (rotacionado ao passar de LIMITE_BYTES_METRICAS)
+
+    Returns:
+        dict: Registro do rerun com rerun_ms (duração total) e momento
+    """
+    marcar_secao(None)
+    desempenho_rerun["rerun_ms"] = (time.perf_counter() - desempenho_rerun["inicio"]) * 1000
+    desempenho_rerun["momento"] = datetime.now().isoformat(timespec="seconds")
+
+    linhas = [{"tipo": "rerun", "secao": "Rerun completo", "duracao_ms": desempenho_rerun["rerun_ms"]}]
+    linhas += desempenho_rerun["secoes"]
+    linhas += [{"tipo": "etapa_motor", "secao": nome, **etapa} for nome, etapa in desempenho_rerun["etapas"].items()]
+    if not MEDIR_DESEMPENHO:
+        return desempenho_rerun
+    try:
+        if os.path.exists(caminho) and os.path.getsize(caminho) > LIMITE_BYTES_METRICAS:
+            os.replace(caminho, f"{caminho}.1")
+        with open(caminho, "a", encoding="utf-8") as arquivo:
+            for linha in linhas:
+                arquivo.write(json.dumps({"momento": desempenho_rerun["momento"], **linha}, ensure_ascii=False) + "\n")
+    except OSError:
+        pass
+    return desempenho_rerun
+
+def historico_desempenho(caminho=ARQUIVO_METRICAS_DESEMPENHO):
+    """p50/p95 por seção a partir do arquivo JSONL de métricas (None se ainda não houver histórico)"""
+    if not os.path.exists(caminho):
+        return None
+    return (pl.read_ndjson(caminho, schema={"tipo": pl.Utf8, "secao": pl.Utf8, "duracao_ms": pl.Float64})
+            .filter(pl.col("tipo") != "etapa_motor")
+            .group_by(["tipo", "secao"])
+            .agg([
+                pl.len().alias("medicoes"),
+                pl.col("duracao_ms").quantile(0.5).alias("p50_ms"),
+                pl.col("duracao_ms").quantile(0.95).alias("p95_ms"),
+                pl.col("duracao_ms").max().alias("max_ms")
+            ])
+            .sort("p95_ms", descending=True))
+
 # Função para gerar cores consistentes para aeronaves
 @st.cache_data
 def gerar_paleta_cores_aeronaves():
@@ -123,64 +248,69 @@ def obter_cor_aeronave(aeronave, todas_aeronaves):
         indice_cor = hash_aeronave % len(cores_paleta)
         return cores_paleta[indice_cor]
 
-@st.cache_data
-def carregar_dados():
-    aeroporto_pax = pl.read_parquet("faixas_aeroportos_2.parquet").with_columns(
-        pl.col("ano").cast(pl.Int64)
-    )
-
-    # Carregar dados de voos (arquivo já contém coluna 'mes')
-    voos_aeroporto_aeronave = pl.read_parquet("voos_por_aeronave_aeroporto_mes4.parquet").with_columns([
-        pl.col("ano").cast(pl.Int64),
-        pl.col("mes").cast(pl.Int64)
-    ]).filter(
-        ~((pl.col("ano") == 2025) & (pl.col("mes") >= 11)))
-
-    # Calcular o total de passageiros (pax) do DW por aeroporto e ano
-    pax_dw = (voos_aeroporto_aeronave
-              .group_by(["aeroporto", "ano"])
-              .agg(pl.sum("pax").alias("passageiros_dw")))
-
-    # Juntar os dados de pax do DW com o DataFrame principal de aeroportos
-    aeroporto_pax = aeroporto_pax.join(pax_dw, on=["aeroporto", "ano"], how="left")
-
-    # Atualizar a coluna de passageiros:
-    # - Usar 'passageiros_dw' para anos < 2025. Se for nulo (sem voos), será 0.
-    # - Manter 'passageiros_projetado' para 2025
-    aeroporto_pax = aeroporto_pax.with_columns(
-        pl.when(pl.col("ano") < 2025)
-        .then(pl.col("passageiros_dw"))
-        .otherwise(pl.col("passageiros_projetado"))
-        .alias("passageiros_atualizado")
-    ).drop("passageiros_projetado", "passageiros_dw").rename({"passageiros_atualizado": "passageiros_projetado"}).with_columns(
-        pl.col("passageiros_projetado").fill_null(0) # Preencher nulos com 0
-    )
-
-    faixas_padrao = {
-    'bins': [0, 5000, 20000, 60000, 200000, 400000, 1000000, 2000000, 5000000, 10000000, 15000000, float('inf')],
-    'labels': ['Faixa_AvG', 'Faixa_1', 'Faixa_2', 'Faixa_3', 'Faixa_4', 'Faixa_5', 'Faixa_6', 'Faixa_7', 'Faixa_8', 'Faixa_9', 'Faixa_10']
-}
-    return aeroporto_pax, voos_aeroporto_aeronave, faixas_padrao
+# Etapas caras do motor de cálculo (motor_faixas), com cache do Streamlit e contagem de cache hit/miss
+carregar_dados = etapa_em_cache(motor_faixas.carregar_dados)
+construir_dimensao_aeronaves = etapa_em_cache(motor_faixas.construir_dimensao_aeronaves)
+anexar_dimensao_aeronaves = etapa_em_cache(motor_faixas.anexar_dimensao_aeronaves)
+construir_indice_pax = etapa_em_cache(motor_faixas.construir_indice_pax)
+construir_indice_prefixo_ponderado = etapa_em_cache(motor_faixas.construir_indice_prefixo_ponderado)
+construir_features_aeroportos = etapa_em_cache(motor_faixas.construir_features_aeroportos)
+agrupar_aeroportos_kmeans = etapa_em_cache(motor_faixas.agrupar_aeroportos_kmeans)
+construir_esboco_quantis = etapa_em_cache(motor_faixas.construir_esboco_quantis)
+construir_base_estabilidade = etapa_em_cache(motor_faixas.construir_base_estabilidade)
+construir_cubo_presenca = etapa_em_cache(motor_faixas.construir_cubo_presenca)
+detectar_eventos_servico = etapa_em_cache(motor_faixas.detectar_eventos_servico)
+construir_presenca_aeronaves = etapa_em_cache(motor_faixas.construir_presenca_aeronaves)
+calcular_percentual_aeroportos_por_aeronave = etapa_em_cache(motor_faixas.calcular_percentual_aeroportos_por_aeronave)
+construir_curva_acumulada_categorias = etapa_em_cache(motor_faixas.construir_curva_acumulada_categorias)
+construir_cubo_capacidade = etapa_em_cache(motor_faixas.construir_cubo_capacidade)
+perfil_pista_por_faixa = etapa_em_cache(motor_faixas.perfil_pista_por_faixa)
+construir_base_aeronave_critica = etapa_em_cache(motor_faixas.construir_base_aeronave_critica)
+determinar_criticas_configuracoes = etapa_em_cache(motor_faixas.determinar_criticas_configuracoes)
+gerar_relatorio_faixas = etapa_em_cache(motor_faixas.gerar_relatorio_faixas)
+# Projeção por aeronave: a chave do cache são os valores da série e a quantidade de passos
+projetar_sarimax = etapa_em_cache(motor_faixas.projetar_sarimax)
 
 def carregar_specs_aeronaves():
     try:
-        # Carrega o arquivo parquet especificado
-        df = pl.read_parquet("especificacoes_aeronave_2.parquet")
-        
-        # Garante a tipagem correta das colunas numéricas para ordenação
-        df = df.with_columns([
-            pl.col("moda_assentos").cast(pl.Int64).fill_null(0),
-            pl.col("Pista_Requerida_100%").cast(pl.Int64).fill_null(0)
-        ])
-        return df
+        return motor_faixas.carregar_specs_aeronaves()
     except Exception as e:
         st.error(f"Erro ao carregar especificacoes_aeronave_2.parquet: {e}")
         return None
-    
+
+# Quantidades de faixas numeradas aceitas pela configuração personalizada (seletor "Quantidade de Faixas")
+OPCOES_QUANTIDADE_FAIXAS = [3, 4, 5, 6, 7, 8, 9, 10, 11]
+
+def aplicar_limites_nos_sliders(limites):
+    """
+    Callback: carrega os limites informados nos sliders da configuração personalizada de faixas
+
+    Uma quantidade de limites fora das opções do seletor não é aplicada; o aviso fica em session_state
+    e é exibido na configuração de faixas.
+    """
+    if len(limites) not in OPCOES_QUANTIDADE_FAIXAS:
+        st.session_state['aviso_limites_sliders'] = (
+            f"⚠️ **Limites não aplicados:** a configuração tem {len(limites)} limites, mas os sliders aceitam de "
+            f"{OPCOES_QUANTIDADE_FAIXAS[0]} a {OPCOES_QUANTIDADE_FAIXAS[-1]} faixas numeradas."
+        )
+        return
+    st.session_state['usar_faixas_personalizadas'] = True
+    st.session_state['num_faixas'] = len(limites)
+    for i, limite in enumerate(limites):
+        st.session_state[f'slider_faixa_{i}'] = int(limite)
+        st.session_state[f'num_faixa_{i}'] = int(limite)
+
 # Carregar dados e mostrar informações de debug
+marcar_secao("Carregamento dos dados")
 aeroporto_pax, voos_aeroporto_aeronave, faixas_padrao = carregar_dados()
 df_specs = carregar_specs_aeronaves()
 
+# Dimensão de aeronaves (chave inteira, categoria, assentos e pista) anexada uma única vez à base de voos
+dimensao_aeronaves = construir_dimensao_aeronaves(voos_aeroporto_aeronave, df_specs)
+voos_aeroporto_aeronave = anexar_dimensao_aeronaves(voos_aeroporto_aeronave, dimensao_aeronaves)
+categoria_por_aeronave = dict(dimensao_aeronaves.select("aeronave", "categoria_aeronave").iter_rows())
+registrar_linhas(aeroporto_pax.height + voos_aeroporto_aeronave.height)
+
 # Filtrar dados para remover período 2025-T4
 # Aplicar filtro apenas ao DataFrame que possui coluna "mês"
 
@@ -188,6 +318,7 @@ df_specs = carregar_specs_aeronaves()
 # aeroporto_pax não possui coluna "mês", então não precisa deste filtro específico
 
  #--- SIDEBAR (BARRA LATERAL) PARA FILTROS ---
+marcar_secao("Barra lateral e filtros de exclusão")
 st.sidebar.header("📊 Informações dos Dados")
 st.sidebar.markdown("*Dados disponíveis para análise:*")
 
@@ -210,12 +341,7 @@ if 'anos_exclusao' not in st.session_state:
 st.sidebar.markdown("### 🚫 **Exclusão de Aeroportos**")
 
 # Definir a lista de aeroportos padrão para exclusão
-aeroportos_padrao_exclusao = [
-    'SBGV', 'SBIL', 'SBJV', 'SBKG', 'SBME', 'SBML', 'SBPB', 'SBPP', 'SBRJ', 
-    'SBRP', 'SBSM', 'SBSP', 'SBSR', 'SBTC', 'SBTE', 'SBUA', 'SBUG', 'SBUR', 
-    'SBUY', 'SIRI', 'SISO', 'SNCL', 'SNRJ', 'SNTI', 'SSCT', 'SSUV', 'SWCA', 
-    'SBJR', 'SBMI', 'SBCO', 'SBSJ', 'SBIP'
-]
+aeroportos_padrao_exclusao = AEROPORTOS_PADRAO_EXCLUSAO
 
 # Botão para selecionar os padrões
 if st.sidebar.button("Selecionar Exclusões Padrão"):
@@ -265,46 +391,20 @@ if aeroportos_excluidos:
         else:
             st.sidebar.success(f"**{aeroporto}**: Nenhum ano selecionado (não será excluído)")
 
-# Aplicar filtros de exclusão
-# Para df_filtrado1 (voos_aeroporto_aeronave) - tem coluna ano
-condicoes_exclusao1 = []
-for aeroporto in aeroportos_excluidos:
-    anos_exclusao = st.session_state['anos_exclusao'].get(aeroporto, [])
-    if anos_exclusao:
-        # Excluir aeroporto nos anos selecionados
-        condicao = ~((pl.col("aeroporto") == aeroporto) & (pl.col("ano").is_in(anos_exclusao)))
-        condicoes_exclusao1.append(condicao)
-
-# Adicionar filtro para excluir aeronave E110
-condicoes_exclusao1.append(pl.col("aeronave") != "E110")
-
-if condicoes_exclusao1:
-    # Combinar todas as condições com AND
-    condicao_final1 = condicoes_exclusao1[0]
-    for condicao in condicoes_exclusao1[1:]:
-        condicao_final1 = condicao_final1 & condicao
-    df_filtrado1 = voos_aeroporto_aeronave.filter(condicao_final1)
-else:
-    df_filtrado1 = voos_aeroporto_aeronave
-
-# Para df_filtrado2 (aeroporto_pax) - tem coluna ano
-condicoes_exclusao2 = []
-for aeroporto in aeroportos_excluidos:
-    anos_exclusao = st.session_state['anos_exclusao'].get(aeroporto, [])
-    if anos_exclusao:
-        # Excluir aeroporto nos anos selecionados
-        condicao = ~((pl.col("aeroporto") == aeroporto) & (pl.col("ano").is_in(anos_exclusao)))
-        condicoes_exclusao2.append(condicao)
-
-if condicoes_exclusao2:
-    # Combinar todas as condições com AND
-    condicao_final2 = condicoes_exclusao2[0]
-    for condicao in condicoes_exclusao2[1:]:
-        condicao_final2 = condicao_final2 & condicao
-    df_filtrado2 = aeroporto_pax.filter(condicao_final2)
-else:
-    df_filtrado2 = aeroporto_pax
+# Aplicar filtros de exclusão (df_filtrado1: voos, df_filtrado2: passageiros)
+df_filtrado1, df_filtrado2 = aplicar_exclusoes(
+    aeroporto_pax,
+    voos_aeroporto_aeronave,
+    {aeroporto: st.session_state['anos_exclusao'].get(aeroporto, []) for aeroporto in aeroportos_excluidos}
+)
+
+registrar_linhas(df_filtrado1.height + df_filtrado2.height)
 
+# Cubo de presença aeroporto × aeronave × mês compartilhado pelas abas
+marcar_secao("Cubo de presença", df_filtrado1.height)
+cubo_presenca = construir_cubo_presenca(df_filtrado1)
+
+marcar_secao("Cabeçalho")
 
 # Título principal
 st.title("⚙️ Configurador de Faixas de Aeroportos atualizado - PAN")
@@ -321,6 +421,10 @@ with st.expander("ℹ️ **Sobre esta Aplicação**", expanded=False):
     - 📈 **Evolução de Movimentos**: Acompanhe a evolução de movimentos (P + D) por aeronave para aeroportos em uma determinada faixa.
     - ✈️ **Utilização de Aeronaves**: Analise o percentual de aeroportos em uma faixa que utilizam cada tipo de aeronave.
     - 🔍 **Exploração Detalhada**: Explore a lista de aeroportos, movimentos e passageiros por faixa, ano, e aeronave.
+    - ⚖️ **Sensibilidade dos Limites**: Veja quais aeroportos mudariam de faixa se cada limite variasse dentro de uma tolerância (± % ou ± Pax).
+    - 🧭 **Descoberta de Faixas por Clusterização**: Agrupe os aeroportos por passageiros, movimentos e mix de frota (k-means) e aplique os limites entre os clusters nos sliders.
+    - 📐 **Faixas por Quantis**: Gere limites com a mesma quantidade de aeroportos por faixa ou espaçados em escala logarítmica e aplique-os nos sliders.
+    - 🧪 **Estabilidade das Faixas**: Compare configurações pela homogeneidade do mix de frota e da aeronave crítica em cada ano e entre os anos.
 
     **Aba "Análise por Categoria":**
     - 📈 **Análise Cumulativa de Frota**: Visualize a participação de voos de cada categoria de aeronave à medida que o total de passageiros se acumula em um determinado ano.
@@ -336,6 +440,7 @@ with st.expander("ℹ️ **Sobre esta Aplicação**", expanded=False):
     - 🔢 **Filtros de Meses Consecutivos**: Filtre por operadores (maior que, menor que, igual a, etc.) com valores personalizados.
     - 📊 **Gráfico de Presença**: Visualize presença de movimentos (0/1) ao longo do tempo para cada combinação aeroporto-aeronave.
     - 🎯 **Exclusão Automática**: Remove automaticamente combinações sem movimento para análise mais focada.
+    - 🚦 **Entradas, Saídas e Lacunas**: Identifique automaticamente inícios e descontinuações de serviço, interrupções longas e operação constante por aeroporto e aeronave.
     
     **💡 Dicas de Uso:**
     - Navegue entre as três abas para diferentes perspectivas de análise.
@@ -353,8 +458,18 @@ st.markdown("---")
 tab1, tab2, tab3 = st.tabs(["📊 Análise de Faixas", "✈️ Análise por Categoria", "📋 Presença de Movimentos"])
 
 with tab1:
+    # Esboço de quantis de passageiros (E + D), pré-calculado uma vez e reutilizado pelos sliders
+    esboco_quantis = construir_esboco_quantis(df_filtrado2)
+    parametros_sliders = parametros_sliders_faixas(esboco_quantis['todos'])
+
+    # Índice ordenado de passageiros por ano (busca binária para análises de limites)
+    indice_pax = construir_indice_pax(df_filtrado2)
+
     # Seção de Configuração de Faixas Personalizadas - DESTAQUE PRINCIPAL
+    marcar_secao("Aba 1 › Configuração de faixas")
     st.header("🎯 **Configuração de Faixas Personalizadas**")
+    if 'aviso_limites_sliders' in st.session_state:
+        st.warning(st.session_state.pop('aviso_limites_sliders'))
 
     # Toggle para usar faixas personalizadas - em destaque
     usar_faixas_personalizadas = st.checkbox("🔧 **Ativar Configuração Personalizada de Faixas**", value=True, help="Ative para definir seus próprios intervalos de faixas", key="usar_faixas_personalizadas")
@@ -367,14 +482,55 @@ with tab1:
         with col_config1:
             num_faixas = st.selectbox(
                 "📊 **Quantidade de Faixas:**",
-                options=[3, 4, 5, 6, 7, 8, 9, 10, 11],
-                index=7,  # Default para 10 faixas (índice 7)
+                options=OPCOES_QUANTIDADE_FAIXAS,
+                index=OPCOES_QUANTIDADE_FAIXAS.index(10),  # Default para 10 faixas
                 help="Escolha quantas faixas deseja configurar (além da Faixa AvG)",
                 key="num_faixas"
             )
         
         with col_config2:
             st.info(f"**Configuração Atual:**\n- Faixa AvG (sempre presente)\n- {st.session_state.num_faixas} faixas numeradas\n- **Total: {st.session_state.num_faixas + 1} faixas**")
+
+        # Faixas automáticas a partir do esboço de quantis
+        with st.expander("📐 **Faixas Automáticas por Quantis**", expanded=False):
+            st.markdown("*Gere os limites instantaneamente a partir da distribuição de passageiros (E + D) e carregue-os nos sliders*")
+
+            col_quantis1, col_quantis2 = st.columns(2)
+            with col_quantis1:
+                metodo_quantis = st.radio(
+                    "📏 **Método:**",
+                    options=["quantidade", "logaritmico"],
+                    format_func=lambda x: "Mesma quantidade de aeroportos por faixa" if x == "quantidade" else "Espaçamento logarítmico",
+                    key="metodo_quantis"
+                )
+            with col_quantis2:
+                base_quantis = st.selectbox(
+                    "🗓️ **Distribuição de Referência:**",
+                    options=["todos"] + [ano for ano in esboco_quantis if ano != "todos"],
+                    format_func=lambda x: "Todos os anos" if x == "todos" else str(x),
+                    key="base_quantis"
+                )
+
+            limites_quantis = limites_por_quantis(esboco_quantis[base_quantis], st.session_state.num_faixas, metodo_quantis)
+            faixas_quantis = faixas_a_partir_de_limites(limites_quantis)
+
+            # Contagem de aeroportos por faixa via busca binária no esboço
+            posicoes_quantis = np.searchsorted(esboco_quantis[base_quantis], faixas_quantis['bins'][:-1] + [np.inf], side="left")
+            df_preview_quantis = pd.DataFrame({
+                "Faixa": faixas_quantis['labels'],
+                "Limite Inferior": [formatar_numero(v) for v in faixas_quantis['bins'][:-1]],
+                "Limite Superior": [formatar_numero(v) if v != float('inf') else "∞" for v in faixas_quantis['bins'][1:]],
+                "Aeroportos-Ano": np.diff(posicoes_quantis)
+            })
+            st.dataframe(df_preview_quantis, use_container_width=True, hide_index=True)
+
+            st.button(
+                "🎯 Aplicar nos Sliders",
+                on_click=aplicar_limites_nos_sliders,
+                args=(limites_quantis,),
+                help="Carrega estes limites na configuração abaixo",
+                key="aplicar_faixas_quantis"
+            )
         
         st.markdown("---")
 
@@ -425,47 +581,32 @@ with tab1:
                     
                     if faixa_idx < st.session_state.num_faixas:
                         with cols[col_idx % num_colunas]:
-                            # Determinar valores para este slider
+                            # Determinar valores para este slider a partir do esboço de quantis
+                            # (intervalo global e passo proporcional à densidade de aeroportos no valor atual)
+                            max_val = parametros_sliders['max_val']
+                            # Sempre abaixo do limite seguinte (valor atual do próximo slider ou o seu valor padrão)
+                            limite_seguinte = None
+                            if faixa_idx + 1 < st.session_state.num_faixas:
+                                limite_seguinte = st.session_state.get(
+                                    f'slider_faixa_{faixa_idx + 1}',
+                                    valores_padrao_base[faixa_idx + 1] if faixa_idx + 1 < len(valores_padrao_base) else max_val
+                                )
+                            default_val = valores_padrao_base[faixa_idx] if faixa_idx < len(valores_padrao_base) else max_val
                             if faixa_idx == 0:
                                 # Primeira faixa (AvG → 1)
-                                min_val = 100
-                                max_val = 50000
-                                default_val = valores_padrao_base[faixa_idx]
-                                step = 100
+                                min_val = parametros_sliders['min_val']
                                 label = f"{cores_icones[faixa_idx]} Limite Faixa AvG → Faixa 1"
                                 help_text = "Pax (E + D) até este valor serão classificados como Faixa AvG"
                             else:
-                                # Faixas subsequentes
-                                if faixa_idx == 4:
-                                    incremento = 300_00
-                                elif faixa_idx == 5:
-                                    incremento = 500_00
-                                elif faixa_idx == 6:
-                                    incremento = 1_000_00
-                                elif faixa_idx == 7:
-                                    incremento = 3_000_00
-                                elif faixa_idx == 8 or faixa_idx == 9:
-                                    incremento = 5_000_00
-                                elif faixa_idx <= 3:
-                                    incremento = 100
-                                else:
-                                    incremento = 5000
-                                min_val = faixas_personalizadas[faixa_idx-1] + incremento
-                                
-                                # Determinar max_val baseado na posição da faixa
-                                if faixa_idx < 3:
-                                    max_val = 500000
-                                    step = 100
-                                elif faixa_idx < 6:
-                                    max_val = 5000000
-                                    step = 1000
-                                else:
-                                    max_val = 50000000
-                                    step = 10000
-                                
-                                default_val = max(valores_padrao_base[faixa_idx] if faixa_idx < len(valores_padrao_base) else min_val + step, min_val)
+                                # Faixas subsequentes: sempre acima do limite anterior
+                                min_val = faixas_personalizadas[faixa_idx-1] + 1
+                                default_val = max(default_val, min_val)
                                 label = f"{cores_icones[faixa_idx]} Limite Faixa {faixa_idx} → Faixa {faixa_idx + 1}"
                                 help_text = f"Pax (E + D) até este valor serão classificados como Faixa {faixa_idx}"
+                            if limite_seguinte is not None:
+                                max_val = max(min(max_val, limite_seguinte - 1), min_val + 1)
+                            min_val = min(min_val, max_val - 1)
+                            step = passo_local_slider(esboco_quantis['todos'], st.session_state.get(f'slider_faixa_{faixa_idx}', default_val))
                             
                             # Criar o slider e o number input
                             # Inicializar session_state se não existir
@@ -474,6 +615,12 @@ with tab1:
                             if f'num_faixa_{faixa_idx}' not in st.session_state:
                                 st.session_state[f'num_faixa_{faixa_idx}'] = default_val
 
+                            # Manter o valor dentro do intervalo permitido (o limite anterior ou uma
+                            # configuração carregada podem ter deslocado min_val/max_val)
+                            valor_ajustado = min(max(st.session_state[f'slider_faixa_{faixa_idx}'], min_val), max_val)
+                            st.session_state[f'slider_faixa_{faixa_idx}'] = valor_ajustado
+                            st.session_state[f'num_faixa_{faixa_idx}'] = valor_ajustado
+
                             st.markdown(f"**{label}**")
                             s_col, n_col = st.columns([3, 2])
                             with s_col:
@@ -535,59 +682,20 @@ with tab1:
 
     st.markdown("---")
 
-    # Função para aplicar as faixas aos dados
-    def aplicar_faixas_personalizadas(df, faixas):
-        """Aplica as faixas personalizadas aos dados de passageiros"""
-        bins = faixas['bins']
-        labels = faixas['labels']
-        
-        # Criar condições para cada faixa
-        conditions = []
-        for i in range(len(bins) - 1):
-            if i == 0:
-                # Primeira faixa: passageiros >= bins[0] e < bins[1]
-                condition = (pl.col("passageiros_projetado") >= bins[i]) & (pl.col("passageiros_projetado") < bins[i + 1])
-            elif i == len(bins) - 2:
-                # Última faixa: passageiros >= bins[i] (incluindo infinito)
-                condition = pl.col("passageiros_projetado") >= bins[i]
-            else:
-                # Faixas intermediárias: passageiros >= bins[i] e < bins[i + 1]
-                condition = (pl.col("passageiros_projetado") >= bins[i]) & (pl.col("passageiros_projetado") < bins[i + 1])
-            
-            conditions.append((condition, labels[i]))
-        
-        # Aplicar as condições usando when/then/otherwise
-        faixa_expr = pl.when(conditions[0][0]).then(pl.lit(conditions[0][1]))
-        
-        for condition, label in conditions[1:]:
-            faixa_expr = faixa_expr.when(condition).then(pl.lit(label))
-        
-        faixa_expr = faixa_expr.otherwise(pl.lit("Indefinido"))
-        
-        df_com_faixas = df.with_columns([
-            faixa_expr.alias("faixa_personalizada")
-        ])
-        
-        return df_com_faixas
-
     # Aplicar as faixas aos dados filtrados
+    marcar_secao("Aba 1 › Atribuição de faixas", df_filtrado2.height)
     df_com_faixas = aplicar_faixas_personalizadas(df_filtrado2, faixas_utilizadas)
 
 
     # Seção de Análise das Faixas (Compacta)
+    marcar_secao("Aba 1 › Distribuição por faixa", df_com_faixas.height)
     st.header("📊 Resultado da Configuração")
 
     # Controles de filtro por ano para o gráfico principal
     st.markdown("#### 🔍 **Distribuição de Aeroportos por Faixa**")
 
     # Usar dados consolidados (todos os anos) - mostrar por ano e faixa
-    distribuicao_faixas = (df_com_faixas
-                          .group_by(["faixa_personalizada", "ano"])
-                          .agg([
-                              pl.count("aeroporto").alias("quantidade_aeroportos"),
-                              pl.mean("passageiros_projetado").alias("media_passageiros")
-                          ])
-                          .sort(["faixa_personalizada", "ano"]))
+    distribuicao_faixas = distribuicao_por_faixa(df_com_faixas)
     
     titulo_grafico = "📊 **Distribuição por Faixa - Comparação entre Anos**"
 
@@ -661,6 +769,7 @@ with tab1:
 
     # Tabela resumo compacta
     st.markdown("---")
+    marcar_secao("Aba 1 › Tabela detalhada de distribuição")
     with st.expander("📋 **Ver Tabela Detalhada de Distribuição**", expanded=False):
         # Controles de filtro por ano - apenas ano específico
         st.markdown("#### 📅 **Selecione o Ano para Análise Detalhada**")
@@ -679,15 +788,7 @@ with tab1:
         df_filtrado_ano = df_com_faixas.filter(pl.col("ano") == ano_selecionado)
         
         # Agregar dados
-        distribuicao_por_ano_agg = (df_filtrado_ano
-                               .group_by("faixa_personalizada")
-                               .agg([
-                                   pl.count("aeroporto").alias("quantidade_aeroportos"),
-                                   pl.mean("passageiros_projetado").alias("media_passageiros"),
-                                   pl.sum("passageiros_projetado").alias("total_passageiros"),
-                                   pl.min("passageiros_projetado").alias("min_passageiros"),
-                                   pl.max("passageiros_projetado").alias("max_passageiros")
-                               ]))
+        distribuicao_por_ano_agg = distribuicao_por_faixa(df_filtrado_ano, por=("faixa_personalizada",))
         
         # Adicionar chaves de ordenação e ordenar
         distribuicao_por_ano = (distribuicao_por_ano_agg
@@ -747,6 +848,7 @@ with tab1:
         )
 
     # Seção opcional de detalhes por faixa
+    marcar_secao("Aba 1 › Explorar aeroportos por faixa")
     with st.expander("🔍 **Explorar Aeroportos por Faixa**", expanded=False):
         st.markdown("#### 🎯 **Análise Detalhada por Faixa e Ano**")
         st.markdown("*Explore os aeroportos de uma faixa específica em um ano determinado*")
@@ -891,12 +993,581 @@ with tab1:
                 - **Intervalo:** {limite_texto}
                 - **Configuração:** {'Personalizada' if usar_faixas_personalizadas else 'Padrão'}
                 """)
+            
+            # Eventos de serviço dos aeroportos da faixa (detector pré-calculado sobre o cubo de presença)
+            st.markdown("#### 🚦 **Entradas, Saídas e Lacunas de Serviço nos Aeroportos da Faixa**")
+            meses_ausencia_eventos_faixa = st.number_input(
+                "⏸️ **Meses mínimos de ausência:**",
+                min_value=1,
+                max_value=24,
+                value=3,
+                help="Ausência mínima (em meses) para caracterizar entrada, saída ou lacuna",
+                key="meses_ausencia_eventos_faixa"
+            )
+            # A constância não entra nesta tabela; o valor padrão da aba de presença reaproveita o mesmo cache
+            df_eventos_faixa = (detectar_eventos_servico(cubo_presenca, meses_ausencia_eventos_faixa, min(12, cubo_presenca["meses"]))
+                                .filter(
+                                    pl.col("aeroporto").is_in(aeroportos_faixa["aeroporto"].to_list()) &
+                                    (pl.col("aeronave") == "Todas") &
+                                    pl.col("evento").is_in(["Entrada", "Saída", "Lacuna"])
+                                ))
+            if df_eventos_faixa.height > 0:
+                st.dataframe(
+                    df_eventos_faixa.drop("aeronave").to_pandas(),
+                    use_container_width=True,
+                    column_config={
+                        "aeroporto": st.column_config.TextColumn("Aeroporto"),
+                        "evento": st.column_config.TextColumn("Evento"),
+                        "periodo_inicio": st.column_config.TextColumn("Início"),
+                        "periodo_fim": st.column_config.TextColumn("Fim"),
+                        "meses": st.column_config.NumberColumn("Meses de Ausência", format="%d")
+                    },
+                    hide_index=True
+                )
+                st.caption("Considera qualquer aeronave no aeroporto.")
+            else:
+                st.info(f"💡 Nenhuma entrada, saída ou lacuna de {meses_ausencia_eventos_faixa}+ meses nos aeroportos da {faixa_selecionada}.")
         
         else:
             st.warning(f"⚠️ **Nenhum aeroporto encontrado na {faixa_selecionada} para o ano {ano_selecionado_explore}.**")
             st.info("💡 Tente selecionar uma faixa ou ano diferente.")
 
+    # Seção de sensibilidade dos limites das faixas
+    marcar_secao("Aba 1 › Sensibilidade dos limites")
+    with st.expander("🎯 **Sensibilidade dos Limites das Faixas**", expanded=False):
+        st.markdown("#### ⚖️ **Aeroportos Próximos aos Limites**")
+        st.markdown("*Identifique os aeroportos que mudariam de faixa se cada limite variasse dentro da tolerância*")
+
+        col_sens1, col_sens2, col_sens3 = st.columns(3)
+
+        with col_sens1:
+            anos_disponiveis_sens = sorted(indice_pax.keys())
+            ano_selecionado_sens = st.selectbox(
+                "🗓️ **Selecione o Ano:**",
+                options=anos_disponiveis_sens,
+                index=len(anos_disponiveis_sens)-1,  # Último ano por padrão
+                help="Ano usado para comparar os passageiros (E + D) com os limites",
+                key="ano_sensibilidade"
+            )
+
+        with col_sens2:
+            modo_tolerancia = st.radio(
+                "📏 **Tipo de Tolerância:**",
+                options=["percentual", "absoluto"],
+                format_func=lambda x: "± % do limite" if x == "percentual" else "± Pax (E + D)",
+                horizontal=True,
+                key="modo_tolerancia_sensibilidade"
+            )
+
+        with col_sens3:
+            if modo_tolerancia == "percentual":
+                tolerancia = st.number_input(
+                    "🔢 **Tolerância (%):**",
+                    min_value=0.0,
+                    max_value=100.0,
+                    value=10.0,
+                    step=1.0,
+                    key="tolerancia_percentual_sensibilidade"
+                )
+            else:
+                tolerancia = st.number_input(
+                    "🔢 **Tolerância (Pax):**",
+                    min_value=0,
+                    value=5000,
+                    step=1000,
+                    key="tolerancia_absoluta_sensibilidade"
+                )
+
+        indice_ano_sens = indice_pax[ano_selecionado_sens]
+
+        # Aeroportos próximos de cada limite configurado
+        linhas_limites = []
+        for i, limite in enumerate(faixas_utilizadas['bins'][1:-1]):
+            df_proximos = aeroportos_proximos_limite(indice_ano_sens, limite, tolerancia, modo_tolerancia)
+            abaixo = df_proximos.filter(pl.col("posicao") == "Abaixo do limite")
+            acima = df_proximos.filter(pl.col("posicao") == "Acima do limite")
+
+            linhas_limites.append({
+                "limite": formatar_numero(limite),
+                "transicao": f"{faixas_utilizadas['labels'][i]} → {faixas_utilizadas['labels'][i + 1]}",
+                "qtd_abaixo": abaixo.height,
+                "qtd_acima": acima.height,
+                "aeroportos_abaixo": ", ".join(f"{a} ({formatar_numero(p)})" for a, p in abaixo.select(["aeroporto", "passageiros_projetado"]).iter_rows()),
+                "aeroportos_acima": ", ".join(f"{a} ({formatar_numero(p)})" for a, p in acima.select(["aeroporto", "passageiros_projetado"]).iter_rows())
+            })
+
+        st.markdown(f"### 📋 **Limites Configurados - Ano {ano_selecionado_sens}**")
+        st.dataframe(
+            pd.DataFrame(linhas_limites),
+            use_container_width=True,
+            column_config={
+                "limite": st.column_config.TextColumn("Limite (E + D)"),
+                "transicao": st.column_config.TextColumn("Transição"),
+                "qtd_abaixo": st.column_config.NumberColumn("Qtd Abaixo", help="Aeroportos que subiriam de faixa se o limite diminuísse", format="%d"),
+                "qtd_acima": st.column_config.NumberColumn("Qtd Acima", help="Aeroportos que desceriam de faixa se o limite aumentasse", format="%d"),
+                "aeroportos_abaixo": st.column_config.TextColumn("Aeroportos Abaixo do Limite"),
+                "aeroportos_acima": st.column_config.TextColumn("Aeroportos Acima do Limite")
+            },
+            hide_index=True
+        )
+
+        # Curva de sensibilidade em toda a faixa dos sliders
+        st.markdown("#### 📈 **Curva de Sensibilidade**")
+        st.markdown("*Quantidade de aeroportos dentro da tolerância para qualquer posição do limite*")
+
+        df_curva_sens = curva_sensibilidade_limites(
+            indice_ano_sens, tolerancia, parametros_sliders['min_val'], parametros_sliders['max_val'], modo_tolerancia
+        ).to_pandas()
+
+        fig_sens = go.Figure()
+        fig_sens.add_trace(go.Scatter(
+            x=df_curva_sens["limite"],
+            y=df_curva_sens["aeroportos_na_margem"],
+            mode='lines',
+            name="Aeroportos na margem",
+            line=dict(color='#1f77b4', width=2),
+            customdata=np.stack([df_curva_sens["aeroportos_abaixo"], df_curva_sens["aeroportos_acima"]], axis=-1),
+            hovertemplate='Limite: %{x:,.0f}<br>' +
+                          'Aeroportos na margem: %{y}<br>' +
+                          'Abaixo: %{customdata[0]} | Acima: %{customdata[1]}' +
+                          '<extra></extra>'
+        ))
+
+        # Marcar os limites configurados
+        for limite in faixas_utilizadas['bins'][1:-1]:
+            fig_sens.add_vline(x=limite, line=dict(color="gray", dash="dot", width=1))
+
+        fig_sens.update_layout(
+            title=f"Sensibilidade dos Limites - Ano {ano_selecionado_sens}",
+            xaxis=dict(type='log', title='Limite da Faixa (Pax E + D, escala log)'),
+            yaxis_title="Aeroportos que mudariam de faixa",
+            height=450,
+            hovermode='x unified'
+        )
+
+        st.plotly_chart(fig_sens, use_container_width=True)
+        st.caption("Linhas pontilhadas: limites da configuração atual. Picos indicam regiões em que pequenas mudanças no limite alteram a faixa de muitos aeroportos.")
+
+    # Seção de descoberta de faixas por clusterização
+    marcar_secao("Aba 1 › Clusterização k-means")
+    with st.expander("🧭 **Descoberta de Faixas por Clusterização (k-means)**", expanded=False):
+        st.markdown("#### 🧩 **Agrupamento de Aeroportos-Ano**")
+        st.markdown("*Agrupe os aeroportos por passageiros (E + D), movimentos (P + D) e mix de frota, e use os limites entre os clusters como configuração de faixas*")
+
+        col_cluster1, col_cluster2, col_cluster3 = st.columns(3)
+
+        with col_cluster1:
+            opcoes_variaveis_cluster = {
+                "passageiros": "Passageiros (E + D)",
+                "movimentos": "Movimentos (P + D)",
+                "mix_frota": "Mix de frota por categoria"
+            }
+            variaveis_cluster = st.multiselect(
+                "📐 **Variáveis:**",
+                options=list(opcoes_variaveis_cluster.keys()),
+                default=list(opcoes_variaveis_cluster.keys()),
+                format_func=lambda x: opcoes_variaveis_cluster[x],
+                help="Variáveis de cada aeroporto-ano usadas na clusterização",
+                key="variaveis_cluster"
+            )
+
+        with col_cluster2:
+            anos_disponiveis_cluster = sorted(df_filtrado2["ano"].unique().to_list())
+            anos_cluster = st.multiselect(
+                "🗓️ **Anos:**",
+                options=anos_disponiveis_cluster,
+                default=anos_disponiveis_cluster,
+                help="Aeroportos-ano considerados na clusterização",
+                key="anos_cluster"
+            )
+
+        with col_cluster3:
+            k_clusters = st.slider(
+                "🔢 **Quantidade de Clusters (k):**",
+                min_value=4,
+                max_value=12,
+                value=11,
+                step=1,
+                help="Cada cluster vira uma faixa (Faixa AvG + k - 1 faixas numeradas)",
+                key="k_clusters"
+            )
+
+        if not variaveis_cluster or not anos_cluster:
+            st.warning("⚠️ Selecione ao menos uma variável e um ano para a clusterização.")
+        else:
+            df_features_cluster = construir_features_aeroportos(df_filtrado2, df_filtrado1).filter(
+                pl.col("ano").is_in(anos_cluster)
+            )
+
+            if df_features_cluster.height < k_clusters:
+                st.warning("⚠️ Há menos aeroportos-ano do que clusters selecionados.")
+            else:
+                df_clusters = agrupar_aeroportos_kmeans(df_features_cluster, tuple(sorted(variaveis_cluster)), k_clusters)
+                limites_cluster = limites_entre_clusters(df_clusters)
+                faixas_cluster = faixas_a_partir_de_limites(limites_cluster)
+
+                # Resumo dos clusters
+                resumo_clusters = (df_clusters
+                                   .group_by("cluster")
+                                   .agg([
+                                       pl.len().alias("aeroportos_ano"),
+                                       pl.min("passageiros_projetado").alias("min_passageiros"),
+                                       pl.median("passageiros_projetado").alias("mediana_passageiros"),
+                                       pl.max("passageiros_projetado").alias("max_passageiros"),
+                                       pl.median("movimentos").alias("mediana_movimentos")
+                                   ])
+                                   .sort("cluster")
+                                   .with_columns(pl.Series("faixa", faixas_cluster['labels'])))
+
+                df_resumo_clusters = resumo_clusters.select(
+                    ["faixa", "cluster", "aeroportos_ano", "min_passageiros", "mediana_passageiros", "max_passageiros", "mediana_movimentos"]
+                ).to_pandas()
+                for col in ["min_passageiros", "mediana_passageiros", "max_passageiros", "mediana_movimentos"]:
+                    df_resumo_clusters[col] = df_resumo_clusters[col].apply(formatar_numero)
+
+                st.markdown(f"### 📋 **Resumo dos {k_clusters} Clusters**")
+                st.dataframe(
+                    df_resumo_clusters,
+                    use_container_width=True,
+                    column_config={
+                        "faixa": "Faixa Sugerida",
+                        "cluster": st.column_config.NumberColumn("Cluster", format="%d"),
+                        "aeroportos_ano": st.column_config.NumberColumn("Aeroportos-Ano", format="%d"),
+                        "min_passageiros": "Mínimo (E + D)",
+                        "mediana_passageiros": "Mediana (E + D)",
+                        "max_passageiros": "Máximo (E + D)",
+                        "mediana_movimentos": "Mediana Movimentos (P + D)"
+                    },
+                    hide_index=True
+                )
+
+                # Dispersão dos aeroportos-ano coloridos por cluster
+                df_grafico_cluster = df_clusters.with_columns(
+                    pl.col("cluster").cast(pl.Utf8).alias("cluster_str")
+                ).to_pandas()
+
+                fig_cluster = px.scatter(
+                    df_grafico_cluster,
+                    x="passageiros_projetado",
+                    y="movimentos",
+                    color="cluster_str",
+                    hover_data=["aeroporto", "ano"],
+                    category_orders={"cluster_str": [str(c) for c in range(k_clusters)]},
+                    log_x=True,
+                    log_y=True,
+                    labels={
+                        "passageiros_projetado": "Passageiros (E + D)",
+                        "movimentos": "Movimentos (P + D)",
+                        "cluster_str": "Cluster"
+                    },
+                    title="Clusters de Aeroportos-Ano"
+                )
+                for limite in limites_cluster:
+                    fig_cluster.add_vline(x=limite, line=dict(color="gray", dash="dot", width=1))
+                fig_cluster.update_layout(height=500)
+                st.plotly_chart(fig_cluster, use_container_width=True)
+
+                # Limites derivados e exportação
+                st.markdown("#### 🎚️ **Limites Derivados dos Clusters**")
+                st.caption("Cada limite é o valor de passageiros (E + D) que melhor separa dois clusters consecutivos.")
+
+                cols_limites = st.columns(min(4, len(faixas_cluster['labels'])))
+                for i, (inicio, fim, label) in enumerate(zip(faixas_cluster['bins'][:-1], faixas_cluster['bins'][1:], faixas_cluster['labels'])):
+                    with cols_limites[i % len(cols_limites)]:
+                        if fim == float('inf'):
+                            st.info(f"**{label}**\n{formatar_numero(inicio)}+ passageiros (E + D)")
+                        else:
+                            st.info(f"**{label}**\n{formatar_numero(inicio)} - {formatar_numero(fim)} passageiros (E + D)")
+
+                col_export1, col_export2 = st.columns(2)
+                with col_export1:
+                    st.download_button(
+                        "💾 Exportar Configuração (JSON)",
+                        data=json.dumps({
+                            'bins': faixas_cluster['bins'][:-1] + ["inf"],
+                            'labels': faixas_cluster['labels'],
+                            'variaveis': sorted(variaveis_cluster),
+                            'anos': sorted(anos_cluster),
+                            'k': k_clusters
+                        }, ensure_ascii=False, indent=2),
+                        file_name=f"faixas_kmeans_k{k_clusters}.json",
+                        mime="application/json",
+                        key="exportar_faixas_cluster"
+                    )
+                with col_export2:
+                    st.button(
+                        "🎯 Aplicar nos Sliders",
+                        on_click=aplicar_limites_nos_sliders,
+                        args=(limites_cluster,),
+                        help="Carrega estes limites na Configuração Personalizada de Faixas",
+                        key="aplicar_faixas_cluster"
+                    )
+
+    # Seção de validação da estabilidade das faixas entre anos
+    marcar_secao("Aba 1 › Estabilidade das faixas")
+    with st.expander("🧪 **Estabilidade das Faixas entre Anos**", expanded=False):
+        st.markdown("#### 📏 **Validação Cruzada da Configuração**")
+        st.markdown("*Compare configurações pela homogeneidade do mix de frota e da aeronave crítica dentro de cada faixa, em cada ano e entre 2022-2025*")
+
+        col_estab1, col_estab2 = st.columns(2)
+        with col_estab1:
+            variacao_estabilidade = st.slider(
+                "↔️ **Variação dos Limites (± %):**",
+                min_value=5,
+                max_value=50,
+                value=20,
+                step=5,
+                help="Cada limite da configuração atual é deslocado individualmente para cima e para baixo por este percentual",
+                key="variacao_estabilidade"
+            )
+        with col_estab2:
+            meses_constancia = st.slider(
+                "📅 **Meses para Uso Constante:**",
+                min_value=1,
+                max_value=12,
+                value=3,
+                help="Meses com movimento no ano para a aeronave poder ser a crítica do aeroporto",
+                key="meses_constancia_estabilidade"
+            )
+
+        base_estabilidade = construir_base_estabilidade(
+            construir_features_aeroportos(df_filtrado2, df_filtrado1), df_filtrado1, meses_constancia
+        )
+
+        # Configurações candidatas: atual, padrão, quantis e variações de cada limite da atual
+        limites_atuais = list(faixas_utilizadas['bins'][1:-1])
+        configuracoes_estabilidade = {
+            "Configuração atual": faixas_utilizadas['bins'],
+            "Faixas padrão": faixas_padrao['bins'],
+            "Quantis (mesma quantidade)": faixas_a_partir_de_limites(limites_por_quantis(esboco_quantis['todos'], len(limites_atuais), "quantidade"))['bins'],
+            "Quantis (logarítmico)": faixas_a_partir_de_limites(limites_por_quantis(esboco_quantis['todos'], len(limites_atuais), "logaritmico"))['bins']
+        }
+        for i, limite in enumerate(limites_atuais):
+            for sinal in (-1, 1):
+                variados = limites_atuais.copy()
+                variados[i] = int(limite * (1 + sinal * variacao_estabilidade / 100))
+                if all(a < b for a, b in zip(variados, variados[1:])):
+                    nome_faixa = "AvG" if i == 0 else str(i)
+                    configuracoes_estabilidade[f"Limite Faixa {nome_faixa} {'+' if sinal > 0 else '-'}{variacao_estabilidade}%"] = faixas_a_partir_de_limites(variados)['bins']
+
+        df_ranking_estabilidade = avaliar_configuracoes_estabilidade(base_estabilidade, configuracoes_estabilidade)
+
+        componentes_atual = df_ranking_estabilidade.filter(pl.col("configuracao") == "Configuração atual").row(0, named=True)
+        posicao_atual = df_ranking_estabilidade["configuracao"].to_list().index("Configuração atual") + 1
+
+        col_m1, col_m2, col_m3 = st.columns(3)
+        with col_m1:
+            st.metric("🏅 Score da Configuração Atual", f"{componentes_atual['score_estabilidade']:.3f}")
+        with col_m2:
+            st.metric("📊 Posição no Ranking", f"{posicao_atual}º de {df_ranking_estabilidade.height}")
+        with col_m3:
+            st.metric("📉 Desvio do Score entre Anos", f"{componentes_atual['desvio_entre_anos']:.3f}")
+
+        st.markdown(f"### 📋 **Ranking de {df_ranking_estabilidade.height} Configurações**")
+        st.dataframe(
+            df_ranking_estabilidade.to_pandas(),
+            use_container_width=True,
+            column_config={
+                "configuracao": "Configuração",
+                "faixas": st.column_config.NumberColumn("Faixas", format="%d"),
+                "homogeneidade_mix": st.column_config.NumberColumn("Homog. Mix de Frota", format="%.3f"),
+                "homogeneidade_critica": st.column_config.NumberColumn("Homog. Aeronave Crítica", format="%.3f"),
+                "estabilidade_mix": st.column_config.NumberColumn("Estab. Mix entre Anos", format="%.3f"),
+                "estabilidade_critica": st.column_config.NumberColumn("Estab. Crítica entre Anos", format="%.3f"),
+                "score_estabilidade": st.column_config.NumberColumn("Score", format="%.3f"),
+                "desvio_entre_anos": st.column_config.NumberColumn("Desvio entre Anos", format="%.3f")
+            },
+            hide_index=True
+        )
+        st.caption("Score: média dos quatro componentes, ponderados pela quantidade de aeroportos-ano de cada faixa. Faixas com poucos aeroportos tendem a ser homogêneas por construção; compare configurações com quantidades de faixas semelhantes.")
+
+        if st.toggle("🔍 Detalhar configuração atual por ano e faixa", key="detalhar_estabilidade"):
+            _, df_detalhe_estabilidade = avaliar_estabilidade_faixas(base_estabilidade, faixas_utilizadas['bins'])
+            st.dataframe(
+                df_detalhe_estabilidade.to_pandas(),
+                use_container_width=True,
+                column_config={
+                    "ano": st.column_config.NumberColumn("Ano", format="%d"),
+                    "faixa": "Faixa",
+                    "aeroportos": st.column_config.NumberColumn("Aeroportos", format="%d"),
+                    "homogeneidade_mix": st.column_config.NumberColumn("Homog. Mix de Frota", format="%.3f"),
+                    "homogeneidade_critica": st.column_config.NumberColumn("Homog. Aeronave Crítica", format="%.3f"),
+                    "aeronave_critica_modal": "Aeronave Crítica Modal",
+                    "critica_coincide_todos_anos": st.column_config.CheckboxColumn("Coincide com Todos os Anos")
+                },
+                hide_index=True
+            )
+
+    # Seção de determinação automática da aeronave crítica
+    marcar_secao("Aba 1 › Aeronave crítica")
+    with st.expander("🛩️ **Aeronave Crítica por Faixa e Ano**", expanded=False):
+        st.markdown("#### 🎯 **Candidatas a Aeronave Crítica**")
+        st.markdown("*Candidatas: aeronaves com participação Y mínima e uso constante em uma fração mínima dos aeroportos da faixa. A crítica é a candidata de maior pista requerida.*")
+
+        col_crit1, col_crit2, col_crit3 = st.columns(3)
+        with col_crit1:
+            meses_constancia_critica = st.slider(
+                "📅 **Meses para Uso Constante:**",
+                min_value=1,
+                max_value=12,
+                value=6,
+                help="Meses com movimento no ano para o uso da aeronave no aeroporto ser considerado constante",
+                key="meses_constancia_critica"
+            )
+        with col_crit2:
+            participacao_minima_critica = st.number_input(
+                "📊 **Participação Y Mínima (%):**",
+                min_value=0.0,
+                max_value=10.0,
+                value=0.05,
+                step=0.01,
+                format="%.2f",
+                help="Participação mínima da aeronave na métrica Y da faixa-ano (descarta cargueiras e operações residuais)",
+                key="participacao_minima_critica"
+            )
+        with col_crit3:
+            aeroportos_minimos_critica = st.slider(
+                "🛫 **Aeroportos com Uso Constante (mín. %):**",
+                min_value=0,
+                max_value=100,
+                value=30,
+                step=5,
+                help="Fração mínima dos aeroportos da faixa que usam a aeronave com constância",
+                key="aeroportos_minimos_critica"
+            )
+
+        base_aeronave_critica = construir_base_aeronave_critica(df_filtrado2, df_filtrado1)
+        parametros_critica = (meses_constancia_critica, participacao_minima_critica / 100, aeroportos_minimos_critica / 100)
+        df_candidatas_critica, df_resumo_critica = determinar_aeronaves_criticas(
+            base_aeronave_critica, faixas_utilizadas['bins'], *parametros_critica
+        )
+
+        ordem_faixas_critica = {faixa: i for i, faixa in enumerate(faixas_a_partir_de_limites(faixas_utilizadas['bins'][1:-1])['labels'])}
+        df_pivot_critica = (df_resumo_critica
+                            .with_columns(pl.col("aeronave_critica").fill_null("—"))
+                            .pivot(on="ano", index="faixa", values="aeronave_critica", sort_columns=True)
+                            .with_columns(pl.col("faixa").replace_strict(ordem_faixas_critica, default=len(ordem_faixas_critica)).alias("_ordem"))
+                            .sort("_ordem")
+                            .drop("_ordem"))
+        st.markdown("##### **Aeronave Crítica por Faixa e Ano**")
+        st.dataframe(df_pivot_critica.to_pandas(), use_container_width=True, hide_index=True)
+
+        col_sel1, col_sel2 = st.columns(2)
+        with col_sel1:
+            anos_critica = sorted(df_resumo_critica["ano"].unique().to_list())
+            ano_critica = st.selectbox("🗓️ **Ano:**", options=anos_critica, index=len(anos_critica) - 1, key="ano_critica")
+        with col_sel2:
+            faixas_critica = sorted(df_resumo_critica["faixa"].unique().to_list(), key=lambda f: ordem_faixas_critica.get(f, len(ordem_faixas_critica)))
+            faixa_critica = st.selectbox("📊 **Faixa:**", options=faixas_critica, key="faixa_critica")
+
+        st.markdown(f"##### **Candidatas - {faixa_critica} em {ano_critica}**")
+        st.dataframe(
+            df_candidatas_critica
+            .filter((pl.col("faixa") == faixa_critica) & (pl.col("ano") == ano_critica))
+            .select(["aeronave", "candidata", "pista_requerida", "moda_assentos", "participacao_y", "posicao_y",
+                     "aeroportos_usando", "aeroportos_constantes", "aeroportos_faixa", "posicao_aeroportos",
+                     "constancia_mensal", "posicao_constancia"])
+            .to_pandas(),
+            use_container_width=True,
+            column_config={
+                "aeronave": "Aeronave",
+                "candidata": st.column_config.CheckboxColumn("Candidata"),
+                "pista_requerida": st.column_config.NumberColumn("Pista Requerida (m)", format="%d"),
+                "moda_assentos": st.column_config.NumberColumn("Assentos", format="%d"),
+                "participacao_y": st.column_config.NumberColumn("Participação Y", format="percent"),
+                "posicao_y": st.column_config.NumberColumn("Posição Y", format="%d"),
+                "aeroportos_usando": st.column_config.NumberColumn("Aeroportos Usando", format="%d"),
+                "aeroportos_constantes": st.column_config.NumberColumn("Aeroportos Constantes", format="%d"),
+                "aeroportos_faixa": st.column_config.NumberColumn("Aeroportos da Faixa", format="%d"),
+                "posicao_aeroportos": st.column_config.NumberColumn("Posição Aeroportos", format="%d"),
+                "constancia_mensal": st.column_config.NumberColumn("Constância Mensal", format="percent"),
+                "posicao_constancia": st.column_config.NumberColumn("Posição Constância", format="%d")
+            },
+            hide_index=True
+        )
+
+        if st.toggle("⚖️ Comparar com as configurações da validação de estabilidade", key="comparar_criticas_configuracoes"):
+            df_criticas_configuracoes = determinar_criticas_configuracoes(
+                base_aeronave_critica, configuracoes_estabilidade, *parametros_critica
+            )
+            st.markdown(f"##### **Aeronave Crítica por Configuração - {ano_critica}**")
+            st.dataframe(
+                df_criticas_configuracoes
+                .filter(pl.col("ano") == ano_critica)
+                .with_columns(pl.col("aeronave_critica").fill_null("—"))
+                .pivot(on="faixa", index="configuracao", values="aeronave_critica")
+                .select(["configuracao"] + [f for f in ordem_faixas_critica if f in df_criticas_configuracoes["faixa"].unique().to_list()])
+                .fill_null("—")
+                .to_pandas(),
+                use_container_width=True,
+                hide_index=True
+            )
+
+    marcar_secao("Aba 1 › Relatório das faixas")
+    with st.expander("📝 **Resumo das Faixas (Relatório)**", expanded=False):
+        st.markdown("*Resumo gerado automaticamente para as faixas atuais: limites, aeroportos próximos aos limites, aeronave crítica, serviços descontinuados e clusters.*")
+
+        col_rel1, col_rel2, col_rel3 = st.columns(3)
+        with col_rel1:
+            anos_relatorio = sorted(df_filtrado2["ano"].unique().to_list())
+            ano_relatorio = st.selectbox("🗓️ **Ano de referência:**", options=anos_relatorio, index=len(anos_relatorio) - 1, key="ano_relatorio")
+        with col_rel2:
+            tolerancia_relatorio = st.number_input(
+                "📏 **Tolerância em torno dos limites (%):**",
+                min_value=1,
+                max_value=50,
+                value=10,
+                step=1,
+                help="Aeroportos com passageiros a até esta distância percentual de um limite são listados como próximos",
+                key="tolerancia_relatorio"
+            )
+        with col_rel3:
+            meses_ausencia_relatorio = st.number_input(
+                "⏸️ **Meses sem operação:**",
+                min_value=1,
+                max_value=24,
+                value=3,
+                help="Ausência mínima (em meses) até o fim dos dados para listar um serviço como descontinuado",
+                key="meses_ausencia_relatorio"
+            )
+
+        # Insumos com cache, compartilhados com as seções interativas
+        df_features_relatorio = construir_features_aeroportos(df_filtrado2, df_filtrado1)
+        df_clusters_relatorio = agrupar_aeroportos_kmeans(
+            df_features_relatorio, ("movimentos", "passageiros"),
+            min(len(faixas_utilizadas['bins']) - 1, df_features_relatorio.height)
+        )
+        df_relatorio, markdown_relatorio = gerar_relatorio_faixas(
+            df_filtrado2, indice_pax, base_aeronave_critica,
+            detectar_eventos_servico(cubo_presenca, meses_ausencia_relatorio), df_clusters_relatorio,
+            faixas_utilizadas['bins'], ano_relatorio, tolerancia_relatorio, meses_ausencia_relatorio, parametros_critica
+        )
+
+        st.markdown(markdown_relatorio)
+
+        buffer_relatorio = io.BytesIO()
+        df_relatorio.write_parquet(buffer_relatorio)
+
+        col_exp_rel1, col_exp_rel2 = st.columns(2)
+        with col_exp_rel1:
+            st.download_button(
+                "💾 Exportar Resumo (Markdown)",
+                data=markdown_relatorio,
+                file_name=f"resumo_faixas_{ano_relatorio}.md",
+                mime="text/markdown",
+                key="exportar_relatorio_md"
+            )
+        with col_exp_rel2:
+            st.download_button(
+                "💾 Exportar Resumo (Parquet)",
+                data=buffer_relatorio.getvalue(),
+                file_name=f"resumo_faixas_{ano_relatorio}.parquet",
+                mime="application/octet-stream",
+                key="exportar_relatorio_parquet"
+            )
+
     st.markdown("---")
+    marcar_secao("Aba 1 › Métrica ponderada e projeção SARIMAX")
     st.header("✈️ **Resumo - Aeronaves**")
     st.markdown("### Análise da participação ponderada")
     st.caption("Fórmula Y: $\\frac{\\text{Qtd Movimentos} \\times \\text{Pax}}{\\sum(\\text{Qtd Movimentos Total} \\times \\text{Pax Total})}$")
@@ -977,25 +1648,25 @@ with tab1:
     start_year, start_month = map(int, start_period.split("-M"))
     end_year, end_month = map(int, end_period.split("-M"))
 
-    # Passo 1: Identificar Aeroportos que atendem ao critério de passageiros
-    aeroportos_validos_pax = df_com_faixas.filter(
-        (pl.col("passageiros_projetado") >= pax_range_selecionado[0]) &
-        (pl.col("passageiros_projetado") <= pax_range_selecionado[1])
-    ).select(["aeroporto", "ano"])
+    # Passo 1: Índice de somas acumuladas (aeroportos-ano ordenados por passageiros)
+    # Construído uma única vez por conjunto de dados; a faixa de passageiros selecionada
+    # é resolvida por busca binária, sem novo join com a base de voos.
+    indice_prefixo_ponderado = construir_indice_prefixo_ponderado(df_filtrado2, df_filtrado1)
 
-    # Passo 2: Filtrar a base de voos - MODO "FULL HISTORY"
+    # Passo 2: Consultar a base de voos - MODO "FULL HISTORY"
     # [CRÍTICO]: NÃO aplicamos o filtro de data (start_year/end_year) aqui.
     # O modelo SARIMAX precisa de todo o histórico disponível para aprender a sazonalidade corretamente.
-    df_voos_filtrado_final = df_filtrado1.join(aeroportos_validos_pax, on=["aeroporto", "ano"], how="inner")
+    df_valor_ponderado = consultar_indice_prefixo_ponderado(
+        indice_prefixo_ponderado, pax_range_selecionado[0], pax_range_selecionado[1]
+    )
 
-    if df_voos_filtrado_final.height == 0:
+    if df_valor_ponderado.height == 0:
         st.warning("⚠️ Nenhum dado encontrado para a faixa de passageiros selecionada.")
     else:
         # --- 3. CÁLCULO DA MÉTRICA (BASE COMPLETA) ---
         
-        # Criação da coluna 'periodo_str' e cálculo ponderado na base completa
-        df_calculado = df_voos_filtrado_final.with_columns(
-            (pl.col("quantidade_voos") * pl.col("pax")).alias("valor_ponderado"),
+        # Criação da coluna 'periodo_str' (valor ponderado já agregado por aeronave e mês no índice)
+        df_calculado = df_valor_ponderado.with_columns(
             (pl.col("ano").cast(pl.Utf8) + "-M" + pl.col("mes").cast(pl.Utf8).str.zfill(2)).alias("periodo_str")
         )
 
@@ -1029,52 +1700,17 @@ with tab1:
         if not permitir_projecao:
             aviso_projecao = " (Indisponível: Selecione o último mês disponível no filtro de data)"
 
-        # --- 4.3 FUNÇÃO DE FORECAST (AUTO_ARIMA) ---
-        def projetar_sarimax(series_historica, passos=24):
-            # Agrupar por data para somar duplicatas (vários aeroportos)
-            series_grouped = series_historica.groupby(level=0).sum()
-            series_full = series_grouped.asfreq('MS').fillna(0)
-            
-            # Validação: se tiver poucos dados ou for tudo zero
-            if len(series_full) < 12 or float(series_full.sum()) == 0:
-                media_recente = series_full.iloc[-6:].mean() if len(series_full) > 0 else 0
-                idx_futuro = pd.date_range(series_full.index[-1] + pd.DateOffset(months=1), periods=passos, freq='MS')
-                forecast = pd.Series([media_recente] * passos, index=idx_futuro)
-                return pd.concat([series_full, forecast])
-            
-            try:
-                # Usando auto_arima para otimização
-                model = pm.auto_arima(
-                    series_full, seasonal=True, m=12, trace=False, 
-                    error_action='ignore', suppress_warnings=True, stepwise=True,
-                    max_p=2, max_q=2, max_P=1, max_Q=1
-                )
-                forecast_values = model.predict(n_periods=passos)
-                idx_futuro = pd.date_range(series_full.index[-1] + pd.DateOffset(months=1), periods=passos, freq='MS')
-                forecast_series = pd.Series(forecast_values, index=idx_futuro).clip(lower=0)
-                return pd.concat([series_full, forecast_series])
-                
-            except Exception:
-                try:
-                    from statsmodels.tsa.holtwinters import SimpleExpSmoothing
-                    model_fallback = SimpleExpSmoothing(series_full).fit()
-                    forecast_values = model_fallback.forecast(passos)
-                    return pd.concat([series_full, forecast_values])
-                except:
-                    idx_futuro = pd.date_range(series_full.index[-1] + pd.DateOffset(months=1), periods=passos, freq='MS')
-                    forecast = pd.Series([series_full.mean()] * passos, index=idx_futuro)
-                    return pd.concat([series_full, forecast])
-
         # --- 4.4 CÁLCULO MASSIVO E SHARE ---
         
         with st.spinner("Calculando modelos SARIMAX..."):
             todas_aeronaves_filtro = df_base_pandas["aeronave"].unique()
             dict_projecoes_absolutas = {}
             
-            for aeronave in todas_aeronaves_filtro:
-                # Extrair Series numérica explicitamente
-                df_nave = df_base_pandas[df_base_pandas["aeronave"] == aeronave].set_index("data")["valor_ponderado"]
-                dict_projecoes_absolutas[aeronave] = projetar_sarimax(df_nave)
+            with medir_secao("Laço SARIMAX", len(todas_aeronaves_filtro)):
+                for aeronave in todas_aeronaves_filtro:
+                    # Extrair Series numérica explicitamente
+                    df_nave = df_base_pandas[df_base_pandas["aeronave"] == aeronave].set_index("data")["valor_ponderado"]
+                    dict_projecoes_absolutas[aeronave] = projetar_sarimax(df_nave)
             
             # DataFrame Mestre Absoluto (Numeradores Projetados)
             df_master_absoluto = pd.DataFrame(dict_projecoes_absolutas).fillna(0)
@@ -1206,11 +1842,13 @@ with tab1:
 
         # Maior Aeronave (Capacidade)
         nome_maior = "N/A"; assentos_maior = 0
-        if 'df_specs' in globals() and df_specs is not None and aeronaves_relevantes:
-            specs_filtrado = df_specs.filter(pl.col("sg_equipamento_icao").is_in(aeronaves_relevantes))
+        if aeronaves_relevantes:
+            specs_filtrado = dimensao_aeronaves.filter(
+                pl.col("aeronave").is_in(aeronaves_relevantes) & (pl.col("moda_assentos") > 0)
+            )
             if specs_filtrado.height > 0:
                 row_maior = specs_filtrado.sort("moda_assentos", descending=True).row(0, named=True)
-                nome_maior = row_maior["sg_equipamento_icao"]
+                nome_maior = row_maior["aeronave"]
                 assentos_maior = int(row_maior["moda_assentos"])
 
         col_m1, col_m2 = st.columns(2)
@@ -1228,90 +1866,9 @@ with tab1:
         st.markdown(f"#### 📈 **Evolução da Métrica Ponderada por Categoria**")
 
         # 6.1 Preparação (Reutilizando projeções absolutas já calculadas)
-        mapa_final = {
-            'ATR': '2C',
-            'E195': '4C',
-            'A20N': '3C',
-            'B738': '4C',
-            'A321': '4C',
-            'A320': '4C',
-            'B38M': '4C',
-            'E295': '3C',
-            'B737': '4C',
-            'A21N': '4C',
-            'A319': '3C',
-            'C208': '1B',
-            'A332': '4E',
-            'B77W': '4E',
-            'A339': '4E',
-            'B763': '4D',
-            'B789': '4E',
-            'B734': '4C',
-            'B733': '4C',
-            'B722': '4C',
-            'B77L': '4E',
-            'B744': '4E',
-            'B788': '4E',
-            'CRJ2': '3B',
-            'A343': '4E',
-            'B772': '4E',
-            'B39M': '4C',
-            'A333': '4E',
-            'B773': '4E',
-            'E190': '4C',
-            'B78X': '4E',
-            'A388': '4F',
-            'B748': '4F',
-            'B739': '4C',
-            'MD11': '4D',
-            'B736': '3C',
-            'B764': '4D',
-            'B762': '4D',
-            'A124': '4F',
-            'A30B': '4D',
-            'A359': '4E',
-            'A35K': '4E',
-            'B190': '2B',
-            'IL76': '3D',
-            'A345': '4E',
-            'E145': '3B',
-            'L101': '4D',
-            'B753': '4D',
-            'A346': '4E',
-            'B743': '4E',
-            'A342': '4E',
-            'B703': '4D',
-            'T204': '4D'
-            }
-        
-        # 2. Atualizar com dados do arquivo (Se disponível)
-        if 'df_specs' in globals() and df_specs is not None:
-            cols_specs = df_specs.columns
-            possible_cats = ['categoria_aeronave', 'cod_categoria', 'ds_categoria', 'classe', 'cat_icao']
-            col_cat_found = next((c for c in possible_cats if c in cols_specs), None)
-            
-            if col_cat_found:
-                # Extrair mapa do arquivo
-                mapa_arquivo = dict(df_specs.select([
-                    pl.col("sg_equipamento_icao"), pl.col(col_cat_found)
-                ]).iter_rows())
-                
-                # Atualizar o mapa final (Arquivo tem prioridade sobre o backup)
-                mapa_final.update({k: v for k, v in mapa_arquivo.items() if v is not None})
-            else:
-                # Apenas aviso discreto, o backup garante o funcionamento
-                pass 
-
-        # 3. Aplicar Mapeamento ao DataFrame Histórico (Polars)
-        # Criar dataframe auxiliar para join
-        df_mapa = pl.DataFrame({
-            "aeronave": list(mapa_final.keys()),
-            "categoria_aeronave": list(mapa_final.values())
-        })
-        
-        # Join para adicionar categoria
-        df_cat_work = df_calculado.join(df_mapa, on="aeronave", how="left").with_columns(
-            pl.col("categoria_aeronave").fill_null("Outros")
+        # Categoria de cada aeronave a partir da dimensão de aeronaves carregada uma única vez
+        df_cat_work = df_calculado.with_columns(
+            pl.col("aeronave").replace_strict(categoria_por_aeronave, default="Outros").alias("categoria_aeronave")
         )
 
         # 6.2 CÁLCULO DAS PROJEÇÕES E PLOTAGEM
@@ -1319,7 +1876,7 @@ with tab1:
         # A. Agrupar as projeções absolutas (Pandas) usando o MESMO mapa
         # df_master_absoluto (calculado na seção 4) tem colunas = nomes de aeronaves
         df_abs_T = df_master_absoluto.drop(columns=["TOTAL_MERCADO"]).T
-        df_abs_T["categoria"] = df_abs_T.index.map(mapa_final).fillna("Outros")
+        df_abs_T["categoria"] = df_abs_T.index.map(categoria_por_aeronave).fillna("Outros")
         
         # Somar projeções por categoria
         df_master_cat_abs = df_abs_T.groupby("categoria").sum().T
@@ -1433,6 +1990,7 @@ with tab1:
 
     # Nova Seção: Evolução Temporal de Voos por Aeronave
     st.markdown("---")
+    marcar_secao("Aba 1 › Evolução temporal")
     st.header("📈 **Evolução Temporal de Movimentos (P + D) por Aeronave**")
 
     with st.expander("✈️ **Análise Temporal de Movimentos (P + D) por Aeronave**", expanded=False):
@@ -1479,80 +2037,34 @@ with tab1:
                 key="max_aeronaves"
             )
         
-        # Filtrar aeroportos da faixa selecionada
-        aeroportos_da_faixa = (df_com_faixas
-                              .filter(pl.col("faixa_personalizada") == faixa_selecionada_voos)
-                              .select("aeroporto")
-                              .unique())
+        # Tabela de pertencimento (aeroporto, ano → faixa) restrita à faixa selecionada
+        pertencimento_faixa_voos = (df_com_faixas
+                                    .filter(pl.col("faixa_personalizada") == faixa_selecionada_voos)
+                                    .select(["aeroporto", "ano"])
+                                    .unique())
         
-        if aeroportos_da_faixa.height > 0:
-            # Obter lista de aeroportos da faixa
-            lista_aeroportos_faixa = aeroportos_da_faixa["aeroporto"].to_list()
-            
-            # Filtrar df_filtrado1 pelos aeroportos da faixa selecionada
-            df_voos_faixa = df_filtrado1.filter(pl.col("aeroporto").is_in(lista_aeroportos_faixa))
-            
+        if pertencimento_faixa_voos.height > 0:
+            # Um único join: os voos de cada período entram apenas para aeroportos que estavam
+            # na faixa selecionada naquele ano específico
+            lf_voos_faixa = (df_filtrado1.lazy()
+                             .join(pertencimento_faixa_voos.lazy(), on=["aeroporto", "ano"], how="semi")
+                             .with_columns([
+                                 (pl.col("ano").cast(pl.Utf8) + "-M" + pl.col("mes").cast(pl.Utf8)).alias("periodo")
+                             ]))
             
+            # Agregar voos por período e aeronave no mesmo plano lazy (uma passada para qualquer quantidade de meses)
+            df_voos_filtrado_por_periodo, voos_por_periodo_aeronave = pl.collect_all([
+                lf_voos_faixa,
+                (lf_voos_faixa
+                 .group_by(["periodo", "aeronave"])
+                 .agg([
+                     pl.sum("quantidade_voos").alias("total_voos"),
+                     pl.sum("pax").alias("total_passageiros")
+                 ])
+                 .sort(["periodo", "aeronave"]))
+            ])
             
-            if df_voos_faixa.height > 0:
-                # Criar coluna de período (ano-mês)
-                df_voos_periodo = df_voos_faixa.with_columns([
-                    (pl.col("ano").cast(pl.Utf8) + "-M" + pl.col("mes").cast(pl.Utf8)).alias("periodo")
-                ])
-                
-                # NOVA LÓGICA: Filtrar por período específico
-                # Para cada período, incluir apenas aeroportos que estavam na faixa selecionada naquele período específico
-                
-                # Obter dados de faixas por período
-                faixas_por_periodo = (df_com_faixas
-                                    .with_columns([
-                                        (pl.col("ano").cast(pl.Utf8) + "-M" + pl.lit("1")).alias("periodo_base")
-                                    ])
-                                    .select(["aeroporto", "ano", "faixa_personalizada", "periodo_base"]))
-                
-                # Criar lista de períodos únicos dos dados de voos
-                periodos_voos = df_voos_periodo["periodo"].unique().to_list()
-                
-                # Para cada período, filtrar apenas aeroportos que estavam na faixa naquele ano
-                df_voos_filtrado_por_periodo = pl.DataFrame()
-                
-                for periodo in periodos_voos:
-                    # Extrair ano do período (formato: "2022-M1")
-                    ano_periodo = int(periodo.split("-M")[0])
-                    
-                    # Obter aeroportos que estavam na faixa selecionada neste ano específico
-                    aeroportos_faixa_ano = (faixas_por_periodo
-                                          .filter(
-                                              (pl.col("ano") == ano_periodo) &
-                                              (pl.col("faixa_personalizada") == faixa_selecionada_voos)
-                                          )
-                                          .select("aeroporto")
-                                          .unique())
-                    
-                    if aeroportos_faixa_ano.height > 0:
-                        # Filtrar voos deste período apenas para aeroportos que estavam na faixa neste ano
-                        lista_aeroportos_ano = aeroportos_faixa_ano["aeroporto"].to_list()
-                        
-                        voos_periodo_filtrado = (df_voos_periodo
-                                               .filter(
-                                                   (pl.col("periodo") == periodo) &
-                                                   (pl.col("aeroporto").is_in(lista_aeroportos_ano))
-                                               ))
-                        
-                        # Adicionar ao DataFrame consolidado
-                        if df_voos_filtrado_por_periodo.height == 0:
-                            df_voos_filtrado_por_periodo = voos_periodo_filtrado
-                        else:
-                            df_voos_filtrado_por_periodo = pl.concat([df_voos_filtrado_por_periodo, voos_periodo_filtrado])
-                
-                # Agregar voos por período e aeronave (agora com filtro correto por período)
-                voos_por_periodo_aeronave = (df_voos_filtrado_por_periodo
-                                            .group_by(["periodo", "aeronave"])
-                                            .agg([
-                                                pl.sum("quantidade_voos").alias("total_voos"),
-                                                pl.sum("pax").alias("total_passageiros")
-                                            ])
-                                            .sort(["periodo", "aeronave"]))
+            if df_voos_filtrado_por_periodo.height > 0:
                 
                 
                 # Identificar as aeronaves com mais voos para limitar a visualização
@@ -1909,13 +2421,9 @@ with tab1:
                     ano_periodo_detalhe = int(periodo_selecionado_detalhe.split("-M")[0])
                     
                     # Obter aeroportos que estavam na faixa selecionada neste ano específico
-                    aeroportos_faixa_ano_detalhe = (df_com_faixas
-                                                  .filter(
-                                                      (pl.col("ano") == ano_periodo_detalhe) &
-                                                      (pl.col("faixa_personalizada") == faixa_selecionada_voos)
-                                                  )
-                                                  .select("aeroporto")
-                                                  .unique())
+                    aeroportos_faixa_ano_detalhe = (pertencimento_faixa_voos
+                                                  .filter(pl.col("ano") == ano_periodo_detalhe)
+                                                  .select("aeroporto"))
                     
                     if aeroportos_faixa_ano_detalhe.height > 0:
                         lista_aeroportos_ano_detalhe = aeroportos_faixa_ano_detalhe["aeroporto"].to_list()
@@ -2033,8 +2541,182 @@ with tab1:
             st.warning(f"⚠️ **Nenhum aeroporto encontrado na {faixa_selecionada_voos}.**")
             st.info("💡 Tente selecionar uma faixa diferente.")
 
+    st.markdown("---")
+    marcar_secao("Aba 1 › Capacidade ofertada")
+    st.header("🪑 **Capacidade Ofertada e Aproveitamento**")
+
+    with st.expander("🪑 **Assentos Oferecidos, Aproveitamento e Participação por Assentos**", expanded=False):
+        st.markdown("*Assentos oferecidos = movimentos (P + D) × moda de assentos da aeronave. Aproveitamento = passageiros (E + D) ÷ assentos oferecidos (apenas aeronaves com assentos conhecidos).*")
+
+        # Camada de capacidade por faixa, aeroporto, aeronave e mês (reaproveitada entre seleções)
+        cubo_capacidade = construir_cubo_capacidade(df_filtrado1, df_com_faixas)
+
+        col_cap1, col_cap2, col_cap3 = st.columns(3)
+        with col_cap1:
+            faixas_disponiveis_cap = sorted(cubo_capacidade["faixa_personalizada"].unique().to_list(), key=ordenar_faixas)
+            faixa_selecionada_cap = st.selectbox(
+                "📊 **Selecione a Faixa:**",
+                options=faixas_disponiveis_cap,
+                index=0,
+                key="faixa_capacidade"
+            )
+        with col_cap2:
+            anos_disponiveis_cap = sorted(cubo_capacidade["ano"].unique().to_list())
+            anos_selecionados_cap = st.multiselect(
+                "🗓️ **Anos (tabelas):**",
+                options=anos_disponiveis_cap,
+                default=anos_disponiveis_cap[-1:],
+                help="Anos somados nas métricas e tabelas. O gráfico mensal mostra todo o histórico da faixa.",
+                key="anos_capacidade"
+            ) or anos_disponiveis_cap[-1:]
+        with col_cap3:
+            visao_capacidade = st.radio(
+                "🔎 **Detalhar por:**",
+                options=["Aeronave", "Aeroporto"],
+                horizontal=True,
+                key="visao_capacidade"
+            )
+
+        capacidade_faixa = cubo_capacidade.filter(pl.col("faixa_personalizada") == faixa_selecionada_cap)
+        capacidade_anos = capacidade_faixa.filter(pl.col("ano").is_in(anos_selecionados_cap))
+
+        if capacidade_anos.height > 0:
+            resumo_cap = agregar_capacidade(capacidade_anos, ["faixa_personalizada"]).row(0, named=True)
+            col_m1, col_m2, col_m3 = st.columns(3)
+            col_m1.metric("Assentos Oferecidos", formatar_numero(resumo_cap["assentos_oferecidos"]))
+            col_m2.metric("Passageiros (E + D)", formatar_numero(resumo_cap["pax"]))
+            col_m3.metric("Aproveitamento", f"{resumo_cap['aproveitamento']:.1%}" if resumo_cap["aproveitamento"] is not None else "N/A")
+
+            # Evolução mensal: aproveitamento da faixa e participação por assentos das principais aeronaves
+            capacidade_mensal = agregar_capacidade(capacidade_faixa, ["ano", "mes"]).with_columns(
+                (pl.col("ano").cast(pl.Utf8) + "-M" + pl.col("mes").cast(pl.Utf8).str.zfill(2)).alias("periodo")
+            )
+            fig_aproveitamento = px.line(
+                capacidade_mensal.to_pandas(),
+                x="periodo",
+                y="aproveitamento",
+                markers=True,
+                title=f"Aproveitamento Mensal - {faixa_selecionada_cap}",
+                labels={"periodo": "Período (Ano-Mês)", "aproveitamento": "Aproveitamento"}
+            )
+            fig_aproveitamento.update_layout(yaxis=dict(tickformat=".0%"), xaxis=dict(type='category', tickangle=-45))
+            st.plotly_chart(fig_aproveitamento, use_container_width=True)
+
+            top_aeronaves_cap = (agregar_capacidade(capacidade_anos, ["aeronave"])
+                                 .sort("assentos_oferecidos", descending=True)
+                                 .head(10)["aeronave"].to_list())
+            # Cores pela lista global de aeronaves, como nos demais gráficos
+            todas_aeronaves_disponiveis_cap = df_filtrado1["aeronave"].unique().to_list()
+            participacao_mensal = (agregar_capacidade(capacidade_faixa, ["ano", "mes", "aeronave"], participacao_em=["ano", "mes"])
+                                   .filter(pl.col("aeronave").is_in(top_aeronaves_cap))
+                                   .with_columns(
+                                       (pl.col("ano").cast(pl.Utf8) + "-M" + pl.col("mes").cast(pl.Utf8).str.zfill(2)).alias("periodo")
+                                   ))
+            fig_participacao_assentos = px.line(
+                participacao_mensal.to_pandas(),
+                x="periodo",
+                y="participacao_assentos",
+                color="aeronave",
+                color_discrete_map={a: obter_cor_aeronave(a, todas_aeronaves_disponiveis_cap) for a in top_aeronaves_cap},
+                category_orders={"aeronave": top_aeronaves_cap},
+                title=f"Participação nos Assentos Oferecidos (10 maiores) - {faixa_selecionada_cap}",
+                labels={"periodo": "Período (Ano-Mês)", "participacao_assentos": "Participação nos assentos (%)", "aeronave": "Aeronave"}
+            )
+            fig_participacao_assentos.update_layout(yaxis_ticksuffix="%", hovermode="x unified", xaxis=dict(type='category', tickangle=-45))
+            st.plotly_chart(fig_participacao_assentos, use_container_width=True)
+
+            chave_visao = "aeronave" if visao_capacidade == "Aeronave" else "aeroporto"
+            df_tabela_cap = (agregar_capacidade(capacidade_anos, [chave_visao])
+                             .sort("assentos_oferecidos", descending=True)
+                             .select(
+                                 pl.col(chave_visao).alias(visao_capacidade),
+                                 pl.col("movimentos").alias("Movimentos (P + D)"),
+                                 pl.col("assentos_oferecidos").alias("Assentos Oferecidos"),
+                                 pl.col("pax").alias("Passageiros (E + D)"),
+                                 (pl.col("aproveitamento") * 100).round(1).alias("Aproveitamento (%)"),
+                                 pl.col("participacao_assentos").round(2).alias("Participação Assentos (%)"),
+                                 pl.col("participacao_movimentos").round(2).alias("Participação Movimentos (%)")
+                             ))
+            st.dataframe(df_tabela_cap.to_pandas(), use_container_width=True, hide_index=True)
+        else:
+            st.warning(f"⚠️ Nenhum dado de capacidade para a {faixa_selecionada_cap} nos anos selecionados.")
+
+    st.markdown("---")
+    marcar_secao("Aba 1 › Perfil de pista")
+    st.header("🛬 **Perfil de Pista Requerida por Faixa**")
+
+    with st.expander("🛬 **Distribuição da Pista Requerida (ponderada por movimentos)**", expanded=False):
+        st.markdown("*Pista requerida (Pista_Requerida_100%) de cada aeronave ponderada pelos movimentos (P + D) dos aeroportos da faixa no ano. O percentil P90, por exemplo, é a menor pista que atende 90% dos movimentos.*")
+
+        col_pista1, col_pista2 = st.columns(2)
+        with col_pista1:
+            anos_disponiveis_pista = sorted(df_com_faixas["ano"].unique().to_list())
+            ano_selecionado_pista = st.selectbox(
+                "🗓️ **Ano:**",
+                options=anos_disponiveis_pista,
+                index=len(anos_disponiveis_pista) - 1,
+                key="ano_perfil_pista"
+            )
+        with col_pista2:
+            participacao_minima_pista = st.number_input(
+                "✈️ **Participação mínima da aeronave crítica (%):**",
+                min_value=0.0,
+                max_value=50.0,
+                value=0.5,
+                step=0.1,
+                help="Aeronaves com participação nos movimentos da faixa abaixo deste valor não concorrem a aeronave crítica (operações esporádicas)",
+                key="participacao_minima_pista"
+            )
+
+        # Perfil de todas as faixas e anos em uma passada, reaproveitado enquanto a configuração de faixas não mudar
+        resumo_pista, distribuicao_pista = perfil_pista_por_faixa(
+            df_filtrado1, df_com_faixas, participacao_minima_critica=participacao_minima_pista / 100
+        )
+        resumo_pista_ano = resumo_pista.filter(pl.col("ano") == ano_selecionado_pista)
+
+        if resumo_pista_ano.height > 0:
+            ordem_faixas_pista = sorted(resumo_pista_ano["faixa_personalizada"].to_list(), key=ordenar_faixas)
+
+            fig_pista = px.line(
+                distribuicao_pista.filter(pl.col("ano") == ano_selecionado_pista).to_pandas(),
+                x="pista_requerida",
+                y="acumulado",
+                color="faixa_personalizada",
+                line_shape="hv",
+                markers=True,
+                category_orders={"faixa_personalizada": ordem_faixas_pista},
+                title=f"Movimentos Atendidos por Comprimento de Pista - {ano_selecionado_pista}",
+                labels={
+                    "pista_requerida": "Pista Requerida (m)",
+                    "acumulado": "Movimentos (P + D) atendidos",
+                    "faixa_personalizada": "Faixa"
+                }
+            )
+            fig_pista.update_layout(yaxis=dict(tickformat=".0%"), hovermode="x unified")
+            st.plotly_chart(fig_pista, use_container_width=True)
+
+            colunas_percentis = [c for c in resumo_pista_ano.columns if c.startswith("pista_p")]
+            df_resumo_pista = (resumo_pista_ano
+                               .with_columns(pl.col("faixa_personalizada").replace_strict(
+                                   {f: i for i, f in enumerate(ordem_faixas_pista)}).alias("_ordem"))
+                               .sort("_ordem")
+                               .select(
+                                   [pl.col("faixa_personalizada").alias("Faixa"),
+                                    pl.col("movimentos").alias("Movimentos (P + D)"),
+                                    pl.col("movimentos_sem_pista").alias("Movimentos sem Pista Conhecida"),
+                                    pl.col("pista_media").alias("Pista Média (m)")]
+                                   + [pl.col(c).alias(f"P{c.removeprefix('pista_p')} (m)") for c in colunas_percentis]
+                                   + [pl.col("pista_critica").alias("Pista Crítica (m)"),
+                                      pl.col("aeronave_critica").alias("Aeronave Crítica"),
+                                      pl.col("movimentos_aeronave_critica").alias("Movimentos da Aeronave Crítica")]
+                               ))
+            st.dataframe(df_resumo_pista.to_pandas(), use_container_width=True, hide_index=True)
+        else:
+            st.warning(f"⚠️ Nenhum movimento com pista requerida conhecida em {ano_selecionado_pista}.")
+
     # Nova Seção: Percentual de Aeroportos por Aeronave
     st.markdown("---")
+    marcar_secao("Aba 1 › Percentual de aeroportos por aeronave")
     st.header("📊 **Percentual de Aeroportos por Aeronave**")
 
     with st.expander("✈️ **Análise de Utilização de Aeronaves por Faixa**", expanded=False):
@@ -2081,6 +2763,19 @@ with tab1:
                 key="max_aeronaves_perc"
             )
         
+        # Opção de janela para o cálculo do percentual
+        janela_perc = st.radio(
+            "🗓️ **Janela do Percentual:**",
+            options=["Mensal", "Móvel de 12 meses"],
+            horizontal=True,
+            help="Mensal: aeroportos com movimentos da aeronave no mês. Móvel de 12 meses: aeroportos com movimentos da aeronave em algum dos 12 meses encerrados no período. "
+                 "Nos dois casos o total (denominador) são os aeroportos da faixa com movimentos de qualquer aeronave no período",
+            key="janela_percentual"
+        )
+        
+        # Tabela de presença (aeroporto, aeronave, período) com a faixa de cada aeroporto no ano do período
+        presenca_aeronaves = construir_presenca_aeronaves(df_filtrado1, df_com_faixas)
+        
         # Filtrar aeroportos da faixa selecionada
         aeroportos_da_faixa_perc = (df_com_faixas
                                    .filter(pl.col("faixa_personalizada") == faixa_selecionada_perc)
@@ -2088,85 +2783,21 @@ with tab1:
                                    .unique())
         
         if aeroportos_da_faixa_perc.height > 0:
-            # Obter lista de aeroportos da faixa
-            lista_aeroportos_faixa_perc = aeroportos_da_faixa_perc["aeroporto"].to_list()
-            
-            # Filtrar df_filtrado1 pelos aeroportos da faixa selecionada
-            df_voos_faixa_perc = df_filtrado1.filter(pl.col("aeroporto").is_in(lista_aeroportos_faixa_perc))
+            # Registros de voos apenas dos aeroportos que estavam na faixa selecionada no ano de cada período
+            df_voos_filtrado_por_periodo_perc = presenca_aeronaves.filter(pl.col("faixa_personalizada") == faixa_selecionada_perc)
             
-            if df_voos_faixa_perc.height > 0:
-                # Criar coluna de período (ano-mês)
-                df_voos_periodo_perc = df_voos_faixa_perc.with_columns([
-                    (pl.col("ano").cast(pl.Utf8) + "-M" + pl.col("mes").cast(pl.Utf8)).alias("periodo")
-                ])
-                
-                # NOVA LÓGICA: Filtrar por período específico
-                # Para cada período, incluir apenas aeroportos que estavam na faixa selecionada naquele período específico
-                
-                # Obter dados de faixas por período
-                faixas_por_periodo_perc = (df_com_faixas
-                                         .with_columns([
-                                             (pl.col("ano").cast(pl.Utf8) + "-M" + pl.lit("1")).alias("periodo_base")
-                                         ])
-                                         .select(["aeroporto", "ano", "faixa_personalizada", "periodo_base"]))
-                
-                # Criar lista de períodos únicos dos dados de voos
-                periodos_voos_perc = df_voos_periodo_perc["periodo"].unique().to_list()
+            if df_voos_filtrado_por_periodo_perc.height > 0:
+                # Percentual de todas as faixas e períodos em um único group-by (reaproveitado entre seleções)
+                percentual_por_aeronave = (calcular_percentual_aeroportos_por_aeronave(
+                                               cubo_presenca,
+                                               df_com_faixas,
+                                               12 if janela_perc == "Móvel de 12 meses" else 1
+                                           )
+                                           .filter(pl.col("faixa_personalizada") == faixa_selecionada_perc)
+                                           .drop("faixa_personalizada"))
                 
-                # Para cada período, filtrar apenas aeroportos que estavam na faixa naquele ano
-                df_voos_filtrado_por_periodo_perc = pl.DataFrame()
-                
-                for periodo in periodos_voos_perc:
-                    # Extrair ano do período (formato: "2022-M1")
-                    ano_periodo = int(periodo.split("-M")[0])
-                    
-                    # Obter aeroportos que estavam na faixa selecionada neste ano específico
-                    aeroportos_faixa_ano_perc = (faixas_por_periodo_perc
-                                               .filter(
-                                                   (pl.col("ano") == ano_periodo) &
-                                                   (pl.col("faixa_personalizada") == faixa_selecionada_perc)
-                                               )
-                                               .select("aeroporto")
-                                               .unique())
-                    
-                    if aeroportos_faixa_ano_perc.height > 0:
-                        # Filtrar voos deste período apenas para aeroportos que estavam na faixa neste ano
-                        lista_aeroportos_ano_perc = aeroportos_faixa_ano_perc["aeroporto"].to_list()
-                        
-                        voos_periodo_filtrado_perc = (df_voos_periodo_perc
-                                                    .filter(
-                                                        (pl.col("periodo") == periodo) &
-                                                        (pl.col("aeroporto").is_in(lista_aeroportos_ano_perc))
-                                                    ))
-                        
-                        # Adicionar ao DataFrame consolidado
-                        if df_voos_filtrado_por_periodo_perc.height == 0:
-                            df_voos_filtrado_por_periodo_perc = voos_periodo_filtrado_perc
-                        else:
-                            df_voos_filtrado_por_periodo_perc = pl.concat([df_voos_filtrado_por_periodo_perc, voos_periodo_filtrado_perc])
-                
-                # Calcular total de aeroportos únicos por período na faixa (agora com filtro correto)
-                total_aeroportos_por_periodo = (df_voos_filtrado_por_periodo_perc
-                                              .group_by("periodo")
-                                              .agg([
-                                                  pl.n_unique("aeroporto").alias("total_aeroportos")
-                                              ]))
-                
-                # Calcular aeroportos únicos que usam cada aeronave por período (agora com filtro correto)
-                aeroportos_por_aeronave_periodo = (df_voos_filtrado_por_periodo_perc
-                                                 .filter(pl.col("quantidade_voos") > 0)  # Apenas aeroportos com voos
-                                                 .group_by(["periodo", "aeronave"])
-                                                 .agg([
-                                                     pl.n_unique("aeroporto").alias("aeroportos_usando")
-                                                 ]))
-                
-                # Juntar com total de aeroportos para calcular percentual
-                percentual_por_aeronave = (aeroportos_por_aeronave_periodo
-                                         .join(total_aeroportos_por_periodo, on="periodo")
-                                         .with_columns([
-                                             (pl.col("aeroportos_usando") / pl.col("total_aeroportos") * 100).alias("percentual")
-                                         ])
-                                         .sort(["periodo", "aeronave"]))
+                # Total de aeroportos únicos por período na faixa
+                total_aeroportos_por_periodo = percentual_por_aeronave.select(["periodo", "total_aeroportos"]).unique()
                 
                 # Identificar as aeronaves com maior utilização média para limitar visualização
                 utilizacao_media = (percentual_por_aeronave
@@ -2226,6 +2857,7 @@ with tab1:
                 
                 # Gráfico de barras
                 st.markdown("#### 📈 **Percentual de Aeroportos por Aeronave**")
+                st.caption("Percentual = aeroportos da faixa que operaram a aeronave ÷ aeroportos da faixa com movimentos de qualquer aeronave no período (o \"Total\" acima de cada barra).")
                 
                 if len(df_pivot_perc) > 0:
                     # Obter todas as aeronaves disponíveis nos dados para consistência de cores
@@ -2254,7 +2886,7 @@ with tab1:
                     
                     # Configurar layout do gráfico
                     fig_perc.update_layout(
-                        title=f"Percentual de Aeroportos por Aeronave - {faixa_selecionada_perc}",
+                        title=f"Percentual de Aeroportos por Aeronave - {faixa_selecionada_perc} ({janela_perc})",
                         xaxis_title="Período (Ano-Mês)",
                         yaxis_title="Percentual de Aeroportos (%)",
                         height=500,
@@ -2501,75 +3133,19 @@ with tab1:
             st.info("💡 Tente selecionar uma faixa diferente.")
 
 with tab2:
+    marcar_secao("Aba 2 › Participação por categoria")
     st.header("✈️ **Análise da Participação da Categoria de Aeronave por Faixa de Passageiros do Aeroporto**")
     st.markdown("### Visualize a composição dos movimentos por categoria de aeronave para aeroportos em faixas específicas de movimentação de passageiros (E + D).")
 
     # Adicionar seção informativa sobre as categorias
     with st.expander("ℹ️ **Sobre as Categorias de Aeronave**", expanded=False):
-        # Dicionário de mapeamento de aeronave para categoria
-        dicionario_aeronaves = {
-            'ATR': '2C',
-            'E195': '4C',
-            'A20N': '3C',
-            'B738': '4C',
-            'A321': '4C',
-            'A320': '4C',
-            'B38M': '4C',
-            'E295': '3C',
-            'B737': '4C',
-            'A21N': '4C',
-            'A319': '3C',
-            'C208': '1B',
-            'A332': '4E',
-            'B77W': '4E',
-            'A339': '4E',
-            'B763': '4D',
-            'B789': '4E',
-            'B734': '4C',
-            'B733': '4C',
-            'B722': '4C',
-            'B77L': '4E',
-            'B744': '4E',
-            'B788': '4E',
-            'CRJ2': '3B',
-            'A343': '4E',
-            'B772': '4E',
-            'B39M': '4C',
-            'A333': '4E',
-            'B773': '4E',
-            'E190': '4C',
-            'B78X': '4E',
-            'A388': '4F',
-            'B748': '4F',
-            'B739': '4C',
-            'MD11': '4D',
-            'B736': '3C',
-            'B764': '4D',
-            'B762': '4D',
-            'A124': '4F',
-            'A30B': '4D',
-            'A359': '4E',
-            'A35K': '4E',
-            'B190': '2B',
-            'IL76': '3D',
-            'A345': '4E',
-            'E145': '3B',
-            'L101': '4D',
-            'B753': '4D',
-            'A346': '4E',
-            'B743': '4E',
-            'A342': '4E',
-            'B703': '4D',
-            'T204': '4D'
-            }
-        
-        # Agrupar aeronaves por categoria a partir do dicionário
+        # Agrupar por categoria as aeronaves do mapeamento de categorias ICAO
         aeronaves_por_categoria = {}
-        for aeronave, categoria in dicionario_aeronaves.items():
+        for aeronave, categoria in motor_faixas.CATEGORIAS_AERONAVES.items():
             aeronaves_por_categoria.setdefault(categoria, []).append(aeronave)
 
         # Ordenar categorias pela ordem desejada
-        ordem_info = ["1B", "2B", "3B", "2C", "3C", "3D", "4C", "4D", "4E", "4F"]
+        ordem_info = ORDEM_CATEGORIAS
         
         # Exibir cada categoria
         for categoria in ordem_info:
@@ -2639,7 +3215,7 @@ with tab2:
 
     if df_joined.height > 0:
         # Ordem das categorias para garantir consistência
-        ordem_desejada = ["1B", "2B", "3B", "2C", "3C", "3D", "4C", "4D", "4E", "4F"]
+        ordem_desejada = ORDEM_CATEGORIAS
         
         # Obter todas as categorias únicas presentes nos dados do ano selecionado
         categorias_nos_dados = df_joined["categoria_aeronave"].unique().to_list()
@@ -2657,70 +3233,38 @@ with tab2:
         # Aplicar a ordenação
         ordem_final_para_legenda = sorted(list(todas_as_categorias), key=sort_key_categoria)
         
-        results_data = []
         detailed_data = {}
-        all_categories_df = pl.DataFrame({"categoria_aeronave": ordem_final_para_legenda})
+
+        # Curva acumulada por categoria calculada uma única vez; os limites abaixo são respondidos por indexação
+        curva_categorias = construir_curva_acumulada_categorias(df_joined, ordem_final_para_legenda)
 
         # Adicionar 0 no início para o primeiro intervalo
         thresholds_with_zero = [0] + thresholds
 
-        # Adicionar um ponto final para o gráfico para o intervalo "infinito", usando 50M como limite visual
-        final_plot_point = 50_000_000
+        # Adicionar um ponto final para o gráfico para o intervalo "infinito", usando LIMITE_FINAL_CATEGORIAS (50M) como limite visual
+        final_plot_point = LIMITE_FINAL_CATEGORIAS
         if thresholds and final_plot_point > thresholds[-1]:
             thresholds_with_zero.append(final_plot_point)
         elif thresholds:
             # Se o último threshold já for maior, usar um valor ligeiramente superior para o ponto final
             thresholds_with_zero.append(thresholds[-1] * 1.05)
 
-        for i in range(len(thresholds_with_zero) - 1):
-            lower_bound = thresholds_with_zero[i]
-            upper_bound = thresholds_with_zero[i+1]
-
-            # O último intervalo deve incluir tudo acima do limite inferior
-            if i == len(thresholds_with_zero) - 2:
-                df_in_range = df_joined.filter(pl.col("passageiros_projetado") > lower_bound)
-            else:
-                df_in_range = df_joined.filter(
-                    (pl.col("passageiros_projetado") > lower_bound) & (pl.col("passageiros_projetado") <= upper_bound)
-                )
-
-            if df_in_range.height > 0:
-                total_voos_threshold = df_in_range["quantidade_voos"].sum()
-                total_passageiros_threshold = df_in_range["pax"].sum()
-                if total_voos_threshold > 0:
-                    voos_por_categoria = (
-                        df_in_range
-                        .group_by("categoria_aeronave")
-                        .agg([
-                            pl.sum("quantidade_voos").alias("voos_categoria"),
-                            pl.sum("pax").alias("passageiros_categoria")
-                        ])
-                    )
-                    
-                    # Join com todas as categorias para garantir que todas estejam presentes, preencher nulos com 0
-                    df_full_cat = all_categories_df.join(voos_por_categoria, on="categoria_aeronave", how="left").with_columns([
-                        pl.col("voos_categoria").fill_null(0),
-                        pl.col("passageiros_categoria").fill_null(0)
-                    ])
-
-                    df_threshold_results = df_full_cat.with_columns([
-                        (pl.col("voos_categoria") / total_voos_threshold * 100).alias("percentual_voos"),
-                        (pl.col("passageiros_categoria") / total_passageiros_threshold * 100 if total_passageiros_threshold > 0 else 0).alias("percentual_passageiros"),
-                        pl.lit(upper_bound).cast(pl.Float64).alias("limite_passageiros")
-                    ])
-                    
-                    results_data.append(df_threshold_results)
-
-                    # Armazenar dados detalhados
-                    airports_list = df_in_range["aeroporto"].unique().sort().to_list()
-                    detailed_data[upper_bound] = {
-                        "airports": airports_list,
-                        "data": df_threshold_results,
-                        "total_movimentos": total_voos_threshold
-                    }
+        df_final = participacao_categorias_intervalos(curva_categorias, thresholds_with_zero)
+
+        # Armazenar dados detalhados
+        limites_processados = df_final["limite_passageiros"].unique().sort().to_list()
+        for upper_bound in limites_processados:
+            i = thresholds_with_zero.index(upper_bound)
+            lower_bound = thresholds_with_zero[i - 1]
+            ultimo_intervalo = i == len(thresholds_with_zero) - 1
+            df_threshold_results = df_final.filter(pl.col("limite_passageiros") == upper_bound)
+            detailed_data[upper_bound] = {
+                "airports": aeroportos_intervalo_curva(curva_categorias, lower_bound, None if ultimo_intervalo else upper_bound),
+                "data": df_threshold_results,
+                "total_movimentos": df_threshold_results["voos_categoria"].sum()
+            }
 
-        if results_data:
-            df_final = pl.concat(results_data).sort("limite_passageiros")
+        if df_final.height > 0:
 
             # Gráfico de linhas
             if len(anos_selecionados_categoria) == 1:
@@ -2731,6 +3275,17 @@ with tab2:
             
             st.markdown(f"#### 📈 **Participação de categoria de aeronave por Faixa de Passageiros - {titulo_anos}**")
 
+            tipo_curva_categoria = st.radio(
+                "**Tipo de Curva:**",
+                options=["Por faixa", "Contínua acumulada (1.000 pontos)"],
+                horizontal=True,
+                key="tipo_curva_categoria",
+                help="Por faixa: composição dos movimentos em cada intervalo de passageiros configurado. "
+                     "Contínua acumulada: participação de cada categoria considerando todos os aeroportos com até X passageiros."
+            )
+            curva_continua = tipo_curva_categoria != "Por faixa"
+            df_grafico_categoria = curva_continua_categorias(curva_categorias, 1000) if curva_continua else df_final
+
             # Gerar cores consistentes para as categorias
             cores_paleta_cat = gerar_paleta_cores_aeronaves()
             mapa_cores_categoria = {
@@ -2739,7 +3294,7 @@ with tab2:
             }
 
             fig_cumulative_fleet = px.line(
-                df_final.to_pandas(),
+                df_grafico_categoria.to_pandas(),
                 x="limite_passageiros",
                 y="percentual_voos",
                 color="categoria_aeronave",
@@ -2750,12 +3305,13 @@ with tab2:
                     'percentual_voos': 'Participação nos movimentos (P + D)',
                     'categoria_aeronave': 'Categoria da Aeronave'
                 },
-                markers=True,
+                markers=not curva_continua,
                 hover_name="categoria_aeronave"
             )
 
             fig_cumulative_fleet.update_traces(
-                hovertemplate="Participação: %{y:.2f}%<extra></extra>"
+                hovertemplate=("Participação acumulada: %{y:.2f}%<extra></extra>" if curva_continua
+                               else "Participação: %{y:.2f}%<extra></extra>")
             )
 
             # Formatar os labels do eixo x para maior clareza
@@ -2899,6 +3455,7 @@ with tab2:
         st.warning(f"⚠️ Nenhum dado de voos encontrado para os anos {anos_str}.")
 
 with tab3:
+    marcar_secao("Aba 3 › Presença de movimentos")
     st.header("📋 **Tabela de Presença de Movimentos**")
     st.markdown("### Visualize a presença de movimentos por aeroporto, aeronave e período (mês-ano)")
     
@@ -2909,18 +3466,8 @@ with tab3:
             (pl.col("ano").cast(pl.Utf8) + "-" + pl.col("mes").cast(pl.Utf8).str.zfill(2)).alias("periodo")
         ])
         
-        # Obter períodos únicos e ordená-los cronologicamente
-        periodos_unicos_raw = df_presenca["periodo"].unique().to_list()
-        
-        # Função para ordenar períodos cronologicamente
-        def ordenar_periodos_cronologicamente_presenca(periodos):
-            def chave_ordenacao(periodo):
-                # Formato: "2022-01" (ano-mes com zero à esquerda)
-                ano, mes = periodo.split("-")
-                return (int(ano), int(mes))
-            return sorted(periodos, key=chave_ordenacao)
-        
-        periodos_unicos = ordenar_periodos_cronologicamente_presenca(periodos_unicos_raw)
+        # Períodos (ano-mês) do eixo de meses do cubo de presença, já em ordem cronológica
+        periodos_unicos = [f"{ano}-{mes:02d}" for ano, mes in zip(cubo_presenca["ano"], cubo_presenca["mes"])]
         
         # Filtros por aeroporto e aeronave
         st.markdown("#### 🔍 **Filtros**")
@@ -3005,74 +3552,164 @@ with tab3:
             else:
                 st.info(f"🔍 **Filtros ativos:** {len(aeroportos_selecionados)} aeroportos, {len(aeronaves_selecionadas)} aeronaves")
         
+        # Limite de tamanho: estimar combinações × meses antes de montar tabelas e gráficos
+        col_orcamento, col_criterio = st.columns(2)
+        with col_orcamento:
+            orcamento_celulas = st.number_input(
+                "🛡️ **Limite de células (combinações × meses):**",
+                min_value=10_000,
+                max_value=5_000_000,
+                value=100_000,
+                step=10_000,
+                help="Acima deste limite apenas as combinações mais relevantes são analisadas (top-k), a menos que o cálculo completo seja solicitado",
+                key="orcamento_celulas_presenca"
+            )
+        with col_criterio:
+            criterios_top_k = {
+                "Movimentos (P + D)": "movimentos",
+                "Meses consecutivos máximo": "sequencia"
+            }
+            criterio_top_k = st.selectbox(
+                "🏅 **Critério do top-k:**",
+                options=list(criterios_top_k.keys()),
+                index=0,
+                help="Como ranquear as combinações quando a seleção ultrapassa o limite",
+                key="criterio_top_k_presenca"
+            )
+        
+        combinacoes_estimadas, meses_estimados, celulas_estimadas = estimar_tamanho_presenca(
+            cubo_presenca, aeroportos_selecionados, aeronaves_selecionadas
+        )
+        
+        # O cálculo completo vale apenas para a seleção em que foi solicitado
+        assinatura_selecao = hashlib.md5(
+            json.dumps([sorted(aeroportos_selecionados), sorted(aeronaves_selecionadas)]).encode()
+        ).hexdigest()
+        calcular_completo = st.session_state.get("presenca_calculo_completo") == assinatura_selecao
+        
+        df_pares_top_k = None
+        if celulas_estimadas > orcamento_celulas and not calcular_completo:
+            k_combinacoes = max(1, int(orcamento_celulas // max(meses_estimados, 1)))
+            df_pares_top_k = top_combinacoes_presenca(
+                cubo_presenca, df_presenca_filtrado, aeroportos_selecionados, aeronaves_selecionadas,
+                criterios_top_k[criterio_top_k], k_combinacoes
+            )
+            df_presenca_filtrado = df_presenca_filtrado.join(df_pares_top_k, on=["aeroporto", "aeronave"], how="semi")
+            
+            col_aviso_top_k, col_botao_top_k = st.columns([3, 1])
+            with col_aviso_top_k:
+                st.warning(f"⚠️ **Seleção grande:** {formatar_numero(combinacoes_estimadas)} combinações × {meses_estimados} meses = {formatar_numero(celulas_estimadas)} células. "
+                           f"Mostrando as {formatar_numero(df_pares_top_k.height)} primeiras combinações por {criterio_top_k}.")
+            with col_botao_top_k:
+                if st.button("🧮 Calcular completo", key="btn_calcular_completo_presenca", help="Analisar todas as combinações da seleção (pode ser lento)"):
+                    st.session_state["presenca_calculo_completo"] = assinatura_selecao
+                    # O st.rerun interrompe o script antes do registro do fim da página
+                    registrar_metricas_desempenho()
+                    st.rerun()
+        
         # Verificar se há dados após filtros
         if df_presenca_filtrado.height == 0:
             st.warning("⚠️ **Nenhum dado encontrado** com os filtros selecionados.")
             st.info("💡 Tente ajustar os filtros de aeroporto ou aeronave.")
         else:
         
-            # Criar tabela de presença: aeroporto + aeronave como chave, períodos como colunas
-            df_presenca_tabela = (df_presenca_filtrado
-                                 .group_by(["aeroporto", "aeronave"])
-                                 .agg([
-                                     pl.col("periodo").unique().alias("periodos_com_movimento")
-                                 ]))
-            
-            # Criar DataFrame com todas as combinações aeroporto-aeronave e todos os períodos
-            aeroportos_unicos = sorted(df_presenca_filtrado["aeroporto"].unique().to_list())
-            aeronaves_unicas = sorted(df_presenca_filtrado["aeronave"].unique().to_list())
-        
-            # Criar todas as combinações
-            combinacoes = []
-            for aeroporto in aeroportos_unicos:
-                for aeronave in aeronaves_unicas:
-                    combinacoes.append({"aeroporto": aeroporto, "aeronave": aeronave})
-            
-            df_combinacoes = pl.DataFrame(combinacoes)
-            
-            # Fazer join com os dados de presença
-            df_final_presenca = df_combinacoes.join(df_presenca_tabela, on=["aeroporto", "aeronave"], how="left")
-            
-            # Criar colunas para cada período
-            for periodo in periodos_unicos:
-                df_final_presenca = df_final_presenca.with_columns([
-                    pl.when(pl.col("periodos_com_movimento").is_not_null() & 
-                           pl.col("periodos_com_movimento").list.contains(periodo))
-                    .then(pl.lit("Sim"))
-                    .otherwise(pl.lit("Não"))
-                    .alias(periodo)
-                ])
-            
-            # Remover coluna auxiliar
-            df_final_presenca = df_final_presenca.drop("periodos_com_movimento")
-            
-            # Filtrar linhas que têm pelo menos um "Sim" (remover linhas com todos "Não")
-            # Criar condição: pelo menos uma coluna de período deve ser "Sim"
-            condicao_tem_movimento = pl.lit(False)
-            for periodo in periodos_unicos:
-                condicao_tem_movimento = condicao_tem_movimento | (pl.col(periodo) == "Sim")
-            
-            # Aplicar filtro para manter apenas linhas com pelo menos um movimento
-            df_final_presenca = df_final_presenca.filter(condicao_tem_movimento)
-            
-            # Ordenar por aeroporto e aeronave
-            df_final_presenca = df_final_presenca.sort(["aeroporto", "aeronave"])
+            # Combinações com movimento da seleção, direto do cubo (popcount, sem montar a tabela de presença)
+            df_combinacoes_selecao = combinacoes_presenca(cubo_presenca, aeroportos_selecionados, aeronaves_selecionadas)
+            if df_pares_top_k is not None:
+                df_combinacoes_selecao = df_combinacoes_selecao.join(df_pares_top_k, on=["aeroporto", "aeronave"], how="semi")
         
             # Mostrar informações sobre a tabela
             st.info(f"""
             📊 **Informações da Tabela:**
-            - **Total de aeroportos:** {len(aeroportos_unicos)}
-            - **Total de aeronaves:** {len(aeronaves_unicas)}
+            - **Total de aeroportos:** {df_combinacoes_selecao["aeroporto"].n_unique()}
+            - **Total de aeronaves:** {df_combinacoes_selecao["aeronave"].n_unique()}
             - **Períodos analisados:** {len(periodos_unicos)} ({periodos_unicos[0]} a {periodos_unicos[-1]})
-            - **Total de combinações:** {df_final_presenca.height}
+            - **Total de combinações:** {df_combinacoes_selecao.height}
             """)
             
             # Mostrar a tabela
             st.markdown("#### 📋 **Tabela de Presença de Movimentos**")
             st.markdown("*'Sim' = Existe movimento | 'Não' = Sem movimento*")
             
-            # Converter para pandas para exibição
-            df_pandas_presenca = df_final_presenca.to_pandas()
+            # Controles da tabela paginada: busca, ordenação, página e janela de meses (resolvidos no servidor)
+            col_busca, col_ordem, col_linhas = st.columns([2, 2, 1])
+            with col_busca:
+                busca_presenca = st.text_input(
+                    "🔎 **Buscar aeroporto ou aeronave:**",
+                    value="",
+                    help="Mostra apenas as combinações cujo aeroporto ou aeronave contém o texto",
+                    key="busca_tabela_presenca"
+                )
+            with col_ordem:
+                opcoes_ordenacao_presenca = {
+                    "Aeroporto (A-Z)": ("aeroporto", False),
+                    "Aeronave (A-Z)": ("aeronave", False),
+                    "Mais meses com movimento": ("meses_com_movimento", True),
+                    "Menos meses com movimento": ("meses_com_movimento", False)
+                }
+                ordenacao_presenca = st.selectbox(
+                    "↕️ **Ordenar por:**",
+                    options=list(opcoes_ordenacao_presenca.keys()),
+                    index=0,
+                    key="ordenacao_tabela_presenca"
+                )
+            with col_linhas:
+                linhas_por_pagina_presenca = st.selectbox(
+                    "📄 **Linhas por página:**",
+                    options=[25, 50, 100, 200],
+                    index=1,
+                    key="linhas_tabela_presenca"
+                )
+            
+            # Combinações com movimento após a busca (a quantidade define o número de páginas)
+            df_combinacoes_presenca = combinacoes_presenca(cubo_presenca, aeroportos_selecionados, aeronaves_selecionadas, busca_presenca)
+            if df_pares_top_k is not None:
+                df_combinacoes_presenca = df_combinacoes_presenca.join(df_pares_top_k, on=["aeroporto", "aeronave"], how="semi")
+            total_combinacoes_presenca = df_combinacoes_presenca.height
+            total_paginas_presenca = max(1, -(-total_combinacoes_presenca // linhas_por_pagina_presenca))
+            
+            # Manter a página dentro do intervalo (a busca ou a seleção podem ter reduzido o total de páginas)
+            if "pagina_tabela_presenca" not in st.session_state:
+                st.session_state["pagina_tabela_presenca"] = 1
+            st.session_state["pagina_tabela_presenca"] = min(st.session_state["pagina_tabela_presenca"], total_paginas_presenca)
+            
+            col_pagina, col_janela = st.columns([1, 3])
+            with col_pagina:
+                pagina_presenca = st.number_input(
+                    f"📑 **Página (de {total_paginas_presenca}):**",
+                    min_value=1,
+                    max_value=total_paginas_presenca,
+                    step=1,
+                    key="pagina_tabela_presenca"
+                )
+            with col_janela:
+                periodo_inicial_presenca, periodo_final_presenca = st.select_slider(
+                    "🗓️ **Janela de meses visíveis:**",
+                    options=periodos_unicos,
+                    value=(periodos_unicos[max(0, len(periodos_unicos) - 12)], periodos_unicos[-1]),
+                    help="Apenas os meses desta janela são enviados para a tabela",
+                    key="janela_tabela_presenca"
+                )
+            mes_inicial_presenca = periodos_unicos.index(periodo_inicial_presenca)
+            meses_visiveis_presenca = periodos_unicos.index(periodo_final_presenca) - mes_inicial_presenca + 1
+            
+            coluna_ordenacao, ordem_decrescente = opcoes_ordenacao_presenca[ordenacao_presenca]
+            df_pagina_presenca = pagina_tabela_presenca(
+                cubo_presenca, df_combinacoes_presenca,
+                ordenar_por=coluna_ordenacao,
+                decrescente=ordem_decrescente,
+                pagina=int(pagina_presenca),
+                linhas_por_pagina=linhas_por_pagina_presenca,
+                mes_inicial=mes_inicial_presenca,
+                meses_visiveis=meses_visiveis_presenca
+            )
+            periodos_visiveis = periodos_unicos[mes_inicial_presenca:mes_inicial_presenca + meses_visiveis_presenca]
+            
+            # Converter para pandas para exibição ("Sim"/"Não" apenas na exibição)
+            df_pandas_presenca = df_pagina_presenca.with_columns([
+                pl.when(pl.col(periodo)).then(pl.lit("Sim")).otherwise(pl.lit("Não")).alias(periodo)
+                for periodo in periodos_visiveis
+            ]).to_pandas()
             
             # Configurar colunas da tabela
             column_config = {
@@ -3085,24 +3722,31 @@ with tab3:
                     "Aeronave", 
                     help="Código da aeronave",
                     width="small"
+                ),
+                "meses_com_movimento": st.column_config.NumberColumn(
+                    "Meses com Movimento",
+                    help="Quantidade de meses com movimento em todo o período analisado",
+                    width="small",
+                    format="%d"
                 )
             }
             
             # Adicionar configuração para colunas de período
-            for periodo in periodos_unicos:
+            for periodo in periodos_visiveis:
                 column_config[periodo] = st.column_config.TextColumn(
                     periodo,
                     help=f"Movimento em {periodo}",
                     width="small"
                 )
             
-            # Mostrar tabela com paginação
+            # Mostrar apenas a página e a janela de meses selecionadas
             st.dataframe(
                 df_pandas_presenca,
                 use_container_width=True,
                 column_config=column_config,
                 hide_index=True
             )
+            st.caption(f"Mostrando {df_pagina_presenca.height} de {total_combinacoes_presenca} combinações | Página {int(pagina_presenca)} de {total_paginas_presenca} | Meses {periodo_inicial_presenca} a {periodo_final_presenca}")
         
             
             # Nova tabela: Meses Consecutivos
@@ -3110,100 +3754,24 @@ with tab3:
             st.markdown("#### 📅 **Tabela de Meses Consecutivos**")
             st.markdown("### Análise de meses consecutivos com e sem operação (máximo, mínimo e médio) por aeroporto e aeronave")
             
-            # Calcular meses consecutivos e sem operação para cada combinação aeroporto-aeronave
-            def calcular_meses_consecutivos(row, periodos_unicos):
-                """Calcula máximo, mínimo e médio de meses consecutivos com movimento e sem operação"""
-                max_consecutivos = 0
-                min_consecutivos = float('inf')
-                consecutivos_atual = 0
-                sequencias = []  # Lista para armazenar todas as sequências de movimento
-                
-                max_sem_operacao = 0
-                min_sem_operacao = float('inf')
-                sem_operacao_atual = 0
-                sequencias_sem_operacao = []  # Lista para armazenar todas as sequências sem operação
-                
-                for periodo in periodos_unicos:
-                    if row[periodo] == "Sim":
-                        # Finalizar sequência sem operação se existir
-                        if sem_operacao_atual > 0:
-                            sequencias_sem_operacao.append(sem_operacao_atual)
-                            min_sem_operacao = min(min_sem_operacao, sem_operacao_atual)
-                        sem_operacao_atual = 0
-                        
-                        # Continuar sequência de movimento
-                        consecutivos_atual += 1
-                        max_consecutivos = max(max_consecutivos, consecutivos_atual)
-                    else:
-                        # Finalizar sequência de movimento se existir
-                        if consecutivos_atual > 0:
-                            sequencias.append(consecutivos_atual)
-                            min_consecutivos = min(min_consecutivos, consecutivos_atual)
-                        consecutivos_atual = 0
-                        
-                        # Continuar sequência sem operação
-                        sem_operacao_atual += 1
-                        max_sem_operacao = max(max_sem_operacao, sem_operacao_atual)
-                
-                # Adicionar a última sequência se terminar com "Sim"
-                if consecutivos_atual > 0:
-                    sequencias.append(consecutivos_atual)
-                    min_consecutivos = min(min_consecutivos, consecutivos_atual)
-                
-                # Adicionar a última sequência se terminar com "Não"
-                if sem_operacao_atual > 0:
-                    sequencias_sem_operacao.append(sem_operacao_atual)
-                    min_sem_operacao = min(min_sem_operacao, sem_operacao_atual)
-                
-                # Calcular médios
-                if sequencias:
-                    medio_consecutivos = sum(sequencias) / len(sequencias)
-                else:
-                    medio_consecutivos = 0
-                    min_consecutivos = 0
-                
-                if sequencias_sem_operacao:
-                    medio_sem_operacao = sum(sequencias_sem_operacao) / len(sequencias_sem_operacao)
-                else:
-                    medio_sem_operacao = 0
-                    min_sem_operacao = 0
-                
-                return (max_consecutivos, min_consecutivos, medio_consecutivos, 
-                        max_sem_operacao, min_sem_operacao, medio_sem_operacao)
-            
-            # Aplicar função para calcular meses consecutivos
-            resultados = df_pandas_presenca.apply(
-                lambda row: calcular_meses_consecutivos(row, periodos_unicos), axis=1
-            )
-            
-            # Separar os resultados em colunas
-            df_pandas_presenca['meses_consecutivos_maximo'] = [r[0] for r in resultados]
-            df_pandas_presenca['meses_consecutivos_minimo'] = [r[1] for r in resultados]
-            df_pandas_presenca['meses_consecutivos_medio'] = [r[2] for r in resultados]
-            df_pandas_presenca['meses_sem_operacao_maximo'] = [r[3] for r in resultados]
-            df_pandas_presenca['meses_sem_operacao_minimo'] = [r[4] for r in resultados]
-            df_pandas_presenca['meses_sem_operacao_medio'] = [r[5] for r in resultados]
-            
-            # Criar tabela de meses consecutivos
-            df_meses_consecutivos = df_pandas_presenca[['aeroporto', 'aeronave', 'meses_consecutivos_maximo', 'meses_consecutivos_minimo', 'meses_consecutivos_medio', 'meses_sem_operacao_maximo', 'meses_sem_operacao_minimo', 'meses_sem_operacao_medio']].copy()
-            
-            # Filtrar apenas combinações que tiveram pelo menos 1 mês de movimento
-            df_meses_consecutivos = df_meses_consecutivos[df_meses_consecutivos['meses_consecutivos_maximo'] > 0]
-            
-            # Ordenar por meses consecutivos máximo (decrescente) e depois por aeroporto e aeronave
-            df_meses_consecutivos = df_meses_consecutivos.sort_values(
-                ['meses_consecutivos_maximo', 'aeroporto', 'aeronave'], 
-                ascending=[False, True, True]
-            )
+            # Calcular meses consecutivos e sem operação de todas as combinações aeroporto-aeronave
+            # de uma só vez, a partir do cubo de presença (apenas combinações com pelo menos 1 mês de movimento);
+            # no top-k as estatísticas já vêm calculadas para as combinações escolhidas
+            if df_pares_top_k is not None:
+                df_meses_consecutivos = df_pares_top_k
+            else:
+                df_meses_consecutivos = tabela_meses_consecutivos(cubo_presenca, aeroportos_selecionados, aeronaves_selecionadas)
+            df_meses_consecutivos = df_meses_consecutivos.sort(["meses_consecutivos_maximo", "aeroporto", "aeronave"],
+                                                               descending=[True, False, False])
             
             # Mostrar informações sobre a tabela
-            if len(df_meses_consecutivos) > 0:
+            if df_meses_consecutivos.height > 0:
                 max_meses = df_meses_consecutivos['meses_consecutivos_maximo'].max()
                 media_meses = df_meses_consecutivos['meses_consecutivos_medio'].mean()
-                total_aeroportos = df_meses_consecutivos['aeroporto'].nunique()
+                total_aeroportos = df_meses_consecutivos['aeroporto'].n_unique()
                 st.info(f"""
                 📊 **Informações da Tabela de Meses Consecutivos:**
-                - **Total de combinações:** {len(df_meses_consecutivos)}
+                - **Total de combinações:** {df_meses_consecutivos.height}
                 - **Total de aeroportos:** {total_aeroportos}
                 - **Máximo de meses consecutivos:** {max_meses}
                 - **Média de meses consecutivos médio:** {media_meses:.1f}
@@ -3218,7 +3786,7 @@ with tab3:
                 """)
             
             # Filtros para meses consecutivos e sem operação
-            if len(df_meses_consecutivos) > 0:
+            if df_meses_consecutivos.height > 0:
                 # Seção 1: Filtros para Meses Consecutivos
                 st.markdown("#### 🔍 **Filtros para Meses Consecutivos**")
                 
@@ -3372,84 +3940,20 @@ with tab3:
                         key="valor_filtro_sem_medio"
                     )
                 
-                # Aplicar filtros combinados
-                df_meses_filtrado = df_meses_consecutivos.copy()
-                
-                # Filtro por máximo
-                if operador_max == "Maior que (>)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_consecutivos_maximo'] > valor_max]
-                elif operador_max == "Menor que (<)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_consecutivos_maximo'] < valor_max]
-                elif operador_max == "Igual a (=)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_consecutivos_maximo'] == valor_max]
-                elif operador_max == "Maior ou igual (≥)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_consecutivos_maximo'] >= valor_max]
-                elif operador_max == "Menor ou igual (≤)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_consecutivos_maximo'] <= valor_max]
-                
-                # Filtro por mínimo
-                if operador_min == "Maior que (>)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_consecutivos_minimo'] > valor_min]
-                elif operador_min == "Menor que (<)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_consecutivos_minimo'] < valor_min]
-                elif operador_min == "Igual a (=)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_consecutivos_minimo'] == valor_min]
-                elif operador_min == "Maior ou igual (≥)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_consecutivos_minimo'] >= valor_min]
-                elif operador_min == "Menor ou igual (≤)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_consecutivos_minimo'] <= valor_min]
-                
-                # Filtro por médio
-                if operador_med == "Maior que (>)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_consecutivos_medio'] > valor_med]
-                elif operador_med == "Menor que (<)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_consecutivos_medio'] < valor_med]
-                elif operador_med == "Igual a (=)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_consecutivos_medio'] == valor_med]
-                elif operador_med == "Maior ou igual (≥)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_consecutivos_medio'] >= valor_med]
-                elif operador_med == "Menor ou igual (≤)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_consecutivos_medio'] <= valor_med]
-                
-                # Filtro por máximo sem operação
-                if operador_sem_max == "Maior que (>)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_sem_operacao_maximo'] > valor_sem_max]
-                elif operador_sem_max == "Menor que (<)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_sem_operacao_maximo'] < valor_sem_max]
-                elif operador_sem_max == "Igual a (=)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_sem_operacao_maximo'] == valor_sem_max]
-                elif operador_sem_max == "Maior ou igual (≥)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_sem_operacao_maximo'] >= valor_sem_max]
-                elif operador_sem_max == "Menor ou igual (≤)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_sem_operacao_maximo'] <= valor_sem_max]
-                
-                # Filtro por mínimo sem operação
-                if operador_sem_min == "Maior que (>)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_sem_operacao_minimo'] > valor_sem_min]
-                elif operador_sem_min == "Menor que (<)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_sem_operacao_minimo'] < valor_sem_min]
-                elif operador_sem_min == "Igual a (=)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_sem_operacao_minimo'] == valor_sem_min]
-                elif operador_sem_min == "Maior ou igual (≥)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_sem_operacao_minimo'] >= valor_sem_min]
-                elif operador_sem_min == "Menor ou igual (≤)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_sem_operacao_minimo'] <= valor_sem_min]
-                
-                # Filtro por médio sem operação
-                if operador_sem_med == "Maior que (>)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_sem_operacao_medio'] > valor_sem_med]
-                elif operador_sem_med == "Menor que (<)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_sem_operacao_medio'] < valor_sem_med]
-                elif operador_sem_med == "Igual a (=)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_sem_operacao_medio'] == valor_sem_med]
-                elif operador_sem_med == "Maior ou igual (≥)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_sem_operacao_medio'] >= valor_sem_med]
-                elif operador_sem_med == "Menor ou igual (≤)":
-                    df_meses_filtrado = df_meses_filtrado[df_meses_filtrado['meses_sem_operacao_medio'] <= valor_sem_med]
+                # Compilar os seis filtros em uma única expressão, avaliada em uma só passada
+                especificacao_filtros = [
+                    ("meses_consecutivos_maximo", operador_max, valor_max),
+                    ("meses_consecutivos_minimo", operador_min, valor_min),
+                    ("meses_consecutivos_medio", operador_med, valor_med),
+                    ("meses_sem_operacao_maximo", operador_sem_max, valor_sem_max),
+                    ("meses_sem_operacao_minimo", operador_sem_min, valor_sem_min),
+                    ("meses_sem_operacao_medio", operador_sem_med, valor_sem_med)
+                ]
+                df_meses_filtrado = df_meses_consecutivos.filter(compilar_filtro(especificacao_filtros))
                 
                 # Mostrar informações sobre os filtros aplicados
                 filtros_ativos = []
-                if len(df_meses_filtrado) != len(df_meses_consecutivos):
+                if df_meses_filtrado.height != df_meses_consecutivos.height:
                     if operador_max != "Maior ou igual (≥)" or valor_max != 1:  # Se não for o padrão
                         filtros_ativos.append(f"Máximo: {operador_max} {valor_max}")
                     if operador_min != "Maior ou igual (≥)" or valor_min != 1:  # Se não for o padrão
@@ -3464,10 +3968,10 @@ with tab3:
                         filtros_ativos.append(f"Méd. Sem Op.: {operador_sem_med} {valor_sem_med}")
                     
                     if filtros_ativos:
-                        st.info(f"🔍 **Filtros ativos:** {' | '.join(filtros_ativos)} | **Resultados:** {len(df_meses_filtrado)} de {len(df_meses_consecutivos)} combinações")
+                        st.info(f"🔍 **Filtros ativos:** {' | '.join(filtros_ativos)} | **Resultados:** {df_meses_filtrado.height} de {df_meses_consecutivos.height} combinações")
                 
                 # Verificar se há resultados após filtro
-                if len(df_meses_filtrado) == 0:
+                if df_meses_filtrado.height == 0:
                     st.warning("⚠️ **Nenhum resultado encontrado** com os filtros aplicados.")
                     st.info("💡 Tente ajustar os operadores ou valores dos filtros.")
                 else:
@@ -3524,7 +4028,7 @@ with tab3:
                     
                     # Mostrar tabela
                     st.dataframe(
-                        df_meses_filtrado,
+                        df_meses_filtrado.to_pandas(),
                         use_container_width=True,
                         column_config=column_config_meses,
                         hide_index=True
@@ -3535,76 +4039,95 @@ with tab3:
                 st.markdown("#### 📊 **Gráfico de Presença de Movimentos**")
                 st.markdown("Visualize a presença de movimentos (0 = Não, 1 = Sim) ao longo do tempo para cada combinação aeroporto-aeronave")
                 
-                # Preparar dados para o gráfico
-                # Criar DataFrame com dados de presença para as combinações filtradas
-                df_grafico = df_pandas_presenca[df_pandas_presenca[['aeroporto', 'aeronave']].apply(
-                    lambda row: f"{row['aeroporto']}-{row['aeronave']}" in 
-                    df_meses_filtrado[['aeroporto', 'aeronave']].apply(
-                        lambda x: f"{x['aeroporto']}-{x['aeronave']}", axis=1
-                    ).values, axis=1
-                )].copy()
-                
-                if len(df_grafico) > 0:
-                    # Criar dados longos para o gráfico
-                    df_grafico_long = df_grafico.melt(
-                        id_vars=['aeroporto', 'aeronave'],
-                        value_vars=periodos_unicos,
-                        var_name='periodo',
-                        value_name='presenca'
+                # Controles do gráfico: modo de exibição e ordenação das linhas pelas estatísticas de sequências
+                col_modo_grafico, col_ordem_grafico = st.columns(2)
+                with col_modo_grafico:
+                    modo_grafico_presenca = st.radio(
+                        "🖼️ **Modo de exibição:**",
+                        options=["Mapa de calor", "Linhas"],
+                        horizontal=True,
+                        help="Mapa de calor: uma linha por combinação e uma coluna por mês. Linhas: uma série por combinação (até 50 combinações)",
+                        key="modo_grafico_presenca"
                     )
-                    
-                    # Converter "Sim"/"Não" para 1/0
-                    df_grafico_long['valor_presenca'] = df_grafico_long['presenca'].map({'Sim': 1, 'Não': 0})
-                    
-                    # Criar coluna de combinação aeroporto-aeronave para legenda
-                    df_grafico_long['combinacao'] = df_grafico_long['aeroporto'] + '-' + df_grafico_long['aeronave']
-                    
-                    # Criar gráfico
-                    import plotly.express as px
-                    import plotly.graph_objects as go
-                    
-                    # Criar gráfico de linha
-                    fig = px.line(
-                        df_grafico_long,
-                        x='periodo',
-                        y='valor_presenca',
-                        color='combinacao',
-                        title='Presença de Movimentos por Período',
-                        labels={
-                            'periodo': 'Período (Mês-Ano)',
-                            'valor_presenca': 'Presença de Movimento',
-                            'combinacao': 'Aeroporto-Aeronave'
-                        },
-                        height=600
-                    )
-                    
-                    # Personalizar o gráfico
-                    fig.update_layout(
-                        yaxis=dict(
-                            tickmode='array',
-                            tickvals=[0, 1],
-                            ticktext=['Não', 'Sim'],
-                            range=[-0.1, 1.1]
-                        ),
-                        xaxis=dict(
-                            tickangle=45
-                        ),
-                        legend=dict(
-                            orientation="v",
-                            yanchor="top",
-                            y=1,
-                            xanchor="left",
-                            x=1.02
-                        ),
-                        hovermode='x unified'
-                    )
-                    
-                    # Adicionar pontos para melhor visualização
-                    fig.update_traces(
-                        mode='lines+markers',
-                        marker=dict(size=4),
-                        line=dict(width=2)
+                with col_ordem_grafico:
+                    opcoes_ordem_grafico = {
+                        "Máximo de meses consecutivos": ["meses_consecutivos_maximo", "meses_consecutivos_medio"],
+                        "Média de meses consecutivos": ["meses_consecutivos_medio", "meses_consecutivos_maximo"],
+                        "Máximo de meses sem operação": ["meses_sem_operacao_maximo", "meses_sem_operacao_medio"]
+                    }
+                    ordem_grafico_presenca = st.selectbox(
+                        "↕️ **Ordenar combinações por:**",
+                        options=list(opcoes_ordem_grafico.keys()),
+                        index=0,
+                        key="ordem_grafico_presenca"
                     )
+                
+                # Matriz de presença (combinações × meses) das combinações filtradas, direto do cubo
+                df_combinacoes_grafico = df_meses_filtrado.sort(
+                    opcoes_ordem_grafico[ordem_grafico_presenca] + ["aeroporto", "aeronave"],
+                    descending=[True, True, False, False]
+                )
+                matriz_grafico = matriz_presenca_combinacoes(cubo_presenca, df_combinacoes_grafico)
+                rotulos_combinacoes = (df_combinacoes_grafico["aeroporto"] + "-" + df_combinacoes_grafico["aeronave"]).to_list()
+                
+                if modo_grafico_presenca == "Linhas" and len(rotulos_combinacoes) > 50:
+                    st.info(f"💡 {len(rotulos_combinacoes)} combinações selecionadas: exibindo como mapa de calor (o modo linhas suporta até 50 combinações).")
+                    modo_grafico_presenca = "Mapa de calor"
+                
+                if len(rotulos_combinacoes) > 0:
+                    if modo_grafico_presenca == "Mapa de calor":
+                        # Um único heatmap: combinações como linhas e meses como colunas
+                        fig = go.Figure(go.Heatmap(
+                            z=matriz_grafico.astype(np.uint8),
+                            x=periodos_unicos,
+                            y=rotulos_combinacoes,
+                            zmin=0,
+                            zmax=1,
+                            colorscale=[[0, "#eeeeee"], [0.5, "#eeeeee"], [0.5, "#1f77b4"], [1, "#1f77b4"]],
+                            xgap=1,
+                            ygap=1 if len(rotulos_combinacoes) <= 100 else 0,
+                            colorbar=dict(tickvals=[0.25, 0.75], ticktext=["Não", "Sim"], len=0.3),
+                            hovertemplate="<b>%{y}</b><br>Período: %{x}<br>Presença: %{z}<extra></extra>"
+                        ))
+                        fig.update_layout(
+                            title='Presença de Movimentos por Período',
+                            xaxis=dict(title='Período (Mês-Ano)', tickangle=45),
+                            yaxis=dict(title='Aeroporto-Aeronave', autorange='reversed', showticklabels=len(rotulos_combinacoes) <= 100),
+                            height=min(max(400, 18 * len(rotulos_combinacoes) + 150), 1600)
+                        )
+                    else:
+                        # Uma série por combinação, construída a partir da mesma matriz
+                        fig = go.Figure()
+                        for i, combinacao in enumerate(rotulos_combinacoes):
+                            fig.add_trace(go.Scatter(
+                                x=periodos_unicos,
+                                y=matriz_grafico[i].astype(np.uint8),
+                                mode='lines+markers',
+                                name=combinacao,
+                                marker=dict(size=4),
+                                line=dict(width=2)
+                            ))
+                        fig.update_layout(
+                            title='Presença de Movimentos por Período',
+                            xaxis=dict(title='Período (Mês-Ano)', tickangle=45),
+                            yaxis=dict(
+                                title='Presença de Movimento',
+                                tickmode='array',
+                                tickvals=[0, 1],
+                                ticktext=['Não', 'Sim'],
+                                range=[-0.1, 1.1]
+                            ),
+                            legend=dict(
+                                title='Aeroporto-Aeronave',
+                                orientation="v",
+                                yanchor="top",
+                                y=1,
+                                xanchor="left",
+                                x=1.02
+                            ),
+                            hovermode='x unified',
+                            height=600
+                        )
                     
                     # Mostrar gráfico
                     st.plotly_chart(fig, use_container_width=True)
@@ -3612,11 +4135,11 @@ with tab3:
                     # Informações sobre o gráfico
                     st.info(f"""
                     📊 **Informações do Gráfico:**
-                    - **Combinações mostradas (aeroporto-aeronave):** {len(df_grafico_long['combinacao'].unique())}
-                    - **Aeroportos mostrados:** {len(df_grafico_long['aeroporto'].unique())}
-                    - **Aeronaves mostradas:** {len(df_grafico_long['aeronave'].unique())}
+                    - **Combinações mostradas (aeroporto-aeronave):** {len(rotulos_combinacoes)}
+                    - **Aeroportos mostrados:** {df_combinacoes_grafico['aeroporto'].n_unique()}
+                    - **Aeronaves mostradas:** {df_combinacoes_grafico['aeronave'].n_unique()}
                     - **Valores:** 0 = Sem movimento, 1 = Com movimento
-                    - **Dica:** Clique duas vezes em um aeroporto-aeronave na legenda para destacar apenas essa combinação. Clique duas vezes para voltar a ver todas as combinações.
+                    - **Ordenação:** {ordem_grafico_presenca}
                     - **Observação:** O gráfico mostra as combinações mostradas anteriormente na Tabela de Meses Consecutivos
                     """)
                 
@@ -3632,7 +4155,7 @@ with tab3:
                 
                 with col_filtro_det1:
                     # Filtro por aeroporto específico - apenas aeroportos presentes no gráfico
-                    aeroportos_detalhamento = sorted(df_meses_filtrado["aeroporto"].unique().tolist())
+                    aeroportos_detalhamento = sorted(df_meses_filtrado["aeroporto"].unique().to_list())
                     aeroporto_detalhamento = st.selectbox(
                         "🏢 **Selecionar Aeroporto:**",
                         options=["Todos"] + aeroportos_detalhamento,
@@ -3642,7 +4165,7 @@ with tab3:
                 
                 with col_filtro_det2:
                     # Filtro por aeronave específica - apenas aeronaves presentes no gráfico
-                    aeronaves_detalhamento = sorted(df_meses_filtrado["aeronave"].unique().tolist())
+                    aeronaves_detalhamento = sorted(df_meses_filtrado["aeronave"].unique().to_list())
                     aeronave_detalhamento = st.selectbox(
                         "✈️ **Selecionar Aeronave:**",
                         options=["Todos"] + aeronaves_detalhamento,
@@ -3652,12 +4175,8 @@ with tab3:
                 
                 # Aplicar filtros específicos - usar apenas combinações presentes no gráfico
                 # Primeiro, filtrar apenas as combinações que estão no df_meses_filtrado
-                combinacoes_grafico = df_meses_filtrado[['aeroporto', 'aeronave']].apply(
-                    lambda x: f"{x['aeroporto']}-{x['aeronave']}", axis=1
-                ).tolist()
-                
-                df_detalhamento_filtrado = df_presenca_filtrado.filter(
-                    pl.concat_str([pl.col("aeroporto"), pl.lit("-"), pl.col("aeronave")]).is_in(combinacoes_grafico)
+                df_detalhamento_filtrado = df_presenca_filtrado.join(
+                    df_meses_filtrado.select(["aeroporto", "aeronave"]), on=["aeroporto", "aeronave"], how="semi"
                 )
                 
                 if aeroporto_detalhamento != "Todos":
@@ -3749,8 +4268,152 @@ with tab3:
                 st.warning("⚠️ **Nenhuma combinação com movimentação encontrada.**")
                 st.info("💡 Todas as combinações aeroporto-aeronave não tiveram movimentação nos períodos analisados.")
         
+        # Eventos de serviço (entradas, saídas, lacunas e constância) pré-calculados sobre o cubo de presença
+        st.markdown("---")
+        marcar_secao("Aba 3 › Entradas, saídas e lacunas")
+        st.markdown("#### 🚦 **Entradas, Saídas e Lacunas de Serviço**")
+        st.markdown("Eventos detectados automaticamente para os aeroportos e aeronaves selecionados (aeronave 'Todas' = qualquer aeronave no aeroporto)")
+        
+        col_evento1, col_evento2, col_evento3 = st.columns(3)
+        with col_evento1:
+            meses_ausencia_eventos = st.number_input(
+                "⏸️ **Meses mínimos de ausência:**",
+                min_value=1,
+                max_value=24,
+                value=3,
+                help="Ausência mínima (em meses) para caracterizar entrada, saída ou lacuna",
+                key="meses_ausencia_eventos"
+            )
+        with col_evento2:
+            meses_constancia_eventos = st.number_input(
+                "🔁 **Meses para constância:**",
+                min_value=1,
+                max_value=len(periodos_unicos),
+                value=min(12, len(periodos_unicos)),
+                help="Operação em todos os últimos N meses (ou mais) até o fim dos dados",
+                key="meses_constancia_eventos"
+            )
+        with col_evento3:
+            tipos_eventos = st.multiselect(
+                "🏷️ **Eventos:**",
+                options=["Entrada", "Saída", "Lacuna", "Constância"],
+                default=["Entrada", "Saída", "Lacuna"],
+                key="tipos_eventos_presenca"
+            )
+        
+        df_eventos_selecao = (detectar_eventos_servico(cubo_presenca, meses_ausencia_eventos, meses_constancia_eventos)
+                              .filter(
+                                  pl.col("aeroporto").is_in(aeroportos_selecionados) &
+                                  (pl.col("aeronave").is_in(aeronaves_selecionadas) | (pl.col("aeronave") == "Todas")) &
+                                  pl.col("evento").is_in(tipos_eventos)
+                              ))
+        
+        if df_eventos_selecao.height > 0:
+            col_ev_m1, col_ev_m2, col_ev_m3 = st.columns(3)
+            with col_ev_m1:
+                st.metric("Aeroportos com Saída (todas as aeronaves)", formatar_numero(
+                    df_eventos_selecao.filter((pl.col("aeronave") == "Todas") & (pl.col("evento") == "Saída")).height
+                ))
+            with col_ev_m2:
+                st.metric("Aeroportos com Entrada (todas as aeronaves)", formatar_numero(
+                    df_eventos_selecao.filter((pl.col("aeronave") == "Todas") & (pl.col("evento") == "Entrada")).height
+                ))
+            with col_ev_m3:
+                st.metric("Eventos por Aeronave", formatar_numero(
+                    df_eventos_selecao.filter(pl.col("aeronave") != "Todas").height
+                ))
+            
+            st.dataframe(
+                df_eventos_selecao.to_pandas(),
+                use_container_width=True,
+                column_config={
+                    "aeroporto": st.column_config.TextColumn("Aeroporto", help="Código do aeroporto"),
+                    "aeronave": st.column_config.TextColumn("Aeronave", help="Código da aeronave ('Todas' = qualquer aeronave)"),
+                    "evento": st.column_config.TextColumn("Evento"),
+                    "periodo_inicio": st.column_config.TextColumn("Início", help="Entrada/Saída: mês da primeira/última operação. Lacuna/Constância: primeiro mês"),
+                    "periodo_fim": st.column_config.TextColumn("Fim", help="Último mês da lacuna ou da constância"),
+                    "meses": st.column_config.NumberColumn("Meses", help="Duração da ausência (Entrada, Saída, Lacuna) ou da operação contínua (Constância)", format="%d")
+                },
+                hide_index=True
+            )
+        else:
+            st.info("💡 Nenhum evento encontrado para a seleção atual.")
+    
     else:
         st.warning("⚠️ **Nenhum dado de voos encontrado.**")
         st.info("💡 Verifique os filtros aplicados ou se há dados disponíveis.")
 
+# --- PAINEL DE DESEMPENHO ---
+# Medições do rerun gravadas no JSONL antes de montar o painel (o painel não entra na medição)
+desempenho = registrar_metricas_desempenho()
+
+if MEDIR_DESEMPENHO and st.sidebar.toggle(
+    "⏱️ Painel de desempenho",
+    key="painel_desempenho",
+    help="Mostra o tempo de cada seção deste rerun, as linhas processadas e os acertos de cache das etapas do motor"
+):
+    st.markdown("---")
+    st.header("⏱️ **Desempenho do Rerun**")
+
+    df_secoes = (pl.DataFrame(desempenho["secoes"], schema={"tipo": pl.Utf8, "secao": pl.Utf8, "duracao_ms": pl.Float64, "linhas": pl.Int64})
+                 .with_columns((pl.col("duracao_ms") / desempenho["rerun_ms"]).alias("percentual_rerun")))
+    df_etapas = (pl.DataFrame(
+                     [{"etapa": nome, **etapa} for nome, etapa in desempenho["etapas"].items()],
+                     schema={"etapa": pl.Utf8, "chamadas": pl.Int64, "execucoes": pl.Int64, "duracao_ms": pl.Float64}
+                 )
+                 .with_columns((pl.col("chamadas") - pl.col("execucoes")).alias("cache_hit"))
+                 .sort("duracao_ms", descending=True))
+
+    total_chamadas = df_etapas["chamadas"].sum()
+    col_d1, col_d2, col_d3 = st.columns(3)
+    with col_d1:
+        st.metric("Duração do Rerun", f"{formatar_numero(desempenho['rerun_ms'])} ms")
+    with col_d2:
+        st.metric("Seção Mais Lenta", df_secoes.filter(pl.col("tipo") == "secao").sort("duracao_ms", descending=True)["secao"][0])
+    with col_d3:
+        st.metric("Acertos de Cache", f"{df_etapas['cache_hit'].sum() / total_chamadas:.0%}" if total_chamadas else "—")
+
+    st.markdown("##### **Seções (ordem de execução)**")
+    st.dataframe(
+        df_secoes.to_pandas(),
+        use_container_width=True,
+        column_config={
+            "tipo": "Tipo",
+            "secao": "Seção",
+            "duracao_ms": st.column_config.NumberColumn("Duração (ms)", format="%.1f"),
+            "linhas": st.column_config.NumberColumn("Linhas Processadas", format="%d"),
+            "percentual_rerun": st.column_config.NumberColumn("% do Rerun", format="percent")
+        },
+        hide_index=True
+    )
 
+    st.markdown("##### **Etapas do Motor (cache)**")
+    st.dataframe(
+        df_etapas.to_pandas(),
+        use_container_width=True,
+        column_config={
+            "etapa": "Etapa",
+            "chamadas": st.column_config.NumberColumn("Chamadas", format="%d"),
+            "execucoes": st.column_config.NumberColumn("Cache Miss", format="%d"),
+            "cache_hit": st.column_config.NumberColumn("Cache Hit", format="%d"),
+            "duracao_ms": st.column_config.NumberColumn("Tempo Executando (ms)", format="%.1f")
+        },
+        hide_index=True
+    )
+
+    df_historico = historico_desempenho()
+    if df_historico is not None:
+        st.markdown(f"##### **Histórico de Reruns (p50/p95)** - `{ARQUIVO_METRICAS_DESEMPENHO}`")
+        st.dataframe(
+            df_historico.to_pandas(),
+            use_container_width=True,
+            column_config={
+                "tipo": "Tipo",
+                "secao": "Seção",
+                "medicoes": st.column_config.NumberColumn("Medições", format="%d"),
+                "p50_ms": st.column_config.NumberColumn("p50 (ms)", format="%.1f"),
+                "p95_ms": st.column_config.NumberColumn("p95 (ms)", format="%.1f"),
+                "max_ms": st.column_config.NumberColumn("Máximo (ms)", format="%.1f")
+            },
+            hide_index=True
+        )